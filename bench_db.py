@@ -0,0 +1,530 @@
+"""
+Micro-benchmarks for the data layer in main.py.
+
+    python bench_db.py                # run every benchmark
+    python bench_db.py connections    # run only the named ones
+
+Every benchmark works on a throwaway database in a temp directory, so the
+real user_app_database.db is never touched.
+"""
+import itertools
+import os
+import random
+import sys
+import sqlite3
+import string
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import main
+
+
+def fresh_db(name='bench.db'):
+    """Point main.py at a brand-new database file and create the schema."""
+    main.db.close_all()
+    main.DB_FILE = os.path.join(tempfile.mkdtemp(prefix='userhub_bench_'), name)
+    main.setup_db()
+    return main.DB_FILE
+
+
+def timed(fn, n):
+    """Returns the mean wall time of fn() in microseconds over n calls."""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def report(title, rows):
+    print(f"\n== {title} ==")
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
+
+
+def seed_messages(count):
+    base = datetime.now() - timedelta(seconds=count)
+    with main.db.transaction() as c:
+        c.executemany(
+            "INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)",
+            ((f"user{i % 25}", f"message number {i}", base + timedelta(seconds=i)) for i in range(count))
+        )
+
+
+# ── connections ───────────────────────────────────────────────────────────────
+def _legacy_get_recent_messages():
+    # The pre-ConnectionManager path: open, query, close on every call
+    conn = sqlite3.connect(main.DB_FILE, timeout=10)
+    c = conn.cursor()
+    c.execute("SELECT id, user_name, message, timestamp FROM messages ORDER BY id DESC LIMIT ?",
+              (main.CHAT_PAGE_SIZE,))
+    msgs = c.fetchall(); conn.close(); return list(reversed(msgs))
+
+
+def _legacy_get_unread_count():
+    conn = sqlite3.connect(main.DB_FILE, timeout=10)
+    c = conn.cursor()
+    c.execute(
+        "SELECT unread_count FROM conversation_members WHERE conversation_id=? AND email=?",
+        (1, "b@x.com")
+    )
+    result = c.fetchone(); conn.close()
+    return result[0] if result else 0
+
+
+def bench_connections(n=2000):
+    fresh_db()
+    seed_messages(2000)
+    conv_id = main.get_or_create_direct_conversation("a@x.com", "b@x.com")
+    rows = []
+    for label, legacy, managed in [
+        ('get_recent_messages', _legacy_get_recent_messages, main.get_recent_messages),
+        ('get_unread_count', _legacy_get_unread_count,
+         lambda: main.get_unread_count("b@x.com", conv_id)),
+    ]:
+        legacy(); managed()  # warm the page cache for both paths
+        old_us = timed(legacy, n)
+        new_us = timed(managed, n)
+        rows.append((f'{label} open-per-call', f'{old_us:9.1f} us/call'))
+        rows.append((f'{label} ConnectionManager', f'{new_us:9.1f} us/call  ({old_us / new_us:.1f}x)'))
+    report(f'connections ({n} calls each)', rows)
+
+
+# ── inbox ─────────────────────────────────────────────────────────────────────
+def seed_inbox(me, partners, per_partner=3):
+    """Seeds one direct conversation per partner. Returns the same messages in
+    the pre-conversation (sender, receiver, message, is_read, timestamp) shape."""
+    base = datetime.now() - timedelta(days=1)
+    legacy_rows = []
+    with main.db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (name, email, password, is_approved, created_at) VALUES (?, ?, 'x', 1, ?)",
+            ((f"Partner {p}", f"p{p}@bench", base) for p in range(partners))
+        )
+        for p in range(partners):
+            other = f"p{p}@bench"
+            c.execute("INSERT INTO conversations (is_group, title, direct_key, created_at) VALUES (0, NULL, ?, ?)",
+                      (main.direct_conversation_key(me, other), base))
+            conv_id = c.lastrowid
+            c.executemany("INSERT INTO conversation_members (conversation_id, email, joined_at) VALUES (?, ?, ?)",
+                          ((conv_id, me, base), (conv_id, other, base)))
+            for k in range(per_partner):
+                sender, receiver = (me, other) if k % 2 else (other, me)
+                ts = base + timedelta(seconds=p * per_partner + k)
+                c.execute("INSERT INTO direct_messages (conversation_id, sender_email, message, timestamp) VALUES (?, ?, ?, ?)",
+                          (conv_id, sender, f"hello {p}/{k}", ts))
+                legacy_rows.append((sender, receiver, f"hello {p}/{k}", 0, ts))
+    return legacy_rows
+
+
+def legacy_inbox_db(partners, rows):
+    """Builds a v2-schema database (receiver_email / is_read columns) holding rows."""
+    path = os.path.join(os.path.dirname(main.DB_FILE), 'legacy.db')
+    conn = sqlite3.connect(path)
+    for target, upgrade in main.SCHEMA_MIGRATIONS:
+        if target <= 2:
+            upgrade(conn.cursor())
+    conn.executemany(
+        "INSERT INTO users (name, email, password, is_approved) VALUES (?, ?, 'x', 1)",
+        ((f"Partner {p}", f"p{p}@bench") for p in range(partners))
+    )
+    conn.executemany(
+        "INSERT INTO direct_messages (sender_email, receiver_email, message, is_read, timestamp) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit(); conn.close()
+    return path
+
+
+def _legacy_inbox(path, email):
+    # get_dm_conversations before the single-query rewrite, plus the
+    # get_unread_count call InboxScreen made for every row
+    conn = sqlite3.connect(path, timeout=10)
+    c = conn.cursor()
+    c.execute("""SELECT other_email, MAX(timestamp) as last_time
+                 FROM (
+                     SELECT receiver_email as other_email, timestamp FROM direct_messages WHERE sender_email=?
+                     UNION ALL
+                     SELECT sender_email as other_email, timestamp FROM direct_messages WHERE receiver_email=?
+                 ) GROUP BY other_email ORDER BY last_time DESC""",
+              (email, email))
+    result = []
+    for other_email, last_time in c.fetchall():
+        c.execute("""SELECT message FROM direct_messages
+                     WHERE (sender_email=? AND receiver_email=?) OR (sender_email=? AND receiver_email=?)
+                     ORDER BY timestamp DESC LIMIT 1""",
+                  (email, other_email, other_email, email))
+        last_msg_row = c.fetchone()
+        c.execute("SELECT name FROM users WHERE email=?", (other_email,))
+        name_row = c.fetchone()
+        other_name = name_row[0] if name_row else other_email
+        unread_conn = sqlite3.connect(path, timeout=10)
+        unread = unread_conn.execute(
+            "SELECT COUNT(*) FROM direct_messages WHERE sender_email=? AND receiver_email=? AND is_read=0",
+            (other_email, email)
+        ).fetchone()[0]
+        unread_conn.close()
+        result.append((other_email, other_name, last_msg_row[0] if last_msg_row else '', last_time, unread))
+    conn.close()
+    return result
+
+
+def bench_inbox(partners=10000, n=5):
+    fresh_db()
+    me = "me@bench"
+    legacy_db = legacy_inbox_db(partners, seed_inbox(me, partners))
+    legacy = _legacy_inbox(legacy_db, me)
+    single = main.get_dm_conversations(me)
+    assert len(legacy) == len(single) == partners, (len(legacy), len(single))
+    old_ms = timed(lambda: _legacy_inbox(legacy_db, me), n) / 1000
+    new_ms = timed(lambda: main.get_dm_conversations(me), n) / 1000
+    report(f'inbox ({partners} conversations, mean of {n})', [
+        ('N+1 queries + per-row connections', f'{old_ms:9.1f} ms'),
+        ('conversation members + last_message_id', f'{new_ms:9.1f} ms  ({old_ms / new_ms:.1f}x)'),
+    ])
+
+
+# ── passwords ─────────────────────────────────────────────────────────────────
+def bench_passwords(costs=(12, 13, 14, 15, 16), n=5):
+    fresh_db()
+    default_cost = main.PASSWORD_HASH_COST
+    rows = []
+    for cost in costs:
+        main.PASSWORD_HASH_COST = cost
+        email = f"cost{cost}@bench"
+        assert main.insert_user(f"Cost {cost}", email, "correct horse", "") is True
+        login_ms = timed(lambda: main.check_user(email, "correct horse"), n) / 1000
+        # What LoginScreen.login costs the UI thread: queueing the job, not running it
+        start = time.perf_counter()
+        future = main.password_worker.submit(main.check_user, email, "correct horse")
+        ui_us = (time.perf_counter() - start) * 1e6
+        assert future.result()
+        mem_mb = 128 * (1 << cost) * main.PASSWORD_SCRYPT_R / 2**20
+        rows.append((f'cost {cost} (N={1 << cost}, {mem_mb:.0f} MB)',
+                     f'login {login_ms:7.1f} ms   UI thread {ui_us:6.1f} us'))
+    main.PASSWORD_HASH_COST = default_cost
+    report(f'password login latency (mean of {n})', rows)
+
+
+# ── writes ────────────────────────────────────────────────────────────────────
+def _commit_per_row(user, text):
+    # save_message before the write queue: one transaction per message
+    try:
+        with main.db.transaction() as c:
+            c.execute("INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)",
+                      (user, text, datetime.now()))
+        return True
+    except: return False
+
+
+def _send_burst(send, count, writers):
+    """Sends count messages from `writers` threads; returns messages/sec."""
+    def run(w):
+        results = [send(f"user{w}", f"message {i}") for i in range(count // writers)]
+        for r in results:
+            assert r is True or r.result() is True
+    threads = [threading.Thread(target=run, args=(w,)) for w in range(writers)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return count / (time.perf_counter() - start)
+
+
+def bench_writes(count=5000):
+    rows = []
+    for writers in (1, 4):
+        fresh_db()
+        old = _send_burst(_commit_per_row, count, writers)
+        new = _send_burst(main.save_message, count, writers)
+        assert main.get_all_messages_count() == 2 * (count // writers) * writers
+        rows.append((f'{writers} writer(s) commit-per-row', f'{old:9.0f} msg/s'))
+        rows.append((f'{writers} writer(s) group commit', f'{new:9.0f} msg/s  ({new / old:.1f}x)'))
+    main.write_queue.close()
+    report(f'writes ({count} chat messages)', rows)
+
+
+# ── search ────────────────────────────────────────────────────────────────────
+def search_vocabulary(size, rng):
+    """`size` distinct lowercase words of 3-9 letters, in a fixed order."""
+    words = {}
+    while len(words) < size:
+        words.setdefault(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))))
+    return list(words)
+
+
+def seed_search(count, vocabulary=20000, words_per_message=8, seed=7):
+    """
+    Chat messages over a synthetic vocabulary, returning (seconds, words by
+    frequency). 'zephyr' appears in 1 row in 20,000.
+    """
+    rng = random.Random(seed)
+    words = search_vocabulary(vocabulary, rng)
+    # Zipf-like weights so a few words are very common, like real chat
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(vocabulary)))
+    base = datetime.now() - timedelta(seconds=count)
+
+    def rows():
+        for i in range(count):
+            text = ' '.join(rng.choices(words, cum_weights=cum_weights, k=words_per_message))
+            if i % 20000 == 0:
+                text += ' zephyr'
+            yield (f"user{i % 50}", text, base + timedelta(seconds=i))
+
+    start = time.perf_counter()
+    with main.db.transaction() as c:
+        c.executemany("INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)", rows())
+    return time.perf_counter() - start, words
+
+
+def bench_search(count=1_000_000, n=20):
+    fresh_db()
+    seed_s, words = seed_search(count)
+    queries = [('rare word', 'zephyr'), ('most common word', words[0]), ('mid word', words[250]),
+               ('two words', f'{words[3]} {words[17]}'), ('prefix (typing)', words[49][:3])]
+    rows = [('seed + index (FTS triggers)', f'{seed_s:9.1f} s')]
+    fts = main.search_fts_enabled
+    for label, text in queries:
+        assert main.search_messages(text), text
+        fts_ms = timed(lambda: main.search_messages(text), n) / 1000
+        main.search_fts_enabled = lambda: False
+        like_ms = timed(lambda: main.search_messages(text), 1) / 1000
+        main.search_fts_enabled = fts
+        rows.append((f"{label} '{text}'", f'FTS5 {fts_ms:8.2f} ms   LIKE scan {like_ms:8.1f} ms'))
+    report(f'search ({count} chat messages, first page of {main.SEARCH_PAGE_SIZE})', rows)
+
+# ── archive ───────────────────────────────────────────────────────────────────
+def seed_old_messages(count, days=60, seed=7):
+    rng = random.Random(seed)
+    words = search_vocabulary(2000, rng)
+    base = datetime.now() - timedelta(days=days)
+    with main.db.transaction() as c:
+        c.executemany(
+            "INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)",
+            ((f"user{i % 25}", ' '.join(rng.choices(words, k=10)), base + timedelta(seconds=i))
+             for i in range(count))
+        )
+
+
+def _worst_writer_stall(cleanup):
+    """Runs cleanup() while another thread commits one message at a time; returns (cleanup s, worst commit ms)."""
+    stop = threading.Event()
+    worst = [0.0]
+    def writer():
+        while not stop.is_set():
+            start = time.perf_counter()
+            _commit_per_row("writer", "still chatting")
+            worst[0] = max(worst[0], time.perf_counter() - start)
+            time.sleep(0.001)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    start = time.perf_counter()
+    cleanup()
+    elapsed = time.perf_counter() - start
+    stop.set(); thread.join()
+    main.db.close()
+    return elapsed, worst[0] * 1000
+
+
+def _single_delete(days):
+    # clear_old_messages before the archive: one DELETE holding the write lock throughout
+    with main.db.transaction() as c:
+        c.execute("DELETE FROM messages WHERE timestamp < datetime('now', ?)", (f'-{days} days',))
+
+
+def bench_archive(count=200_000):
+    rows = []
+    fresh_db()
+    seed_old_messages(count)
+    old_s, old_stall = _worst_writer_stall(lambda: _single_delete(30))
+    rows.append(('single DELETE', f'{old_s:6.2f} s   worst writer stall {old_stall:8.1f} ms'))
+
+    fresh_db()
+    seed_old_messages(count)
+    result = []
+    new_s, new_stall = _worst_writer_stall(lambda: result.append(main.archive_old_messages(30)))
+    messages, dms, reclaimed = result[0]
+    assert messages == count, result
+    rows.append((f'archive, {main.ARCHIVE_BATCH_SIZE}-row batches',
+                 f'{new_s:6.2f} s   worst writer stall {new_stall:8.1f} ms'))
+    raw, packed = main.archive_db.cursor().execute(
+        "SELECT SUM(raw_bytes), SUM(length(body)) FROM message_blocks").fetchone()
+    rows.append(('hot DB bytes reclaimed', f'{reclaimed / 1e6:6.1f} MB'))
+    rows.append(('archived JSON -> zlib', f'{raw / 1e6:6.1f} MB -> {packed / 1e6:.1f} MB ({raw / packed:.1f}x)'))
+    main.archive_db.close_all()
+    report(f'archive ({count} chat messages older than 30 days)', rows)
+
+
+# ── change notifications ──────────────────────────────────────────────────────
+def _run_policy(notifier, active_s, idle_s, every=0.25):
+    """
+    Another connection posts a message every `every` seconds for active_s,
+    then nothing for idle_s. Returns (active checks, idle checks, mean and
+    worst detection latency in ms).
+    """
+    notifier.subscribe('messages', lambda changed: None)
+    other = sqlite3.connect(main.DB_FILE)
+    time.sleep(0.2)
+    latencies = []
+    start_checks = notifier.stats['checks']
+    end = time.perf_counter() + active_s
+    while time.perf_counter() < end:
+        seen = notifier.stats['changes']
+        other.execute("INSERT INTO messages (user_name, message) VALUES ('other', 'hello')")
+        other.commit()
+        sent = time.perf_counter()
+        while notifier.stats['changes'] == seen and time.perf_counter() - sent < 5:
+            time.sleep(0.001)
+        latencies.append(time.perf_counter() - sent)
+        time.sleep(max(every - latencies[-1], 0))
+    active_checks = notifier.stats['checks'] - start_checks
+    time.sleep(idle_s)
+    idle_checks = notifier.stats['checks'] - start_checks - active_checks
+    notifier.close()
+    other.close()
+    return active_checks, idle_checks, sum(latencies) / len(latencies) * 1000, max(latencies) * 1000
+
+
+def bench_notify(active_s=3, idle_s=10):
+    fresh_db()
+    policies = [
+        ('fixed 3 s poll', main.ChangeNotifier(min_interval=3, max_interval=3)),
+        ('fixed 50 ms', main.ChangeNotifier(min_interval=0.05, max_interval=0.05)),
+        ('adaptive 50 ms .. 2 s', main.ChangeNotifier()),
+    ]
+    rows = []
+    for label, notifier in policies:
+        active, idle, mean_ms, worst_ms = _run_policy(notifier, active_s, idle_s)
+        rows.append((label, f'checks active {active:4d}  idle {idle:4d}   '
+                            f'latency mean {mean_ms:7.1f} ms  worst {worst_ms:7.1f} ms'))
+    report(f'change checks ({active_s} s of a message every 250 ms, then {idle_s} s idle)', rows)
+
+
+# ── admin ─────────────────────────────────────────────────────────────────────
+def seed_users(count, seed=7):
+    rng = random.Random(seed)
+    base = datetime.now() - timedelta(minutes=count)
+    with main.db.transaction() as c:
+        # Mostly approved, a few pending or rejected; hashes are irrelevant here
+        c.executemany(
+            "INSERT INTO users (name, email, password, phone, is_approved, created_at) VALUES (?, ?, 'x', '1', ?, ?)",
+            ((''.join(rng.choices(string.ascii_lowercase, k=7)).title(), f"user{i}@bench",
+              rng.choices((1, 0, -1), weights=(90, 8, 2))[0], base + timedelta(minutes=i))
+             for i in range(count)))
+
+
+def _legacy_admin_open():
+    # Three COUNT(*) scans, then every pending and every registered user
+    c = main.db.cursor()
+    for sql in ("SELECT COUNT(*) FROM users WHERE email != ?",
+                "SELECT COUNT(*) FROM users WHERE is_approved=0 AND email != ?"):
+        c.execute(sql, (main.ADMIN_EMAIL,)).fetchone()
+    c.execute("SELECT COUNT(*) FROM messages").fetchone()
+    c.execute("SELECT name, email, created_at FROM users WHERE is_approved=0 AND email != ? ORDER BY created_at DESC",
+              (main.ADMIN_EMAIL,)).fetchall()
+    return len(_legacy_get_users())
+
+
+def _legacy_get_users():
+    c = main.db.cursor()
+    c.execute("SELECT name, email, is_admin, created_at, is_approved FROM users WHERE email != ? ORDER BY created_at DESC",
+              (main.ADMIN_EMAIL,))
+    return c.fetchall()
+
+
+def _admin_open():
+    main.get_admin_stats()
+    pending = main.get_users_page('pending')
+    return len(pending) + len(main.get_users_page())
+
+
+def bench_admin(sizes=(100, 100_000), n=20):
+    rows = []
+    for size in sizes:
+        fresh_db()
+        seed_users(size)
+        seed_messages(size)
+        old_rows, new_rows = _legacy_admin_open(), _admin_open()
+        old_ms = timed(_legacy_admin_open, n) / 1000
+        new_ms = timed(_admin_open, n) / 1000
+        prefix_ms = timed(lambda: main.get_users_page('approved', 'Ma'), n) / 1000
+        rows.append((f'{size:>7} users  full lists + COUNT(*)',
+                     f'{old_ms:8.2f} ms  ({old_rows} rows to build cards for)'))
+        rows.append((f'{size:>7} users  admin_stats + first pages',
+                     f'{new_ms:8.2f} ms  ({new_rows} rows)'))
+        rows.append((f'{size:>7} users  approved, name prefix "Ma"', f'{prefix_ms:8.2f} ms'))
+    report(f'admin panel open (mean of {n})', rows)
+
+
+# ── community ─────────────────────────────────────────────────────────────────
+def _legacy_community_open():
+    # Every user, filtered to the approved ones in Python
+    return len([u for u in _legacy_get_users() if u[4] == 1])
+
+
+def _community_open():
+    main.get_member_count()
+    return len(main.get_members_page())
+
+
+def bench_community(sizes=(100, 100_000), n=20):
+    rows = []
+    for size in sizes:
+        fresh_db()
+        seed_users(size)
+        old_rows, new_rows = _legacy_community_open(), _community_open()
+        old_ms = timed(_legacy_community_open, n) / 1000
+        new_ms = timed(_community_open, n) / 1000
+        rows.append((f'{size:>7} users  get_users + Python filter', f'{old_ms:8.2f} ms  ({old_rows} cards)'))
+        rows.append((f'{size:>7} users  member count + first page', f'{new_ms:8.2f} ms  ({new_rows} rows)'))
+    report(f'community screen open (mean of {n})', rows)
+
+
+# ── picker ────────────────────────────────────────────────────────────────────
+def _legacy_picker_open(me):
+    # Every approved user, one button each
+    c = main.db.cursor()
+    c.execute("SELECT name, email FROM users WHERE email != ? AND email != ? AND is_approved=1 ORDER BY name",
+              (me, main.ADMIN_EMAIL))
+    return len(c.fetchall())
+
+
+def bench_picker(sizes=(100, 100_000), n=20):
+    me = "user0@bench"
+    rows = []
+    for size in sizes:
+        fresh_db()
+        seed_users(size)
+        old_rows = _legacy_picker_open(me)
+        old_ms = timed(lambda: _legacy_picker_open(me), n) / 1000
+        rows.append((f'{size:>7} users  all approved users', f'{old_ms:8.2f} ms  ({old_rows} buttons)'))
+        for prefix in ('', 'm', 'mar', 'user12'):
+            found = len(main.find_approved_users(me, prefix))
+            ms = timed(lambda: main.find_approved_users(me, prefix), n) / 1000
+            rows.append((f'{size:>7} users  typeahead {prefix!r}', f'{ms:8.2f} ms  ({found} rows)'))
+    report(f'new-message picker (mean of {n})', rows)
+
+
+BENCHMARKS = {
+    'connections': bench_connections,
+    'inbox': bench_inbox,
+    'passwords': bench_passwords,
+    'writes': bench_writes,
+    'search': bench_search,
+    'archive': bench_archive,
+    'notify': bench_notify,
+    'admin': bench_admin,
+    'community': bench_community,
+    'picker': bench_picker,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"unknown benchmark '{name}' (choose from: {', '.join(BENCHMARKS)})")
+    for name in names:
+        BENCHMARKS[name]()
+    main.db.close_all()
@@ -0,0 +1,292 @@
+"""
+Sanity checks for the database layer in main.py.
+
+    python check_db.py
+
+Builds a throwaway database through main.setup_db() and asserts that:
+  * a second setup_db() on an up-to-date file runs no migrations,
+  * every hot query is served by the index it was written for, without a
+    temp b-tree sort (checked with EXPLAIN QUERY PLAN), and
+  * the maintained unread counters agree with the messages above each
+    member's read watermark through sends, reads and a member's deletion,
+    and the admin_stats counters agree with COUNT(*) over their tables.
+Exits non-zero if any check fails.
+"""
+import os
+import sys
+import tempfile
+
+import main
+
+
+def fresh_db():
+    main.db.close_all()
+    main.DB_FILE = os.path.join(tempfile.mkdtemp(prefix='userhub_check_'), 'check.db')
+    assert main.setup_db(), "setup_db failed"
+    return main.db.connection()
+
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+# (description, sql, params, expected plan). The SQL is the helper's own
+# statement from main.py. A string names the index that must appear in the
+# plan; a tuple is the whole plan, for queries whose only right answer is a
+# bare rowid-order scan.
+SEARCH = {"match": '"lunch" *', "limit": 20, "offset": 0}
+HOT_QUERIES = [
+    ("get_recent_messages", main.RECENT_MESSAGES_SQL, (50,), ("SCAN messages",)),
+    ("get_messages_before", main.MESSAGES_BEFORE_SQL, (100, 50), "INTEGER PRIMARY KEY"),
+    ("get_messages_since", main.MESSAGES_SINCE_SQL, (0, 200), "INTEGER PRIMARY KEY"),
+    ("get_deleted_message_ids", main.MESSAGE_IDS_SQL, (1, 50), "INTEGER PRIMARY KEY"),
+    ("delete_messages", main.DELETE_MESSAGES_SQL.format(ids=main._in_list(3)), (1, 2, 3),
+     "INTEGER PRIMARY KEY"),
+    ("archive_old_messages (message batch)", main.ARCHIVE_MESSAGE_BATCH_SQL, ("t", 500),
+     "idx_messages_timestamp"),
+    ("archive_old_messages (DM batch)", main.ARCHIVE_DM_BATCH_SQL, ("t", 500), "idx_dm_timestamp"),
+    ("get_dm_page", main._dm_sql(main.DM_KEYSET_BEFORE, "DESC"), (1, "t", "t", 9, 50),
+     "idx_dm_conversation"),
+    ("get_dm_messages_since", main._dm_sql(main.DM_KEYSET_AFTER, "ASC"), (1, "t", "t", 9, 200),
+     "idx_dm_conversation"),
+    ("get_deleted_dm_ids", main.DM_IDS_SQL, (1, 1, 50), "idx_dm_conversation_id"),
+    ("get_dm_conversations", main.DM_CONVERSATIONS_SQL, ("a",), "idx_members_email"),
+    ("get_or_create_direct_conversation", main.DIRECT_CONVERSATION_SQL, ("a|b",),
+     "sqlite_autoindex_conversations_1"),
+    ("get_unread_count", main.UNREAD_COUNT_SQL, (1, "a"), "sqlite_autoindex_conversation_members_1"),
+    ("get_total_unread", main.TOTAL_UNREAD_SQL, ("a",), "PRIMARY KEY"),
+    ("mark_dm_read", main.MARK_DM_READ_SQL, (1, 1, "a"), "sqlite_autoindex_conversation_members_1"),
+    ("delete_user (unread above a read watermark)", main.DISCOUNT_UNREAD_SQL, ("a", 1, "a"),
+     "idx_dm_conversation_id"),
+    ("search_messages", main.SEARCH_MESSAGES_FTS_SQL[0], SEARCH, "messages_fts VIRTUAL TABLE"),
+    ("search_messages (past the rank window)", main.SEARCH_MESSAGES_FTS_SQL[1], SEARCH,
+     "messages_fts VIRTUAL TABLE"),
+    ("search_dms (membership filter)", main.SEARCH_DMS_FTS_SQL[0], dict(SEARCH, email="a"),
+     "sqlite_autoindex_conversation_members_1"),
+    ("search_dms (past the rank window)", main.SEARCH_DMS_FTS_SQL[1], dict(SEARCH, email="a"),
+     "sqlite_autoindex_conversation_members_1"),
+    ("search_timeline", main.SEARCH_TIMELINE_FTS_SQL[0], SEARCH, "timeline_fts VIRTUAL TABLE"),
+    ("search_timeline (past the rank window)", main.SEARCH_TIMELINE_FTS_SQL[1], SEARCH,
+     "timeline_fts VIRTUAL TABLE"),
+    ("get_timeline_posts", main.TIMELINE_POSTS_SQL, ("a",), "idx_timeline_email_ts"),
+    ("get_admin_logs", main.ADMIN_LOGS_SQL, (), "idx_actions_log_timestamp"),
+    ("get_users_page (newest first)", *main._users_page_query(None, '', ("t", 9), 50),
+     "idx_users_created"),
+    ("get_users_page (one status)", *main._users_page_query('pending', '', ("t", 9), 50),
+     "idx_users_status_created"),
+    ("get_users_page (name prefix)", *main._users_page_query(None, 'ab', ("ab", 9), 50),
+     "idx_users_name_nocase"),
+    ("get_users_page (status and name prefix)", *main._users_page_query('approved', 'ab', None, 50),
+     "idx_users_status_name"),
+    ("get_members_page", *main._members_page_query(("ab", 9), 50), "idx_users_status_name"),
+    ("find_approved_users (no prefix)", *main._approved_users_query("me", '', 20),
+     "idx_users_status_name"),
+    ("find_approved_users (name prefix)", *main._approved_users_query("me", 'an', 20),
+     "idx_users_status_name"),
+    ("find_approved_users (email prefix)", *main._approved_users_query("me", 'an', 20),
+     "sqlite_autoindex_users_1"),
+    ("get_user_email", main.USER_EMAIL_SQL, ("a",), "idx_users_name"),
+    ("get_profile_pics", main.PROFILE_PICS_SQL.format(names=main._in_list(2)), ("a", "b"),
+     "idx_users_name"),
+]
+
+
+# The inbox is ordered by each conversation's last-message time, which lives
+# in another table; the sort is over the user's own conversations only. The
+# picker merges its two indexed branches, at most 2 * PICKER_LIMIT rows.
+SORT_ALLOWED = {"get_dm_conversations", "find_approved_users (name prefix)",
+                "find_approved_users (email prefix)"}
+
+
+def check_migrations_idempotent(conn):
+    version = main.get_schema_version(conn)
+    assert version == main.SCHEMA_VERSION, f"user_version {version} != {main.SCHEMA_VERSION}"
+    before = conn.total_changes
+    assert main.setup_db(), "second setup_db failed"
+    assert conn.total_changes == before, "setup_db wrote to an up-to-date database"
+    print(f"ok    schema at v{version}, re-run is a no-op")
+
+
+def check_admin_upgrade(conn):
+    """A pre-v13 database whose admin row lacks is_admin still logs the admin in as admin."""
+    with main.db.transaction() as c:
+        c.execute("UPDATE users SET is_admin=0 WHERE email=?", (main.ADMIN_EMAIL,))
+        c.execute("PRAGMA user_version = 12")
+    assert main.setup_db(), "setup_db failed"
+    user = main.check_user(main.ADMIN_EMAIL, main.ADMIN_PASSWORD)
+    if user != (main.ADMIN_NAME, True, True):
+        print(f"FAIL  admin after the v13 upgrade: {user}")
+        return 1
+    print("ok    admin keeps admin rights through the v13 upgrade")
+    return 0
+
+
+def check_query_plans(conn):
+    failed = 0
+    for desc, sql, params, expected in HOT_QUERIES:
+        plan = query_plan(conn, sql, params)
+        if isinstance(expected, tuple):
+            good = tuple(plan) == expected
+        else:
+            # A hot query must use its index and must never sort in a temp b-tree
+            sorts = any('TEMP B-TREE' in step for step in plan) and desc not in SORT_ALLOWED
+            good = any(expected in step for step in plan) and not sorts
+        if good:
+            print(f"ok    {desc}: {expected}")
+        else:
+            failed += 1
+            print(f"FAIL  {desc}: expected {expected}, got {plan}")
+    return failed
+
+
+# Members whose per-user total differs from the sum of their per-conversation counters
+TOTALS_DRIFT = """SELECT email, SUM(unread), SUM(total) FROM (
+                      SELECT email, unread_count AS unread, 0 AS total FROM conversation_members
+                      UNION ALL SELECT email, 0, total FROM unread_totals)
+                  GROUP BY email HAVING SUM(unread) != SUM(total)"""
+
+# Members whose counter differs from the messages above their read watermark
+WATERMARK_DRIFT = """SELECT conversation_id, email, unread_count, above FROM (
+                         SELECT m.conversation_id, m.email, m.unread_count,
+                                (SELECT COUNT(*) FROM direct_messages dm
+                                 WHERE dm.conversation_id = m.conversation_id AND dm.id > m.last_read_id
+                                   AND dm.sender_email != m.email) AS above
+                         FROM conversation_members m)
+                     WHERE unread_count != above"""
+
+
+def check_unread_counters(conn):
+    """
+    Replays sends, reads and a user deletion against a plain model (the
+    senders of each member's unread messages) and compares it with the
+    counters after every step.
+    """
+    people = ['ann@x', 'bob@x', 'cat@x']
+    direct = main.get_or_create_direct_conversation('ann@x', 'bob@x')
+    group = main.create_group_conversation('ann@x', ['bob@x', 'cat@x'], 'check')
+    members = {direct: ['ann@x', 'bob@x'], group: list(people)}
+    unread = {(conv, email): [] for conv, emails in members.items() for email in emails}
+
+    def send(conv, sender):
+        assert main.send_dm(sender, conv, f'from {sender}').result(), "send_dm failed"
+        for email in members[conv]:
+            if email != sender:
+                unread[(conv, email)].append(sender)
+
+    def read(conv, email):
+        wrote = main.mark_dm_read(email, conv)
+        assert wrote == bool(unread[(conv, email)]), f"mark_dm_read wrote={wrote} with {unread[(conv, email)]}"
+        unread[(conv, email)] = []
+
+    def drift():
+        problems = conn.execute(TOTALS_DRIFT).fetchall() + conn.execute(WATERMARK_DRIFT).fetchall()
+        for (conv, email), senders in unread.items():
+            if main.get_unread_count(email, conv) != len(senders):
+                problems.append((conv, email, main.get_unread_count(email, conv), len(senders)))
+        for email in people:
+            expected = sum(len(s) for (_, em), s in unread.items() if em == email)
+            if main.get_total_unread(email) != expected:
+                problems.append((email, main.get_total_unread(email), expected))
+        return problems
+
+    steps = [
+        lambda: send(direct, 'ann@x'), lambda: send(direct, 'ann@x'), lambda: send(group, 'cat@x'),
+        lambda: send(group, 'bob@x'), lambda: send(group, 'cat@x'), lambda: read(direct, 'bob@x'),
+        lambda: read(direct, 'bob@x'), lambda: send(direct, 'bob@x'), lambda: read(group, 'ann@x'),
+        lambda: send(group, 'cat@x'), lambda: send(group, 'ann@x'),
+    ]
+    failed = 0
+    for n, step in enumerate(steps, 1):
+        step()
+        problems = drift()
+        if problems:
+            failed += 1
+            print(f"FAIL  unread counters after step {n}: {problems}")
+
+    before = conn.total_changes
+    read(direct, 'bob@x')
+    if conn.total_changes != before:
+        failed += 1
+        print("FAIL  mark_dm_read wrote with nothing unread")
+
+    # Archiving moves old read DMs out of the hot table but must leave unread ones
+    with main.db.transaction() as c:
+        c.execute("UPDATE direct_messages SET timestamp = '2000-01-01'")
+    archived = main.archive_old_messages(0)
+    problems = drift()
+    if not archived or not archived[1] or problems:
+        failed += 1
+        print(f"FAIL  unread counters after archiving {archived}: {problems}")
+
+    # cat leaves through account deletion: their group messages stop counting as unread
+    assert main.delete_user('cat@x'), "delete_user failed"
+    members[group].remove('cat@x')
+    unread = {(conv, email): [s for s in senders if s != 'cat@x']
+              for (conv, email), senders in unread.items() if email != 'cat@x'}
+    people.remove('cat@x')
+    problems = drift()
+    if problems:
+        failed += 1
+        print(f"FAIL  unread counters after delete_user: {problems}")
+    if not failed:
+        print(f"ok    unread counters match the messages through {len(steps) + 3} steps")
+    return failed
+
+
+ADMIN_STATS_COUNTS = {
+    'users': ("SELECT COUNT(*) FROM users WHERE email != ?", (main.ADMIN_EMAIL,)),
+    'pending': ("SELECT COUNT(*) FROM users WHERE is_approved=0 AND email != ?", (main.ADMIN_EMAIL,)),
+    'approved': ("SELECT COUNT(*) FROM users WHERE is_approved=1 AND email != ?", (main.ADMIN_EMAIL,)),
+    'messages': ("SELECT COUNT(*) FROM messages", ()),
+}
+
+
+def check_admin_stats(conn):
+    """Drives users and messages through every path that changes them and compares admin_stats with COUNT(*)."""
+    def drift():
+        stats = dict(conn.execute("SELECT name, value FROM admin_stats"))
+        counts = {name: conn.execute(sql, params).fetchone()[0] for name, (sql, params) in ADMIN_STATS_COUNTS.items()}
+        counts['archived'] = main._archived_message_count()
+        return [(name, stats.get(name), n) for name, n in counts.items() if stats.get(name) != n]
+
+    def add_users(*emails):
+        with main.db.transaction() as c:
+            c.executemany("INSERT INTO users (name, email, password, phone) VALUES (?, ?, 'x', '1')",
+                          [(email, email) for email in emails])
+
+    def save(n):
+        for i in range(n):
+            main.save_message('Ann', f'stat {i}')
+        main.write_queue.flush()
+
+    steps = [
+        lambda: add_users('s1@x', 's2@x', 's3@x', 's4@x'),
+        lambda: main.approve_user('s1@x'), lambda: main.reject_user('s2@x'),
+        lambda: main.approve_user('s1@x'), lambda: main.delete_user('s3@x'),
+        lambda: main.delete_user('s1@x'), lambda: main.approve_user(main.ADMIN_EMAIL),
+        lambda: save(5), lambda: main.delete_messages(
+            [row[0] for row in conn.execute("SELECT id FROM messages LIMIT 2")]),
+        lambda: main.archive_old_messages(0), lambda: save(2),
+        lambda: main.clear_all_messages(), lambda: save(3),
+    ]
+    failed = 0
+    for n, step in enumerate(steps, 1):
+        step()
+        problems = drift()
+        if problems:
+            failed += 1
+            print(f"FAIL  admin_stats after step {n}: {problems}")
+    if not failed:
+        print(f"ok    admin_stats match COUNT(*) through {len(steps)} steps")
+    return failed
+
+
+if __name__ == '__main__':
+    conn = fresh_db()
+    check_migrations_idempotent(conn)
+    failures = check_query_plans(conn)
+    failures += check_admin_upgrade(conn)
+    failures += check_unread_counters(conn)
+    failures += check_admin_stats(conn)
+    main.db.close_all()
+    sys.exit(1 if failures else 0)
@@ -1,8 +1,17 @@
 import sqlite3
 import hashlib
+import hmac
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+def verify_password(password, stored_hash):
+    # Same two formats main.verify_password accepts: salted scrypt, or a
+    # legacy bare SHA-256 digest that has not been upgraded by a login yet
+    if '$' not in stored_hash:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored_hash)
+    scheme, cost, r, p, salt, key = stored_hash.split('$')
+    n = 1 << int(cost)
+    derived = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=n, r=int(r), p=int(p),
+                             maxmem=2 * 128 * n * int(r) * int(p), dklen=32)
+    return hmac.compare_digest(derived.hex(), key)
 
 conn = sqlite3.connect('app_data.db')
 c = conn.cursor()
@@ -24,11 +33,11 @@ result = c.fetchone()
 
 if result:
     stored_hash = result[1]
-    entered_hash = hash_password(password)
-    
+    scheme = stored_hash.split('$')[0] if '$' in stored_hash else 'sha256 (legacy)'
+
     print(f"\nStored hash:  {stored_hash[:20]}...")
-    print(f"Entered hash: {entered_hash[:20]}...")
-    print(f"Match: {stored_hash == entered_hash}")
+    print(f"Scheme:       {scheme}")
+    print(f"Match: {verify_password(password, stored_hash)}")
 else:
     print(f"\nEmail not found!")
 
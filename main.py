@@ -8,18 +8,39 @@ from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
 from kivy.core.window import Window
 from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.clock import Clock
 from kivy.uix.image import Image
 from kivy.uix.filechooser import FileChooserIconView
 from kivy.uix.popup import Popup
 from kivy.uix.widget import Widget
 from kivy.graphics import Color, Rectangle, RoundedRectangle, Ellipse, Line
+from kivy.graphics.texture import Texture
+from kivy.core.image import ImageData, ImageLoader
 from kivy.metrics import dp
+from kivy.utils import escape_markup
+from kivy.properties import BooleanProperty, NumericProperty, StringProperty
 import sqlite3
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
-import shutil
+import hmac
+import io
+import json
+import threading
+import queue
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:  # Pillow comes with kivy[base]; without it pictures are kept as uploaded
+    PILImage = None
 
 # ── Blue + Teal Ocean Palette ──────────────────────────────────────────────────
 PRIMARY       = (0.10, 0.38, 0.78, 1)
@@ -65,11 +86,23 @@ current_user_email  = None
 is_admin            = False
 is_approved         = False
 user_color_map      = {}
-dm_target_email     = None
+dm_conversation_id  = None
 dm_target_name      = None
 
 DB_FILE = os.path.join(os.path.expanduser('~'), 'Documents', 'user_app_database.db')
 PROFILE_PICS_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'user_app_profile_pics')
+CHAT_PAGE_SIZE = 50
+CHAT_ROW_HEIGHT = 72
+DM_PAGE_SIZE = 50
+DM_ROW_HEIGHT = 70
+ADMIN_PAGE_SIZE = 50
+USER_ROW_HEIGHT = 64
+MEMBER_PAGE_SIZE = 50
+MEMBER_ROW_HEIGHT = 68
+PICKER_LIMIT = 20
+PICKER_DEBOUNCE = 0.25
+PROFILE_THUMB_SIZES = (64, 128, 256)   # square edges in px, smallest first
+AVATAR_CACHE_SIZE = 128                # (user, size) textures kept by avatar_cache
 
 if not os.path.exists(PROFILE_PICS_DIR):
     os.makedirs(PROFILE_PICS_DIR)
@@ -85,11 +118,927 @@ def get_user_color(user_name):
     return assign_user_color(user_name)
 
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# ── Password Hashing ──────────────────────────────────────────────────────────
+# Stored as "scrypt$<cost>$<r>$<p>$<salt hex>$<key hex>", where cost is log2 of
+# scrypt's N. Rows written before this format hold a bare unsalted SHA-256 hex
+# digest; check_user upgrades them on the next successful login. Raising
+# PASSWORD_HASH_COST upgrades older scrypt hashes the same way.
+PASSWORD_HASH_COST = 14     # N = 16384: 16 MB and ~70 ms per hash on a desktop CPU
+PASSWORD_SCRYPT_R  = 8
+PASSWORD_SCRYPT_P  = 1
+
+def _scrypt(password, salt, cost, r, p):
+    n = 1 << cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=32)
+
+def hash_password(password, cost=None):
+    cost = PASSWORD_HASH_COST if cost is None else cost
+    r, p = PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+    salt = os.urandom(16)
+    return f"scrypt${cost}${r}${p}${salt.hex()}${_scrypt(password, salt, cost, r, p).hex()}"
 
 def verify_password(password, hashed):
-    return hash_password(password) == hashed
+    if not hashed:
+        return False
+    if '$' not in hashed:
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed)
+    try:
+        scheme, cost, r, p, salt, key = hashed.split('$')
+        if scheme != 'scrypt':
+            return False
+        derived = _scrypt(password, bytes.fromhex(salt), int(cost), int(r), int(p))
+    except (ValueError, MemoryError):
+        return False
+    return hmac.compare_digest(derived.hex(), key)
+
+def password_needs_rehash(hashed):
+    current = f"scrypt${PASSWORD_HASH_COST}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    return not hashed.startswith(current)
+
+# ── Database Connection Manager ───────────────────────────────────────────────
+class ConnectionManager:
+    """One long-lived sqlite3 connection per thread, its PRAGMAs applied once."""
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-8000",      # ~8 MB page cache per connection
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    def __init__(self, timeout=10, cached_statements=256, path=None):
+        self.timeout = timeout
+        self._path = path or (lambda: DB_FILE)
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def connection(self):
+        # The path is re-read on every call so tools can point the app at another file
+        path = self._path()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.db_file == path:
+            return conn
+        if conn is not None:
+            self._forget(conn)
+        conn = sqlite3.connect(path, timeout=self.timeout,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.db_file = path
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor; commits on success, rolls back on any error."""
+        conn = self.connection()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+
+    def _forget(self, conn):
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        try: conn.close()
+        except: pass
+
+    def close(self):
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            self._forget(conn)
+
+    def close_all(self):
+        """Close every connection (app exit, or before the DB file is replaced)."""
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try: conn.close()
+            except: pass
+        self._local = threading.local()
+
+
+db = ConnectionManager()
+
+
+def archive_file():
+    """Archived chat and DM history lives in a second file next to DB_FILE."""
+    return os.path.splitext(DB_FILE)[0] + '_archive.db'
+
+archive_db = ConnectionManager(path=archive_file)
+
+
+# ── Background Database Worker ────────────────────────────────────────────────
+class DBWorker:
+    """Runs data-layer calls off the UI thread; one thread (the default) runs them in submission order."""
+    def __init__(self, workers=1, name='db-worker'):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Queues fn(*args, **kwargs); on_done(result) / on_error(exc) run on the UI thread."""
+        future = self._pool.submit(fn, *args, **kwargs)
+        if on_done or on_error:
+            future.add_done_callback(
+                lambda f: Clock.schedule_once(lambda dt: self._deliver(f, on_done, on_error))
+            )
+        return future
+
+    @staticmethod
+    def _deliver(future, on_done, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if on_done: on_done(future.result())
+        elif on_error:
+            on_error(error)
+        else:
+            print(f"DB worker error: {error}")
+
+    def shutdown(self):
+        """Finish queued writes, then stop the thread (app exit)."""
+        self._pool.shutdown(wait=True)
+
+
+db_worker = DBWorker()
+# Login and registration run the password KDF, which would otherwise hold up
+# every chat/DM poll queued behind it. hashlib.scrypt releases the GIL, so
+# these threads hash in parallel with the UI and with db_worker.
+password_worker = DBWorker(workers=2, name='password-worker')
+# Decoding and downscaling an uploaded photo takes long enough to stall the
+# polls on db_worker. Pillow drops the GIL while it decodes and resamples.
+image_worker = DBWorker(name='image-worker')
+
+# setup_db's Future, once MyApp.build has queued it on db_worker
+db_setup = None
+
+def after_setup(fn, *args):
+    """Calls fn(*args) once setup_db has finished; for jobs that don't queue behind it on db_worker."""
+    if db_setup is not None:
+        db_setup.result()
+    return fn(*args)
+
+
+# ── Group-Commit Write Queue ──────────────────────────────────────────────────
+class WriteQueue:
+    """Commits queued small INSERTs in one transaction per max_batch rows or max_delay seconds."""
+    def __init__(self, max_batch=256, max_delay=0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, sql, params=(), on_done=None):
+        """Queues one write. The Future resolves to True once committed, False if the write failed."""
+        future = Future()
+        if on_done:
+            future.add_done_callback(
+                lambda f: Clock.schedule_once(lambda dt: DBWorker._deliver(f, on_done, None))
+            )
+        self._start()
+        self._queue.put((sql, params, future))
+        return future
+
+    def flush(self):
+        """Blocks until everything queued so far has been committed; never call it on the UI thread."""
+        if self._thread is None:
+            return
+        barrier = Future()
+        self._queue.put((None, None, barrier))
+        barrier.result()
+
+    def close(self):
+        """Flush and stop the writer thread (app exit)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            # A flush barrier commits straight away instead of waiting out the window
+            while item[0] is not None and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(batch)
+                    return
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with db.transaction() as c:
+                for sql, params, future in batch:
+                    if sql is None:
+                        results.append((future, True)); continue
+                    # A failed INSERT only rolls back its own statement, not the batch
+                    try:
+                        c.execute(sql, params)
+                        results.append((future, True))
+                    except sqlite3.Error as e:
+                        print(f"write queue error: {e}")
+                        results.append((future, False))
+        except Exception as e:
+            print(f"write queue commit error: {e}")
+            results = [(future, False) for _, _, future in batch]
+        for future, ok in results:
+            future.set_result(ok)
+        # Tell the watcher now rather than at its next tick
+        change_notifier.wake()
+
+
+write_queue = WriteQueue()
+
+
+# ── Change Notifications ──────────────────────────────────────────────────────
+class ChangeNotifier:
+    """Calls subscribers on the UI thread when a commit touches their tables (per change_counters)."""
+    def __init__(self, min_interval=0.05, max_interval=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.focused = True
+        self.paused = False
+        self.stats = {'checks': 0, 'changes': 0, 'events': 0}
+        self._subscribers = {}      # token -> (tables, callback)
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, tables, callback):
+        """callback(changed_tables) runs after a commit touches any of `tables`. Returns a token."""
+        tables = frozenset([tables] if isinstance(tables, str) else tables)
+        with self._lock:
+            self._tokens += 1
+            token = self._tokens
+            self._subscribers[token] = (tables, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-notifier', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def wake(self):
+        """Check for changes now (called after an in-process commit)."""
+        self._wake.set()
+
+    def pause(self):
+        """Stop checking until resume() (app sent to the background)."""
+        self.paused = True
+
+    def resume(self):
+        """Start checking again with one immediate catch-up check."""
+        self.paused = False
+        self._wake.set()
+
+    def set_focused(self, focused):
+        self.focused = focused
+        if focused:
+            self._wake.set()
+
+    def close(self):
+        """Stop the watcher thread (app exit)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+
+    def _fastest(self):
+        return self.min_interval if self.focused else self.max_interval
+
+    def _run(self):
+        me = threading.current_thread()
+        conn = version = counters = None
+        interval = self._fastest()
+        while self._thread is me:
+            # Paused, or nobody subscribed: nothing to check until resume(), subscribe() or wake()
+            idle = self.paused or not self._subscribers
+            woken = self._wake.wait(None if idle else interval)
+            self._wake.clear()
+            if self.paused or self._thread is not me:
+                continue
+            # Fastest again after any activity, then doubling on every quiet check
+            interval = self._fastest() if woken else min(max(interval * 2, self._fastest()), self.max_interval)
+            self.stats['checks'] += 1
+            try:
+                now_conn = db.connection()
+                # Only moves when another connection commits, and reads no pages.
+                # fetchall() so no statement is left open holding an old read snapshot
+                now_version = now_conn.execute("PRAGMA data_version").fetchall()[0][0]
+                if now_conn is conn and now_version == version:
+                    continue
+                current = dict(now_conn.execute("SELECT table_name, version FROM change_counters").fetchall())
+            except sqlite3.Error:
+                continue
+            # The first read (or a switch to another DB file) is only a baseline
+            changed = set() if now_conn is not conn else {
+                table for table, v in current.items() if counters.get(table) != v}
+            conn, version, counters = now_conn, now_version, current
+            if changed:
+                self.stats['changes'] += 1
+                interval = self._fastest()
+                with self._lock:
+                    targets = [(token, tables & changed) for token, (tables, _) in self._subscribers.items()
+                               if tables & changed]
+                for token, hit in targets:
+                    self.stats['events'] += 1
+                    Clock.schedule_once(lambda dt, token=token, hit=hit: self._deliver(token, hit))
+        db.close()
+
+    def _deliver(self, token, changed):
+        # Dropped if the screen unsubscribed after the event was queued
+        with self._lock:
+            subscriber = self._subscribers.get(token)
+        if subscriber:
+            subscriber[1](changed)
+
+
+change_notifier = ChangeNotifier()
+
+
+# ── Refresh Scheduler ─────────────────────────────────────────────────────────
+class RefreshJob:
+    def __init__(self, owner, name, fetch, on_done, args, tables, interval):
+        self.owner, self.name = owner, name
+        self.fetch, self.on_done, self.args = fetch, on_done, args
+        self.tables = frozenset(tables)
+        self.interval = interval
+        self.next_run = time.monotonic() + interval if interval else None
+        self.due = False
+        self.retry_at = 0.0         # args() said "not ready"; look again from this time
+        self.running = False
+        self.runs = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+
+class RefreshScheduler:
+    """Every screen's background refresh: jobs keyed by (owner, name), run when their tables change or on an interval."""
+    retry_delay = 0.1   # seconds before asking a not-ready job's args() again
+
+    def __init__(self):
+        self._jobs = {}             # (owner, name) -> RefreshJob
+        self._changes = None        # change_notifier token while any job watches a table
+        self._watched = frozenset()
+        self.ticks = 0
+
+    def register(self, owner, name, fetch, on_done, args=None, tables=(), interval=None, run_now=False):
+        """
+        fetch(*args()) runs on the DB worker and on_done(result) on the UI
+        thread. args is read on the UI thread when the job is due; returning
+        None keeps the job due and asks again after retry_delay.
+        """
+        job = RefreshJob(owner, name, fetch, on_done, args, tables, interval)
+        job.due = run_now
+        old = self._jobs.get((owner, name))
+        if old:
+            # Stats follow the name, not the object, so they survive a re-entered screen
+            job.runs, job.total_ms, job.last_ms = old.runs, old.total_ms, old.last_ms
+        self._jobs[(owner, name)] = job
+        self._watch()
+        self._arm()
+
+    def trigger(self, owner, name):
+        job = self._jobs.get((owner, name))
+        if job:
+            job.due = True
+            self._arm()
+
+    def cancel(self, owner, name=None):
+        """Drops one job, or every job the owner registered (a screen's on_leave)."""
+        for key in [k for k in self._jobs if k[0] == owner and name in (None, k[1])]:
+            del self._jobs[key]
+        self._watch()
+
+    def stats(self):
+        """{'owner.name': (runs, total ms, last ms)} for every registered job."""
+        return {f"{job.owner}.{job.name}": (job.runs, round(job.total_ms, 2), round(job.last_ms, 2))
+                for job in self._jobs.values()}
+
+    def _watch(self):
+        """Keeps one change_notifier subscription covering the tables jobs watch."""
+        tables = frozenset().union(*(job.tables for job in self._jobs.values()))
+        if tables == self._watched:
+            return
+        if self._changes is not None:
+            change_notifier.unsubscribe(self._changes)
+            self._changes = None
+        if tables:
+            self._changes = change_notifier.subscribe(tables, self._on_changed)
+        self._watched = tables
+
+    def _on_changed(self, tables):
+        for job in self._jobs.values():
+            if job.tables & tables:
+                job.due = True
+        self._arm()
+
+    def _arm(self):
+        """Schedules the next tick for the soonest due job, if there is one."""
+        Clock.unschedule(self._tick)
+        now = time.monotonic()
+        waits = [max(job.retry_at, now if job.due else job.next_run) - now
+                 for job in self._jobs.values()
+                 if not job.running and (job.due or job.interval)]
+        if waits:
+            Clock.schedule_once(self._tick, max(min(waits), 0))
+
+    def _tick(self, dt):
+        now = time.monotonic()
+        batch = []
+        for job in self._jobs.values():
+            if job.running or now < job.retry_at or not (job.due or (job.interval and now >= job.next_run)):
+                continue
+            args = job.args() if job.args else ()
+            if args is None:
+                # The screen is not ready (first page still loading): keep the
+                # change pending rather than lose it
+                job.retry_at = now + self.retry_delay
+                continue
+            job.due = False
+            if job.interval:
+                job.next_run = now + job.interval
+            job.running = True
+            batch.append((job, args))
+        if batch:
+            self.ticks += 1
+            db_worker.submit(self._run_batch, batch, on_done=self._finish)
+        self._arm()
+
+    @staticmethod
+    def _run_batch(batch):
+        results = []
+        for job, args in batch:
+            start = time.perf_counter()
+            try:
+                result, error = job.fetch(*args), None
+            except Exception as e:
+                result, error = None, e
+            job.last_ms = (time.perf_counter() - start) * 1000
+            job.total_ms += job.last_ms
+            job.runs += 1
+            results.append((job, result, error))
+        return results
+
+    def _finish(self, results):
+        for job, result, error in results:
+            job.running = False
+            # A job cancelled or replaced while it ran has nobody to report to
+            if self._jobs.get((job.owner, job.name)) is not job:
+                continue
+            if error is not None:
+                print(f"refresh job {job.owner}.{job.name} error: {error}")
+            else:
+                job.on_done(result)
+        self._arm()
+
+
+refresh_scheduler = RefreshScheduler()
+
+
+# ── Schema Migrations ─────────────────────────────────────────────────────────
+# The schema version lives in PRAGMA user_version. Each entry below upgrades
+# the database by exactly one version and runs inside its own transaction, so
+# a launch against an up-to-date database only reads user_version.
+def _add_missing_columns(c, table, columns):
+    # SQLite ALTER TABLE cannot accept non-constant defaults like
+    # CURRENT_TIMESTAMP, so date columns added here default to NULL and are
+    # back-filled by the caller.
+    c.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in c.fetchall()}
+    for name, decl in columns:
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+def _schema_v1(c):
+    """Base tables, plus the columns that older databases were missing."""
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL, email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL, phone TEXT,
+        is_admin INTEGER DEFAULT 0,
+        is_approved INTEGER DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    _add_missing_columns(c, 'users', [
+        ('is_admin', 'INTEGER DEFAULT 0'),
+        ('is_approved', 'INTEGER DEFAULT 1'),
+        ('phone', 'TEXT'),
+        ('created_at', 'DATETIME'),
+    ])
+    c.execute("UPDATE users SET created_at = datetime('now') WHERE created_at IS NULL")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL, message TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS profiles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL, bio TEXT,
+        profile_pic TEXT, join_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(email) REFERENCES users(email))''')
+    _add_missing_columns(c, 'profiles', [
+        ('bio', 'TEXT'),
+        ('profile_pic', 'TEXT'),
+        ('join_date', 'DATETIME'),
+    ])
+
+    c.execute('''CREATE TABLE IF NOT EXISTS timeline_posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL, post_text TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(email) REFERENCES users(email))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS user_actions_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_email TEXT NOT NULL,
+        action TEXT NOT NULL,
+        target_user TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS direct_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sender_email TEXT NOT NULL,
+        receiver_email TEXT NOT NULL,
+        message TEXT NOT NULL,
+        is_read INTEGER DEFAULT 0,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    c.execute("SELECT id FROM users WHERE email=?", (ADMIN_EMAIL,))
+    if not c.fetchone():
+        c.execute(
+            "INSERT INTO users (name, email, password, phone, is_admin, is_approved, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ADMIN_NAME, ADMIN_EMAIL, hash_password(ADMIN_PASSWORD), "0000000000", 1, 1, datetime.now())
+        )
+
+def _schema_v2(c):
+    """The first round of indexes, each named after the query that reads it today."""
+    # archive_old_messages' message batch: WHERE timestamp < ? ORDER BY timestamp
+    c.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp)")
+    # Over the old sender/receiver columns; dropped with that table in v3
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_pair ON direct_messages(sender_email, receiver_email, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_receiver ON direct_messages(receiver_email, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_unread ON direct_messages(receiver_email, sender_email) WHERE is_read=0")
+    # get_timeline_posts: WHERE email=? ORDER BY timestamp DESC
+    c.execute("CREATE INDEX IF NOT EXISTS idx_timeline_email_ts ON timeline_posts(email, timestamp)")
+    # get_admin_logs: ORDER BY timestamp DESC LIMIT 20
+    c.execute("CREATE INDEX IF NOT EXISTS idx_actions_log_timestamp ON user_actions_log(timestamp)")
+    # get_users_page newest-first over every status
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at)")
+    # No longer read: the pending list pages through idx_users_status_created (v10)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_pending ON users(created_at) WHERE is_approved=0")
+    # get_user_email / get_profile_pics: WHERE name = ?
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_name ON users(name)")
+
+def _schema_v3(c):
+    """
+    Direct messages keyed by conversation. A conversation has two or more
+    members; 1:1 conversations are found through their unique direct_key.
+    The last-message pointer and per-member unread counters are kept
+    current by triggers, so nothing is recomputed from raw rows on read.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        is_group INTEGER NOT NULL DEFAULT 0,
+        title TEXT,
+        direct_key TEXT UNIQUE,
+        last_message_id INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS conversation_members (
+        conversation_id INTEGER NOT NULL REFERENCES conversations(id),
+        email TEXT NOT NULL,
+        unread_count INTEGER NOT NULL DEFAULT 0,
+        joined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (conversation_id, email))''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_email ON conversation_members(email, conversation_id)")
+
+    # One direct conversation per pair that has ever exchanged a message
+    c.execute("""SELECT DISTINCT MIN(sender_email, receiver_email), MAX(sender_email, receiver_email)
+                 FROM direct_messages""")
+    for low, high in c.fetchall():
+        c.execute("INSERT INTO conversations (is_group, direct_key) VALUES (0, ?)", (f"{low}|{high}",))
+        conv_id = c.lastrowid
+        c.executemany("INSERT OR IGNORE INTO conversation_members (conversation_id, email) VALUES (?, ?)",
+                      [(conv_id, low), (conv_id, high)])
+
+    # Carry unread state over from the per-row is_read flags
+    c.execute("""SELECT receiver_email, MIN(sender_email, receiver_email) || '|' || MAX(sender_email, receiver_email),
+                        COUNT(*)
+                 FROM direct_messages WHERE is_read = 0 GROUP BY 1, 2""")
+    c.executemany("""UPDATE conversation_members SET unread_count = ?
+                     WHERE email = ? AND conversation_id = (SELECT id FROM conversations WHERE direct_key = ?)""",
+                  [(count, receiver, key) for receiver, key, count in c.fetchall()])
+
+    # SQLite can't change a table's columns in place, so rebuild direct_messages
+    # around conversation_id; the pair indexes go with the old table.
+    c.execute('''CREATE TABLE direct_messages_v3 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id INTEGER NOT NULL REFERENCES conversations(id),
+        sender_email TEXT NOT NULL,
+        message TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute("""INSERT INTO direct_messages_v3 (id, conversation_id, sender_email, message, timestamp)
+                 SELECT dm.id, cv.id, dm.sender_email, dm.message, dm.timestamp
+                 FROM direct_messages dm
+                 JOIN conversations cv ON cv.direct_key = MIN(dm.sender_email, dm.receiver_email)
+                                                          || '|' || MAX(dm.sender_email, dm.receiver_email)""")
+    c.execute("DROP TABLE direct_messages")
+    c.execute("ALTER TABLE direct_messages_v3 RENAME TO direct_messages")
+    c.execute("CREATE INDEX idx_dm_conversation ON direct_messages(conversation_id, timestamp)")
+    c.execute("CREATE INDEX idx_dm_sender ON direct_messages(sender_email)")
+
+    c.execute("""UPDATE conversations SET last_message_id = (
+                     SELECT id FROM direct_messages WHERE conversation_id = conversations.id
+                     ORDER BY timestamp DESC, id DESC LIMIT 1)""")
+
+    c.execute("""CREATE TRIGGER trg_dm_after_insert AFTER INSERT ON direct_messages BEGIN
+                     UPDATE conversations SET last_message_id = NEW.id WHERE id = NEW.conversation_id;
+                     UPDATE conversation_members SET unread_count = unread_count + 1
+                      WHERE conversation_id = NEW.conversation_id AND email != NEW.sender_email;
+                 END""")
+    c.execute("""CREATE TRIGGER trg_dm_after_delete AFTER DELETE ON direct_messages BEGIN
+                     UPDATE conversations SET last_message_id = (
+                         SELECT id FROM direct_messages WHERE conversation_id = OLD.conversation_id
+                         ORDER BY timestamp DESC, id DESC LIMIT 1)
+                      WHERE id = OLD.conversation_id AND last_message_id = OLD.id;
+                 END""")
+
+# (FTS5 table, content table, indexed column) for full-text search
+FTS_TABLES = (
+    ('messages_fts', 'messages', 'message'),
+    ('dm_fts', 'direct_messages', 'message'),
+    ('timeline_fts', 'timeline_posts', 'post_text'),
+)
+
+def _schema_v4(c):
+    """External-content FTS5 indexes over chat, DM and timeline text, kept in step by triggers."""
+    if not c.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        # Builds without FTS5 still migrate; search falls back to LIKE scans
+        return
+    for fts, table, column in FTS_TABLES:
+        # prefix='2 3' indexes short prefixes so search-as-you-type stays an index lookup
+        c.execute(f"""CREATE VIRTUAL TABLE {fts} USING fts5(
+                          {column}, content='{table}', content_rowid='id', prefix='2 3')""")
+        c.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+        c.execute(f"""CREATE TRIGGER trg_{fts}_insert AFTER INSERT ON {table} BEGIN
+                          INSERT INTO {fts}(rowid, {column}) VALUES (NEW.id, NEW.{column});
+                      END""")
+        c.execute(f"""CREATE TRIGGER trg_{fts}_delete AFTER DELETE ON {table} BEGIN
+                          INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                      END""")
+        c.execute(f"""CREATE TRIGGER trg_{fts}_update AFTER UPDATE OF {column} ON {table} BEGIN
+                          INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                          INSERT INTO {fts}(rowid, {column}) VALUES (NEW.id, NEW.{column});
+                      END""")
+
+def _schema_v5(c):
+    """Index for archive_old_messages' oldest-first walk over direct_messages."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_timestamp ON direct_messages(timestamp)")
+
+# Tables whose writes are announced to the UI through change_notifier
+# (v6; profiles joins them in v12)
+WATCHED_TABLES = ('messages', 'direct_messages', 'conversations', 'conversation_members',
+                  'timeline_posts', 'users', 'user_actions_log')
+
+def _schema_v6(c):
+    """
+    A version counter per watched table, bumped by triggers on every insert,
+    update and delete, so ChangeNotifier can tell which tables a commit touched.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS change_counters (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''')
+    _count_changes(c, WATCHED_TABLES)
+
+def _count_changes(c, tables):
+    """Adds change_counters rows for `tables` and the triggers that bump them."""
+    c.executemany("INSERT OR IGNORE INTO change_counters (table_name) VALUES (?)",
+                  [(table,) for table in tables])
+    for table in tables:
+        for op in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f"""CREATE TRIGGER trg_{table}_changed_{op.lower()} AFTER {op} ON {table} BEGIN
+                              UPDATE change_counters SET version = version + 1 WHERE table_name = '{table}';
+                          END""")
+
+def _schema_v7(c):
+    """
+    Per-user unread totals, kept equal to the sum of the user's per-conversation
+    counters by triggers on conversation_members, so the inbox badge is one
+    primary-key lookup however many conversations the user is in.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS unread_totals (
+        email TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''')
+    c.execute("""INSERT INTO unread_totals (email, total)
+                 SELECT email, SUM(unread_count) FROM conversation_members
+                 GROUP BY email HAVING SUM(unread_count) != 0""")
+    c.execute("""CREATE TRIGGER trg_members_unread_insert AFTER INSERT ON conversation_members
+                 WHEN NEW.unread_count != 0 BEGIN
+                     INSERT INTO unread_totals (email, total) VALUES (NEW.email, NEW.unread_count)
+                     ON CONFLICT(email) DO UPDATE SET total = total + excluded.total;
+                 END""")
+    c.execute("""CREATE TRIGGER trg_members_unread_update AFTER UPDATE OF unread_count ON conversation_members
+                 WHEN NEW.unread_count != OLD.unread_count BEGIN
+                     INSERT INTO unread_totals (email, total) VALUES (NEW.email, NEW.unread_count - OLD.unread_count)
+                     ON CONFLICT(email) DO UPDATE SET total = total + excluded.total;
+                 END""")
+    c.execute("""CREATE TRIGGER trg_members_unread_delete AFTER DELETE ON conversation_members
+                 WHEN OLD.unread_count != 0 BEGIN
+                     UPDATE unread_totals SET total = total - OLD.unread_count WHERE email = OLD.email;
+                 END""")
+
+def _schema_v8(c):
+    """
+    A read watermark per member: the id of the newest message they have seen.
+    unread_count is then exactly the number of other members' messages above
+    it. Existing read state (carried over from the old is_read flags into
+    unread_count by v3) becomes the watermark just below the unread ones.
+    """
+    _add_missing_columns(c, 'conversation_members', [('last_read_id', 'INTEGER NOT NULL DEFAULT 0')])
+    c.execute("SELECT conversation_id, email, unread_count FROM conversation_members")
+    marks = []
+    for conv_id, email, unread in c.fetchall():
+        c.execute("""SELECT id FROM direct_messages WHERE conversation_id=? AND sender_email != ?
+                     ORDER BY id DESC LIMIT 1 OFFSET ?""", (conv_id, email, unread))
+        row = c.fetchone()
+        if row:
+            marks.append((row[0], conv_id, email))
+    c.executemany("UPDATE conversation_members SET last_read_id=? WHERE conversation_id=? AND email=?", marks)
+    # Range counts above a watermark: _discount_unread_from and check_db's consistency check
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_conversation_id ON direct_messages(conversation_id, id)")
+
+def _schema_v9(c):
+    """
+    The Admin panel's headline numbers (users, pending approvals, chat
+    messages) as rows of admin_stats, adjusted by triggers on users and
+    messages so reading them never counts a table.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS admin_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''')
+    c.execute("INSERT OR REPLACE INTO admin_stats VALUES ('users', (SELECT COUNT(*) FROM users WHERE email != ?))",
+              (ADMIN_EMAIL,))
+    c.execute("""INSERT OR REPLACE INTO admin_stats VALUES ('pending',
+                     (SELECT COUNT(*) FROM users WHERE is_approved=0 AND email != ?))""", (ADMIN_EMAIL,))
+    c.execute("INSERT OR REPLACE INTO admin_stats VALUES ('messages', (SELECT COUNT(*) FROM messages))")
+
+    # Triggers can't take parameters, so the admin's address is inlined as a literal
+    admin = "'" + ADMIN_EMAIL.replace("'", "''") + "'"
+    c.execute(f"""CREATE TRIGGER trg_users_stats_insert AFTER INSERT ON users
+                  WHEN NEW.email != {admin} BEGIN
+                      UPDATE admin_stats SET value = value + 1 WHERE name = 'users';
+                      UPDATE admin_stats SET value = value + 1 WHERE name = 'pending' AND NEW.is_approved = 0;
+                  END""")
+    c.execute(f"""CREATE TRIGGER trg_users_stats_delete AFTER DELETE ON users
+                  WHEN OLD.email != {admin} BEGIN
+                      UPDATE admin_stats SET value = value - 1 WHERE name = 'users';
+                      UPDATE admin_stats SET value = value - 1 WHERE name = 'pending' AND OLD.is_approved = 0;
+                  END""")
+    c.execute(f"""CREATE TRIGGER trg_users_stats_update AFTER UPDATE OF is_approved, email ON users
+                  WHEN NEW.is_approved IS NOT OLD.is_approved OR NEW.email != OLD.email BEGIN
+                      UPDATE admin_stats SET value = value + (NEW.email != {admin}) - (OLD.email != {admin})
+                       WHERE name = 'users';
+                      UPDATE admin_stats
+                         SET value = value + (NEW.is_approved = 0 AND NEW.email != {admin})
+                                           - (OLD.is_approved = 0 AND OLD.email != {admin})
+                       WHERE name = 'pending';
+                  END""")
+    c.execute("""CREATE TRIGGER trg_messages_stats_insert AFTER INSERT ON messages BEGIN
+                     UPDATE admin_stats SET value = value + 1 WHERE name = 'messages';
+                 END""")
+    c.execute("""CREATE TRIGGER trg_messages_stats_delete AFTER DELETE ON messages BEGIN
+                     UPDATE admin_stats SET value = value - 1 WHERE name = 'messages';
+                 END""")
+
+def _schema_v10(c):
+    """Indexes for get_users_page: newest-first or by name, each optionally within one status."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_status_created ON users(is_approved, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users(name COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_status_name ON users(is_approved, name COLLATE NOCASE)")
+
+def _schema_v11(c):
+    """An 'approved' row in admin_stats, so the Community screen's member count is a single read."""
+    c.execute("""INSERT OR REPLACE INTO admin_stats VALUES ('approved',
+                     (SELECT COUNT(*) FROM users WHERE is_approved=1 AND email != ?))""", (ADMIN_EMAIL,))
+    admin = "'" + ADMIN_EMAIL.replace("'", "''") + "'"
+    c.execute(f"""CREATE TRIGGER trg_users_approved_insert AFTER INSERT ON users
+                  WHEN NEW.is_approved = 1 AND NEW.email != {admin} BEGIN
+                      UPDATE admin_stats SET value = value + 1 WHERE name = 'approved';
+                  END""")
+    c.execute(f"""CREATE TRIGGER trg_users_approved_delete AFTER DELETE ON users
+                  WHEN OLD.is_approved = 1 AND OLD.email != {admin} BEGIN
+                      UPDATE admin_stats SET value = value - 1 WHERE name = 'approved';
+                  END""")
+    c.execute(f"""CREATE TRIGGER trg_users_approved_update AFTER UPDATE OF is_approved, email ON users
+                  WHEN NEW.is_approved IS NOT OLD.is_approved OR NEW.email != OLD.email BEGIN
+                      UPDATE admin_stats
+                         SET value = value + (NEW.is_approved = 1 AND NEW.email != {admin})
+                                           - (OLD.is_approved = 1 AND OLD.email != {admin})
+                       WHERE name = 'approved';
+                  END""")
+
+def _schema_v12(c):
+    """Change counters on profiles, so cached avatar textures follow a new picture."""
+    _count_changes(c, ('profiles',))
+
+def _schema_v13(c):
+    """
+    Admin rights on the ADMIN_EMAIL row. Very old databases got is_admin by
+    ALTER with DEFAULT 0 and only knew the admin through a password shortcut
+    in check_user, which is gone; check_user now trusts the row alone.
+    """
+    c.execute("UPDATE users SET is_admin=1, is_approved=1 WHERE email=? AND (is_admin IS NOT 1 OR is_approved IS NOT 1)",
+              (ADMIN_EMAIL,))
+
+def _archived_message_count():
+    """Chat messages in the archive file, or 0 without one."""
+    if not os.path.exists(archive_file()):
+        return 0
+    try:
+        return archive_db.cursor().execute("SELECT COALESCE(SUM(row_count), 0) FROM message_blocks").fetchone()[0]
+    except sqlite3.Error: return 0
+
+def _schema_v14(c):
+    """
+    An 'archived' row in admin_stats. Archiving deletes from messages, so the
+    'messages' row only counts the live ones; archived history is counted apart.
+    """
+    c.execute("INSERT OR REPLACE INTO admin_stats VALUES ('archived', ?)", (_archived_message_count(),))
+
+SCHEMA_MIGRATIONS = [
+    (1, _schema_v1),
+    (2, _schema_v2),
+    (3, _schema_v3),
+    (4, _schema_v4),
+    (5, _schema_v5),
+    (6, _schema_v6),
+    (7, _schema_v7),
+    (8, _schema_v8),
+    (9, _schema_v9),
+    (10, _schema_v10),
+    (11, _schema_v11),
+    (12, _schema_v12),
+    (13, _schema_v13),
+    (14, _schema_v14),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_db(conn):
+    """Applies every migration newer than the file's user_version. Returns the version reached."""
+    version = get_schema_version(conn)
+    for target, upgrade in SCHEMA_MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            upgrade(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+        version = target
+    return version
+
 
 def setup_db():
     db_valid = False
@@ -103,105 +1052,14 @@ def setup_db():
             db_valid = False
 
     if not db_valid:
+        db.close_all()
         for f in [DB_FILE, f"{DB_FILE}-shm", f"{DB_FILE}-wal", f"{DB_FILE}-journal"]:
             try:
                 if os.path.exists(f): os.remove(f)
             except: pass
 
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=30)
-        c = conn.cursor()
-        c.execute("PRAGMA journal_mode=WAL")
-        c.execute("PRAGMA synchronous=NORMAL")
-
-        c.execute('''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL, email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL, phone TEXT,
-            is_admin INTEGER DEFAULT 0,
-            is_approved INTEGER DEFAULT 0,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-        # Migrate any missing columns on existing databases.
-        # IMPORTANT: SQLite ALTER TABLE cannot accept non-constant defaults
-        # like CURRENT_TIMESTAMP, so created_at must default to NULL here;
-        # a follow-up UPDATE fills it in for any rows that are still NULL.
-        migrations = [
-            "ALTER TABLE users ADD COLUMN is_admin INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN is_approved INTEGER DEFAULT 1",
-            "ALTER TABLE users ADD COLUMN phone TEXT",
-            "ALTER TABLE users ADD COLUMN created_at DATETIME",
-        ]
-        for sql in migrations:
-            try:
-                c.execute(sql)
-                conn.commit()
-            except:
-                pass  # Column already exists — safe to ignore
-
-        # Back-fill created_at NULLs left by migration
-        try:
-            c.execute("UPDATE users SET created_at = datetime('now') WHERE created_at IS NULL")
-            conn.commit()
-        except:
-            pass
-
-        c.execute('''CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT NOT NULL, message TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-        c.execute('''CREATE TABLE IF NOT EXISTS profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL, bio TEXT,
-            profile_pic TEXT, join_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(email) REFERENCES users(email))''')
-
-        # Migrate profiles table — add missing columns on old databases
-        profiles_migrations = [
-            "ALTER TABLE profiles ADD COLUMN bio TEXT",
-            "ALTER TABLE profiles ADD COLUMN profile_pic TEXT",
-            "ALTER TABLE profiles ADD COLUMN join_date DATETIME",
-        ]
-        for sql in profiles_migrations:
-            try:
-                c.execute(sql)
-                conn.commit()
-            except:
-                pass  # Column already exists — safe to ignore
-
-        c.execute('''CREATE TABLE IF NOT EXISTS timeline_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT NOT NULL, post_text TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(email) REFERENCES users(email))''')
-
-        c.execute('''CREATE TABLE IF NOT EXISTS user_actions_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            admin_email TEXT NOT NULL,
-            action TEXT NOT NULL,
-            target_user TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-        c.execute('''CREATE TABLE IF NOT EXISTS direct_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender_email TEXT NOT NULL,
-            receiver_email TEXT NOT NULL,
-            message TEXT NOT NULL,
-            is_read INTEGER DEFAULT 0,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-        conn.commit()
-
-        c.execute("SELECT id FROM users WHERE email=?", (ADMIN_EMAIL,))
-        if not c.fetchone():
-            c.execute(
-                "INSERT INTO users (name, email, password, phone, is_admin, is_approved, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (ADMIN_NAME, ADMIN_EMAIL, hash_password(ADMIN_PASSWORD), "0000000000", 1, 1, datetime.now())
-            )
-            conn.commit()
-
-        conn.close()
+        migrate_db(db.connection())
         return True
     except Exception as e:
         print(f"DB setup error: {e}")
@@ -211,15 +1069,14 @@ def setup_db():
 # ── FIX 1: insert_user — safely handle conn before it's guaranteed to exist ──
 def insert_user(name, email, password, phone):
     """Returns True on success, 'duplicate' if email already exists, False on other error."""
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO users (name, email, password, phone, is_admin, is_approved, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (name, email, hash_password(password), phone, 0, 0, datetime.now())
-        )
-        conn.commit()
+        # Hash before the transaction opens so the KDF never holds the write lock
+        hashed = hash_password(password)
+        with db.transaction() as c:
+            c.execute(
+                "INSERT INTO users (name, email, password, phone, is_admin, is_approved, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, email, hashed, phone, 0, 0, datetime.now())
+            )
         return True
     except sqlite3.IntegrityError:
         # Email already exists (UNIQUE constraint on email column)
@@ -227,174 +1084,312 @@ def insert_user(name, email, password, phone):
     except Exception as e:
         print(f"insert_user error: {e}")
         return False
-    finally:
-        # Always close conn if it was opened, regardless of success or failure
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 
 def check_user(email, password):
-    """Returns (name, is_admin, is_approved) or None"""
-    if email == ADMIN_EMAIL and password == ADMIN_PASSWORD:
-        return (ADMIN_NAME, True, True)
+    """
+    Returns (name, is_admin, is_approved) or None. Runs the KDF, so call it
+    through password_worker rather than on the UI thread or db_worker.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
+        c = db.cursor()
         c.execute("SELECT name, password, is_admin, is_approved FROM users WHERE email=?", (email,))
-        result = c.fetchone(); conn.close()
-        if result and verify_password(password, result[1]):
-            return (result[0], bool(result[2]), bool(result[3]))
-        return None
+        result = c.fetchone()
+        if not result or not verify_password(password, result[1]):
+            return None
     except: return None
-
-def get_users():
+    if password_needs_rehash(result[1]):
+        # Swap in a salted hash at the current cost; the old hash in the WHERE
+        # clause keeps a concurrent password change from being overwritten
+        try:
+            new_hash = hash_password(password)
+            with db.transaction() as c:
+                c.execute("UPDATE users SET password=? WHERE email=? AND password=?",
+                          (new_hash, email, result[1]))
+        except Exception as e:
+            print(f"password rehash error: {e}")
+    return (result[0], bool(result[2]), bool(result[3]))
+
+def _members_page_query(after, limit):
+    keyset, params = "", ()
+    if after is not None:
+        keyset, params = "AND (name COLLATE NOCASE, id) > (?, ?)", tuple(after)
+    return (f"""SELECT id, name, email FROM users
+                WHERE is_approved = 1 AND email != ? {keyset}
+                ORDER BY name COLLATE NOCASE, id LIMIT ?""", (ADMIN_EMAIL, *params, limit))
+
+def get_members_page(after=None, limit=MEMBER_PAGE_SIZE):
+    """
+    One page of approved members in name order (case-insensitive) as
+    (id, name, email). `after` is the (name, id) of the last member already
+    shown, or None for the first page.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT name, email, is_admin, created_at, is_approved FROM users WHERE email != ? ORDER BY created_at DESC",
-            (ADMIN_EMAIL,)
-        )
-        users = c.fetchall(); conn.close(); return users
+        c = db.cursor()
+        c.execute(*_members_page_query(after, limit))
+        return c.fetchall()
     except: return []
 
-def get_pending_users():
+# is_approved values behind the admin panel's status filters
+USER_STATUSES = {'pending': 0, 'approved': 1, 'rejected': -1}
+
+def user_page_key(row, prefix=''):
+    """The keyset get_users_page continues after: (name, id) when filtering by prefix, else (created_at, id)."""
+    user_id, name, _, _, created_at, _ = row
+    return (name, user_id) if prefix else (created_at, user_id)
+
+def _users_page_query(status, prefix, after, limit):
+    where, params = ["email != ?"], [ADMIN_EMAIL]
+    if status is not None:
+        where.append("is_approved = ?"); params.append(USER_STATUSES[status])
+    if prefix:
+        # A range on the NOCASE index rather than LIKE, which can't use it here
+        where.append("name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE")
+        params += [prefix, prefix + '\U0010ffff']
+        keyset, order = "(name COLLATE NOCASE, id) > (?, ?)", "name COLLATE NOCASE, id"
+    else:
+        keyset, order = "(created_at, id) < (?, ?)", "created_at DESC, id DESC"
+    if after is not None:
+        where.append(keyset); params += list(after)
+    return (f"""SELECT id, name, email, is_admin, created_at, is_approved FROM users
+                WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?""", (*params, limit))
+
+def get_users_page(status=None, prefix='', after=None, limit=ADMIN_PAGE_SIZE):
+    """
+    One page of the admin user list as
+    (id, name, email, is_admin, created_at, is_approved). `status` is a
+    USER_STATUSES key, or None for everyone. Without a name prefix the list
+    is newest first; a (case-insensitive) prefix lists matching names in
+    order. `after` is user_page_key() of the last row already shown.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT name, email, created_at FROM users WHERE is_approved=0 AND email != ? ORDER BY created_at DESC",
-            (ADMIN_EMAIL,)
-        )
-        users = c.fetchall(); conn.close(); return users
+        c = db.cursor()
+        c.execute(*_users_page_query(status, prefix, after, limit))
+        return c.fetchall()
     except: return []
 
 def approve_user(email):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("UPDATE users SET is_approved=1 WHERE email=?", (email,))
-        conn.commit(); conn.close(); return True
+        with db.transaction() as c:
+            c.execute("UPDATE users SET is_approved=1 WHERE email=?", (email,))
+        return True
     except: return False
 
 def reject_user(email):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("UPDATE users SET is_approved=-1 WHERE email=?", (email,))
-        conn.commit(); conn.close(); return True
+        with db.transaction() as c:
+            c.execute("UPDATE users SET is_approved=-1 WHERE email=?", (email,))
+        return True
     except: return False
 
+DISCOUNT_UNREAD_SQL = """UPDATE conversation_members SET unread_count = unread_count - (
+                             SELECT COUNT(*) FROM direct_messages dm
+                             WHERE dm.conversation_id = conversation_members.conversation_id
+                               AND dm.id > conversation_members.last_read_id AND dm.sender_email = ?)
+                         WHERE conversation_id=? AND email != ? AND unread_count > 0"""
+
+def _discount_unread_from(c, sender_email, conversation_ids):
+    """
+    Takes the sender's messages out of the other members' unread counters
+    before those messages are deleted: the ones above each member's read
+    watermark.
+    """
+    for conv_id in conversation_ids:
+        c.execute(DISCOUNT_UNREAD_SQL, (sender_email, conv_id, sender_email))
+
 def delete_user(email):
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-
-        # Safely try to get profile_pic — column may not exist on old DBs
-        try:
-            c.execute("SELECT profile_pic FROM profiles WHERE email=?", (email,))
-            pic_result = c.fetchone()
-            if pic_result and pic_result[0] and os.path.exists(pic_result[0]):
-                try: os.remove(pic_result[0])
-                except: pass
-        except Exception:
-            pass  # profiles table or profile_pic column doesn't exist yet
-
-        c.execute("DELETE FROM users WHERE email=?", (email,))
-        c.execute("DELETE FROM profiles WHERE email=?", (email,))
-        c.execute("DELETE FROM timeline_posts WHERE email=?", (email,))
-        c.execute("DELETE FROM direct_messages WHERE sender_email=? OR receiver_email=?", (email, email))
-        conn.commit()
+        with db.transaction() as c:
+            # Safely try to get profile_pic — column may not exist on old DBs
+            pic = None
+            try:
+                c.execute("SELECT profile_pic FROM profiles WHERE email=?", (email,))
+                pic_result = c.fetchone()
+                pic = pic_result[0] if pic_result else None
+            except Exception:
+                pass  # profiles table or profile_pic column doesn't exist yet
+
+            c.execute("DELETE FROM users WHERE email=?", (email,))
+            c.execute("DELETE FROM profiles WHERE email=?", (email,))
+            c.execute("DELETE FROM timeline_posts WHERE email=?", (email,))
+
+            # Their 1:1 conversations go entirely; in groups only their own
+            # messages and membership are removed.
+            c.execute("""SELECT cv.id FROM conversation_members m
+                         JOIN conversations cv ON cv.id = m.conversation_id
+                         WHERE m.email=? AND cv.is_group=0""", (email,))
+            direct_ids = [(row[0],) for row in c.fetchall()]
+            c.execute("""SELECT cv.id FROM conversation_members m
+                         JOIN conversations cv ON cv.id = m.conversation_id
+                         WHERE m.email=? AND cv.is_group=1""", (email,))
+            group_ids = [row[0] for row in c.fetchall()]
+            c.executemany("DELETE FROM conversations WHERE id=?", direct_ids)
+            c.executemany("DELETE FROM conversation_members WHERE conversation_id=?", direct_ids)
+            c.executemany("DELETE FROM direct_messages WHERE conversation_id=?", direct_ids)
+            _discount_unread_from(c, email, group_ids)
+            c.execute("DELETE FROM direct_messages WHERE sender_email=?", (email,))
+            c.execute("DELETE FROM conversation_members WHERE email=?", (email,))
+            c.execute("DELETE FROM unread_totals WHERE email=?", (email,))
+        _purge_archived_dms(email, direct_ids, group_ids)
+        # Other profiles may share the same picture content
+        release_profile_pic(pic)
         return True
     except Exception as e:
         print(f"Delete user error: {e}")
         return False
-    finally:
-        if conn:
-            try: conn.close()
-            except: pass
 
-def log_admin_action(admin_email, action, target_user=None):
-    try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO user_actions_log (admin_email, action, target_user, timestamp) VALUES (?, ?, ?, ?)",
-            (admin_email, action, target_user, datetime.now())
-        )
-        conn.commit(); conn.close(); return True
-    except: return False
+def log_admin_action(admin_email, action, target_user=None, on_done=None):
+    """Queued on write_queue; returns a Future that resolves to True once committed."""
+    return write_queue.submit(
+        "INSERT INTO user_actions_log (admin_email, action, target_user, timestamp) VALUES (?, ?, ?, ?)",
+        (admin_email, action, target_user, datetime.now()), on_done=on_done
+    )
+
+ADMIN_LOGS_SQL = "SELECT admin_email, action, target_user, timestamp FROM user_actions_log ORDER BY timestamp DESC LIMIT 20"
 
 def get_admin_logs():
+    # Audit entries are queued on write_queue; include the ones not committed yet
+    write_queue.flush()
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT admin_email, action, target_user, timestamp FROM user_actions_log ORDER BY timestamp DESC LIMIT 20"
-        )
-        logs = c.fetchall(); conn.close(); return logs
+        c = db.cursor()
+        c.execute(ADMIN_LOGS_SQL)
+        return c.fetchall()
     except: return []
 
-def delete_message_by_index(idx):
+def delete_message(msg_id):
+    return bool(delete_messages([msg_id]))
+
+def _in_list(n):
+    return ','.join('?' * n)
+
+DELETE_MESSAGES_SQL = "DELETE FROM messages WHERE id IN ({ids})"
+
+def delete_messages(msg_ids):
+    """Deletes the given message ids in one transaction. Returns the number removed, or None on error."""
+    ids = list(msg_ids)
     try:
-        msgs = get_messages()
-        if 0 <= idx < len(msgs):
-            conn = sqlite3.connect(DB_FILE, timeout=10)
-            c = conn.cursor()
-            c.execute(
-                "DELETE FROM messages WHERE user_name=? AND message=? AND timestamp=?",
-                (msgs[idx][0], msgs[idx][1], msgs[idx][2])
-            )
-            conn.commit(); conn.close(); return True
-        return False
-    except: return False
+        with db.transaction() as c:
+            deleted = 0
+            # Chunked to stay under SQLite's bound-parameter limit on older builds
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                c.execute(DELETE_MESSAGES_SQL.format(ids=_in_list(len(chunk))), chunk)
+                deleted += c.rowcount
+            return deleted
+    except: return None
+
+def save_message(user_name, message, on_done=None):
+    """Queued on write_queue; returns a Future that resolves to True once committed."""
+    return write_queue.submit("INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)",
+                              (user_name, message, datetime.now()), on_done=on_done)
 
-def save_message(user_name, message):
+# Chat pages are keyset ranges on the rowid, so none of them sorts
+RECENT_MESSAGES_SQL = "SELECT id, user_name, message, timestamp FROM messages ORDER BY id DESC LIMIT ?"
+MESSAGES_BEFORE_SQL = "SELECT id, user_name, message, timestamp FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?"
+MESSAGES_SINCE_SQL = "SELECT id, user_name, message, timestamp FROM messages WHERE id > ? ORDER BY id LIMIT ?"
+
+def get_recent_messages(limit=CHAT_PAGE_SIZE):
+    """The newest `limit` messages, oldest first, as (id, user_name, message, timestamp)."""
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("INSERT INTO messages (user_name, message, timestamp) VALUES (?, ?, ?)",
-                  (user_name, message, datetime.now()))
-        conn.commit(); conn.close(); return True
-    except: return False
+        c = db.cursor()
+        c.execute(RECENT_MESSAGES_SQL, (limit,))
+        rows = c.fetchall()
+    except: return []
+    if len(rows) < limit:
+        rows += get_archived_messages_before(rows[-1][0] if rows else None, limit - len(rows))
+    return list(reversed(rows))
 
-def get_messages():
+def get_messages_before(before_id, limit=CHAT_PAGE_SIZE):
+    """
+    The page of messages just older than before_id, oldest first (keyset on
+    the primary key). Once the hot table runs out the page continues from
+    the archive.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT user_name, message, timestamp FROM messages ORDER BY timestamp DESC LIMIT 50")
-        msgs = c.fetchall(); conn.close(); return list(reversed(msgs))
+        c = db.cursor()
+        c.execute(MESSAGES_BEFORE_SQL, (before_id, limit))
+        rows = c.fetchall()
     except: return []
+    if len(rows) < limit:
+        rows += get_archived_messages_before(rows[-1][0] if rows else before_id, limit - len(rows))
+    return list(reversed(rows))
 
-def clear_old_messages(days):
+def get_messages_since(last_id, limit=200):
+    """
+    Messages newer than last_id, oldest first, as (id, user_name, message, timestamp).
+    A primary-key range scan, so an idle poll costs one index probe that returns nothing.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("DELETE FROM messages WHERE timestamp < datetime('now', ?)", (f'-{days} days',))
-        deleted = c.rowcount
-        conn.commit(); conn.close(); return deleted
-    except: return 0
+        c = db.cursor()
+        c.execute(MESSAGES_SINCE_SQL, (last_id, limit))
+        return c.fetchall()
+    except: return []
+
+MESSAGE_IDS_SQL = "SELECT id FROM messages WHERE id BETWEEN ? AND ?"
+
+def get_deleted_message_ids(ids):
+    """
+    The ids among `ids` (the rows a chat screen shows) that no longer exist.
+    One primary-key range over the hot table; archived rows still count as there.
+    """
+    gone = set(ids)
+    if not gone: return gone
+    try:
+        c = db.cursor()
+        c.execute(MESSAGE_IDS_SQL, (min(gone), max(gone)))
+        gone.difference_update(row[0] for row in c)
+        if gone and os.path.exists(archive_file()):
+            a = archive_db.cursor()
+            a.execute("SELECT body FROM message_blocks WHERE last_id >= ? AND first_id <= ?",
+                      (min(gone), max(gone)))
+            for (body,) in a:
+                gone.difference_update(row[0] for row in _unpack_block(body))
+        return gone
+    except: return set()
+
+def clear_all_messages():
+    try:
+        with db.transaction() as c:
+            c.execute("DELETE FROM messages")
+            c.execute("UPDATE admin_stats SET value = 0 WHERE name = 'archived'")
+        if os.path.exists(archive_file()):
+            with archive_db.transaction() as a:
+                _setup_archive(a)
+                a.execute("DELETE FROM message_blocks")
+        return True
+    except: return False
 
 def get_profile(email):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
+        c = db.cursor()
         c.execute("""
             SELECT u.name, u.phone, p.bio, p.join_date, p.profile_pic
             FROM users u
             LEFT JOIN profiles p ON u.email = p.email
             WHERE u.email = ?
         """, (email,))
-        result = c.fetchone(); conn.close()
-        return result
+        return c.fetchone()
     except Exception as e:
         print(f"get_profile error: {e}")
         return None
 
+PROFILE_PICS_SQL = """SELECT u.name, p.profile_pic FROM users u
+                      JOIN profiles p ON p.email = u.email
+                      WHERE u.name IN ({names}) AND p.profile_pic IS NOT NULL"""
+
+def get_profile_pics(names):
+    """{name: profile_pic} for those of the given user names that have a picture."""
+    names = list(names)
+    if not names:
+        return {}
+    try:
+        c = db.cursor()
+        c.execute(PROFILE_PICS_SQL.format(names=_in_list(len(names))), names)
+        return dict(c.fetchall())
+    except Exception as e:
+        print(f"get_profile_pics error: {e}")
+        return {}
+
 
 # ── FIX 2: update_profile — use proper upsert so profile_pic is never wiped ──
 def update_profile(email, bio, profile_pic=None):
@@ -406,193 +1401,752 @@ def update_profile(email, bio, profile_pic=None):
       we keep whatever was already saved. This prevents a bio-save from blanking
       a previously uploaded photo.
     """
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-
-        # Check whether a profile row already exists
-        c.execute("SELECT profile_pic FROM profiles WHERE email=?", (email,))
-        existing = c.fetchone()
-
-        if existing is None:
-            # No row yet — insert fresh. Use the supplied pic (may be None).
-            c.execute(
-                "INSERT INTO profiles (email, bio, profile_pic, join_date) VALUES (?, ?, ?, ?)",
-                (email, bio, profile_pic, datetime.now())
-            )
-        else:
-            # Row exists — decide which pic path to keep.
-            # If a new pic was supplied use it; otherwise keep the stored path.
-            final_pic = profile_pic if profile_pic is not None else existing[0]
-            c.execute(
-                "UPDATE profiles SET bio=?, profile_pic=? WHERE email=?",
-                (bio, final_pic, email)
-            )
-
-        conn.commit()
+        with db.transaction() as c:
+            # Check whether a profile row already exists
+            c.execute("SELECT profile_pic FROM profiles WHERE email=?", (email,))
+            existing = c.fetchone()
+
+            if existing is None:
+                # No row yet — insert fresh. Use the supplied pic (may be None).
+                c.execute(
+                    "INSERT INTO profiles (email, bio, profile_pic, join_date) VALUES (?, ?, ?, ?)",
+                    (email, bio, profile_pic, datetime.now())
+                )
+            else:
+                # Row exists — decide which pic path to keep.
+                # If a new pic was supplied use it; otherwise keep the stored path.
+                final_pic = profile_pic if profile_pic is not None else existing[0]
+                c.execute(
+                    "UPDATE profiles SET bio=?, profile_pic=? WHERE email=?",
+                    (bio, final_pic, email)
+                )
+        if existing and existing[0] != final_pic:
+            release_profile_pic(existing[0])
         return True
     except Exception as e:
         print(f"update_profile error: {e}")
         return False
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 
+USER_EMAIL_SQL = "SELECT email FROM users WHERE name = ?"
+
 def get_user_email(name):
     if name == ADMIN_NAME:
         return ADMIN_EMAIL
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT email FROM users WHERE name = ?", (name,))
-        result = c.fetchone(); conn.close()
+        c = db.cursor()
+        c.execute(USER_EMAIL_SQL, (name,))
+        result = c.fetchone()
         return result[0] if result else None
     except: return None
 
-def save_timeline_post(email, post_text):
-    try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("INSERT INTO timeline_posts (email, post_text, timestamp) VALUES (?, ?, ?)",
-                  (email, post_text, datetime.now()))
-        conn.commit(); conn.close(); return True
-    except: return False
+def save_timeline_post(email, post_text, on_done=None):
+    """Queued on write_queue; returns a Future that resolves to True once committed."""
+    return write_queue.submit("INSERT INTO timeline_posts (email, post_text, timestamp) VALUES (?, ?, ?)",
+                              (email, post_text, datetime.now()), on_done=on_done)
+
+TIMELINE_POSTS_SQL = "SELECT post_text, timestamp FROM timeline_posts WHERE email = ? ORDER BY timestamp DESC"
 
 def get_timeline_posts(email):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT post_text, timestamp FROM timeline_posts WHERE email = ? ORDER BY timestamp DESC",
-            (email,)
-        )
-        posts = c.fetchall(); conn.close(); return posts
+        c = db.cursor()
+        c.execute(TIMELINE_POSTS_SQL, (email,))
+        return c.fetchall()
     except: return []
 
-def get_all_messages_count():
+def _admin_stat(name):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM messages")
-        result = c.fetchone(); conn.close()
+        c = db.cursor()
+        c.execute("SELECT value FROM admin_stats WHERE name=?", (name,))
+        result = c.fetchone()
         return result[0] if result else 0
     except: return 0
 
+def get_all_messages_count():
+    return _admin_stat('messages')
+
 def get_total_users_count():
-    try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM users WHERE email != ?", (ADMIN_EMAIL,))
-        result = c.fetchone(); conn.close()
-        return result[0] if result else 0
-    except: return 0
+    return _admin_stat('users')
 
 def get_pending_count():
+    return _admin_stat('pending')
+
+def get_member_count():
+    return _admin_stat('approved')
+
+def get_admin_stats():
+    """(users, live chat messages, pending approvals, archived chat messages) in one read of admin_stats."""
+    write_queue.flush()         # counts messages still on the write queue too
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM users WHERE is_approved=0 AND email != ?", (ADMIN_EMAIL,))
-        result = c.fetchone(); conn.close()
-        return result[0] if result else 0
-    except: return 0
+        c = db.cursor()
+        c.execute("SELECT name, value FROM admin_stats")
+        stats = dict(c.fetchall())
+        return stats.get('users', 0), stats.get('messages', 0), stats.get('pending', 0), stats.get('archived', 0)
+    except: return 0, 0, 0, 0
 
-def send_dm(sender_email, receiver_email, message):
+def direct_conversation_key(email_a, email_b):
+    low, high = sorted((email_a, email_b))
+    return f"{low}|{high}"
+
+DIRECT_CONVERSATION_SQL = "SELECT id FROM conversations WHERE direct_key=?"
+
+def get_or_create_direct_conversation(my_email, other_email):
+    """Returns the id of the 1:1 conversation between the two users, creating it if needed."""
+    key = direct_conversation_key(my_email, other_email)
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO direct_messages (sender_email, receiver_email, message, timestamp) VALUES (?, ?, ?, ?)",
-            (sender_email, receiver_email, message, datetime.now())
-        )
-        conn.commit(); conn.close(); return True
-    except: return False
+        with db.transaction() as c:
+            c.execute(DIRECT_CONVERSATION_SQL, (key,))
+            row = c.fetchone()
+            if row:
+                return row[0]
+            c.execute("INSERT INTO conversations (is_group, direct_key, created_at) VALUES (0, ?, ?)",
+                      (key, datetime.now()))
+            conv_id = c.lastrowid
+            c.executemany(
+                "INSERT OR IGNORE INTO conversation_members (conversation_id, email, joined_at) VALUES (?, ?, ?)",
+                [(conv_id, my_email, datetime.now()), (conv_id, other_email, datetime.now())]
+            )
+            return conv_id
+    except Exception as e:
+        print(f"get_or_create_direct_conversation error: {e}")
+        return None
+
+def create_group_conversation(creator_email, member_emails, title):
+    """Creates a group DM with the creator plus member_emails. Returns its id or None."""
+    members = [creator_email] + [em for em in member_emails if em != creator_email]
+    try:
+        with db.transaction() as c:
+            c.execute("INSERT INTO conversations (is_group, title, created_at) VALUES (1, ?, ?)",
+                      (title, datetime.now()))
+            conv_id = c.lastrowid
+            c.executemany(
+                "INSERT OR IGNORE INTO conversation_members (conversation_id, email, joined_at) VALUES (?, ?, ?)",
+                [(conv_id, em, datetime.now()) for em in members]
+            )
+            return conv_id
+    except Exception as e:
+        print(f"create_group_conversation error: {e}")
+        return None
+
+def send_dm(sender_email, conversation_id, message, on_done=None):
+    """Queued on write_queue; returns a Future that resolves to True once committed."""
+    # trg_dm_after_insert moves the conversation's last-message pointer and
+    # bumps every other member's unread counter in the same transaction
+    return write_queue.submit(
+        "INSERT INTO direct_messages (conversation_id, sender_email, message, timestamp) VALUES (?, ?, ?, ?)",
+        (conversation_id, sender_email, message, datetime.now()), on_done=on_done
+    )
+
+# (timestamp, id) keysets for _dm_sql, each bound as (ts, ts, id)
+DM_KEYSET_BEFORE = "AND dm.timestamp <= ? AND (dm.timestamp < ? OR dm.id < ?)"
+DM_KEYSET_AFTER = "AND dm.timestamp >= ? AND (dm.timestamp > ? OR dm.id > ?)"
+
+def _dm_sql(keyset_sql, direction):
+    # A single idx_dm_conversation range walked in (timestamp, id) order
+    return f"""SELECT dm.id, dm.sender_email, COALESCE(u.name, dm.sender_email), dm.message, dm.timestamp
+               FROM direct_messages dm LEFT JOIN users u ON u.email = dm.sender_email
+               WHERE dm.conversation_id=? {keyset_sql}
+               ORDER BY dm.timestamp {direction}, dm.id {direction} LIMIT ?"""
+
+def _dm_query(conversation_id, keyset_sql, keyset_params, direction, limit):
+    c = db.cursor()
+    c.execute(_dm_sql(keyset_sql, direction), (conversation_id, *keyset_params, limit))
+    return c.fetchall()
+
+def get_dm_page(conversation_id, before=None, limit=DM_PAGE_SIZE):
+    """
+    One page of a conversation, read newest-first with keyset pagination.
+    `before` is the (timestamp, id) of the oldest row already shown, or None
+    for the latest page. Rows come back oldest first as
+    (id, sender_email, sender_name, message, timestamp); past the hot rows
+    the page continues from the archive.
+    """
+    try:
+        if before is None:
+            rows = _dm_query(conversation_id, "", (), "DESC", limit)
+        else:
+            ts, msg_id = before
+            rows = _dm_query(conversation_id, DM_KEYSET_BEFORE, (ts, ts, msg_id), "DESC", limit)
+    except: return []
+    if len(rows) < limit:
+        oldest = (rows[-1][4], rows[-1][0]) if rows else before
+        rows += get_archived_dm_page(conversation_id, oldest, limit - len(rows))
+    return list(reversed(rows))
 
-def get_dm_messages(user1_email, user2_email):
+def get_dm_messages_since(conversation_id, after, limit=200):
+    """Rows newer than the (timestamp, id) keyset `after`, oldest first."""
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("""SELECT sender_email, message, timestamp FROM direct_messages
-                     WHERE (sender_email=? AND receiver_email=?) OR (sender_email=? AND receiver_email=?)
-                     ORDER BY timestamp ASC LIMIT 100""",
-                  (user1_email, user2_email, user2_email, user1_email))
-        msgs = c.fetchall(); conn.close(); return msgs
+        ts, msg_id = after
+        return _dm_query(conversation_id, DM_KEYSET_AFTER, (ts, ts, msg_id), "ASC", limit)
     except: return []
 
+DM_IDS_SQL = "SELECT id FROM direct_messages WHERE conversation_id=? AND id BETWEEN ? AND ?"
+
+def get_deleted_dm_ids(conversation_id, shown):
+    """The ids among `shown`, the (timestamp, id) of the rows a DM screen shows, that no longer exist."""
+    gone = {msg_id: ts for ts, msg_id in shown}
+    if not gone: return set()
+    try:
+        c = db.cursor()
+        c.execute(DM_IDS_SQL, (conversation_id, min(gone), max(gone)))
+        for (msg_id,) in c:
+            gone.pop(msg_id, None)
+        if gone and os.path.exists(archive_file()):
+            a = archive_db.cursor()
+            a.execute("SELECT body FROM dm_blocks WHERE conversation_id=? AND last_ts >= ? AND first_ts <= ?",
+                      (conversation_id, min(gone.values()), max(gone.values())))
+            for (body,) in a:
+                for row in _unpack_block(body):
+                    gone.pop(row[0], None)
+        return set(gone)
+    except: return set()
+
+DM_CONVERSATIONS_SQL = """SELECT cv.id,
+                                 COALESCE(cv.title, (
+                                     SELECT COALESCE(u.name, om.email) FROM conversation_members om
+                                     LEFT JOIN users u ON u.email = om.email
+                                     WHERE om.conversation_id = cv.id AND om.email != m.email LIMIT 1
+                                 ), m.email),
+                                 COALESCE(dm.message, ''), dm.timestamp, m.unread_count, cv.is_group
+                          FROM conversation_members m
+                          JOIN conversations cv ON cv.id = m.conversation_id
+                          LEFT JOIN direct_messages dm ON dm.id = cv.last_message_id
+                          WHERE m.email = ? AND (cv.last_message_id IS NOT NULL OR cv.is_group = 1)
+                          ORDER BY COALESCE(dm.timestamp, cv.created_at) DESC"""
+
 def get_dm_conversations(email):
+    """
+    The whole inbox in one statement: one row per conversation as
+    (conversation_id, title, last_message, last_time, unread_count, is_group),
+    newest first. A 1:1 conversation is titled with the other member's name.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("""SELECT other_email, MAX(timestamp) as last_time
-                     FROM (
-                         SELECT receiver_email as other_email, timestamp FROM direct_messages WHERE sender_email=?
-                         UNION ALL
-                         SELECT sender_email as other_email, timestamp FROM direct_messages WHERE receiver_email=?
-                     ) GROUP BY other_email ORDER BY last_time DESC""",
-                  (email, email))
-        partners = c.fetchall()
-        result = []
-        for other_email, last_time in partners:
-            c.execute("""SELECT message FROM direct_messages
-                         WHERE (sender_email=? AND receiver_email=?) OR (sender_email=? AND receiver_email=?)
-                         ORDER BY timestamp DESC LIMIT 1""",
-                      (email, other_email, other_email, email))
-            last_msg_row = c.fetchone()
-            c.execute("SELECT name FROM users WHERE email=?", (other_email,))
-            name_row = c.fetchone()
-            other_name = name_row[0] if name_row else other_email
-            result.append((other_email, other_name, last_msg_row[0] if last_msg_row else '', last_time))
-        conn.close(); return result
+        c = db.cursor()
+        c.execute(DM_CONVERSATIONS_SQL, (email,))
+        return c.fetchall()
     except: return []
 
-def get_unread_count(my_email, other_email):
+def get_conversation_member_count(conversation_id):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT COUNT(*) FROM direct_messages WHERE sender_email=? AND receiver_email=? AND is_read=0",
-            (other_email, my_email)
-        )
-        result = c.fetchone(); conn.close()
+        c = db.cursor()
+        c.execute("SELECT COUNT(*) FROM conversation_members WHERE conversation_id=?", (conversation_id,))
+        result = c.fetchone()
+        return result[0] if result else 0
+    except: return 0
+
+UNREAD_COUNT_SQL = "SELECT unread_count FROM conversation_members WHERE conversation_id=? AND email=?"
+TOTAL_UNREAD_SQL = "SELECT total FROM unread_totals WHERE email=?"
+
+def get_unread_count(my_email, conversation_id):
+    try:
+        c = db.cursor()
+        c.execute(UNREAD_COUNT_SQL, (conversation_id, my_email))
+        result = c.fetchone()
         return result[0] if result else 0
     except: return 0
 
 def get_total_unread(my_email):
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM direct_messages WHERE receiver_email=? AND is_read=0", (my_email,))
-        result = c.fetchone(); conn.close()
+        c = db.cursor()
+        c.execute(TOTAL_UNREAD_SQL, (my_email,))
+        result = c.fetchone()
         return result[0] if result else 0
     except: return 0
 
-def mark_dm_read(my_email, other_email):
+MARK_DM_READ_SQL = """UPDATE conversation_members
+                      SET unread_count=0,
+                          last_read_id=MAX(last_read_id, COALESCE(
+                              (SELECT last_message_id FROM conversations WHERE id=?), 0))
+                      WHERE conversation_id=? AND email=? AND unread_count != 0"""
+
+def mark_dm_read(my_email, conversation_id):
+    """
+    Moves the member's read watermark up to the conversation's last message
+    and zeroes their counter, in one row. Returns True only if there was
+    anything to clear.
+    """
+    # Checked with a read first: an UPDATE that matches nothing still takes
+    # the write lock and commits, and this runs on every DM screen refresh.
+    if not get_unread_count(my_email, conversation_id):
+        return False
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "UPDATE direct_messages SET is_read=1 WHERE sender_email=? AND receiver_email=?",
-            (other_email, my_email)
-        )
-        conn.commit(); conn.close()
-    except: pass
+        with db.transaction() as c:
+            c.execute(MARK_DM_READ_SQL, (conversation_id, conversation_id, my_email))
+            return c.rowcount > 0
+    except: return False
 
-def get_all_approved_users(exclude_email):
+# ── Message Archive ───────────────────────────────────────────────────────────
+# Aged chat messages and DMs move out of the hot tables into archive_file(),
+# a batch at a time. Each batch is stored as zlib-compressed JSON blocks (one
+# per conversation for DMs): a block of a few hundred rows compresses far
+# better than one short chat line on its own. Pages older than anything in
+# the hot tables are read back by unpacking these blocks.
+ARCHIVE_BATCH_SIZE = 500
+
+def _setup_archive(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS message_blocks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_id INTEGER NOT NULL, last_id INTEGER NOT NULL,
+        row_count INTEGER NOT NULL, raw_bytes INTEGER NOT NULL,
+        body BLOB NOT NULL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_message_blocks_last ON message_blocks(last_id)")
+    c.execute('''CREATE TABLE IF NOT EXISTS dm_blocks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id INTEGER NOT NULL,
+        first_ts TEXT NOT NULL, last_ts TEXT NOT NULL, last_id INTEGER NOT NULL,
+        row_count INTEGER NOT NULL, raw_bytes INTEGER NOT NULL,
+        body BLOB NOT NULL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_dm_blocks_conv ON dm_blocks(conversation_id, last_ts, last_id)")
+
+def _pack_block(rows):
+    raw = json.dumps(rows, separators=(',', ':')).encode()
+    return len(raw), zlib.compress(raw, 9)
+
+def _unpack_block(body):
+    return json.loads(zlib.decompress(body))
+
+def _used_bytes(c):
+    page_size = c.execute("PRAGMA page_size").fetchone()[0]
+    pages = c.execute("PRAGMA page_count").fetchone()[0] - c.execute("PRAGMA freelist_count").fetchone()[0]
+    return pages * page_size
+
+def _delete_ids(table, ids, where='1'):
+    with db.transaction() as c:
+        c.execute(f"DELETE FROM {table} WHERE id IN ({_in_list(len(ids))}) AND {where}", ids)
+
+# Each batch is written to the archive before it is deleted from the hot
+# table. A crash in between leaves the rows in both places; the readers drop
+# the duplicates by id.
+ARCHIVE_MESSAGE_BATCH_SQL = """SELECT id, user_name, message, timestamp FROM messages
+                               WHERE timestamp < ? ORDER BY timestamp LIMIT ?"""
+
+def _archive_message_batch(cutoff, limit):
+    rows = db.cursor().execute(ARCHIVE_MESSAGE_BATCH_SQL, (cutoff, limit)).fetchall()
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+    raw_bytes, body = _pack_block(rows)
+    with archive_db.transaction() as a:
+        a.execute("INSERT INTO message_blocks (first_id, last_id, row_count, raw_bytes, body) VALUES (?, ?, ?, ?, ?)",
+                  (min(ids), max(ids), len(rows), raw_bytes, body))
+    with db.transaction() as c:
+        c.execute(DELETE_MESSAGES_SQL.format(ids=_in_list(len(ids))), ids)
+        # The delete trigger takes them off 'messages'; they still count as archived
+        c.execute("UPDATE admin_stats SET value = value + ? WHERE name = 'archived'", (c.rowcount,))
+    return len(rows)
+
+# A DM that some member has not read yet: it counts in their unread_count,
+# which must keep matching the hot rows above their last_read_id
+DM_UNREAD_BY_ANYONE = """EXISTS (SELECT 1 FROM conversation_members m
+                                 WHERE m.conversation_id = direct_messages.conversation_id
+                                   AND m.email != direct_messages.sender_email
+                                   AND direct_messages.id > m.last_read_id)"""
+
+# A conversation's latest message stays hot so the inbox can still show it,
+# and so do unread messages until every member has read them
+ARCHIVE_DM_BATCH_SQL = f"""SELECT id, conversation_id, sender_email, message, timestamp FROM direct_messages
+                           WHERE timestamp < ? AND id NOT IN (
+                               SELECT last_message_id FROM conversations WHERE last_message_id IS NOT NULL)
+                             AND NOT {DM_UNREAD_BY_ANYONE}
+                           ORDER BY timestamp, id LIMIT ?"""
+
+def _archive_dm_batch(cutoff, limit):
+    rows = db.cursor().execute(ARCHIVE_DM_BATCH_SQL, (cutoff, limit)).fetchall()
+    if not rows:
+        return 0
+    by_conversation = {}
+    for msg_id, conv_id, sender, message, ts in rows:
+        by_conversation.setdefault(conv_id, []).append((msg_id, sender, message, ts))
+    with archive_db.transaction() as a:
+        for conv_id, block in by_conversation.items():
+            raw_bytes, body = _pack_block(block)
+            a.execute("""INSERT INTO dm_blocks (conversation_id, first_ts, last_ts, last_id, row_count, raw_bytes, body)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                      (conv_id, block[0][3], block[-1][3], block[-1][0], len(block), raw_bytes, body))
+    # Re-checked in the deleting transaction; a row kept here stays in both
+    # places and the readers drop the duplicate by id
+    _delete_ids('direct_messages', [row[0] for row in rows], f"NOT {DM_UNREAD_BY_ANYONE}")
+    return len(rows)
+
+def archive_old_messages(days, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves chat messages and DMs older than `days` into the archive, one short
+    transaction per batch so chat writes are never locked out for long.
+    Returns (messages, dms, bytes_reclaimed) or None on error.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        c.execute(
-            "SELECT name, email FROM users WHERE email != ? AND email != ? AND is_approved=1 ORDER BY name",
-            (exclude_email, ADMIN_EMAIL)
-        )
-        users = c.fetchall(); conn.close(); return users
+        c = db.cursor()
+        used_before = _used_bytes(c)
+        with archive_db.transaction() as a:
+            _setup_archive(a)
+        moved = []
+        for archive_batch in (_archive_message_batch, _archive_dm_batch):
+            total = 0
+            while True:
+                count = archive_batch(cutoff, batch_size)
+                total += count
+                if count < batch_size:
+                    break
+            moved.append(total)
+        return moved[0], moved[1], max(used_before - _used_bytes(c), 0)
+    except Exception as e:
+        print(f"archive_old_messages error: {e}")
+        return None
+
+def _purge_archived_dms(email, direct_ids, group_ids):
+    """delete_user's archive side: drop their 1:1 blocks, repack group blocks without their rows."""
+    if not os.path.exists(archive_file()):
+        return
+    with archive_db.transaction() as a:
+        _setup_archive(a)
+        a.executemany("DELETE FROM dm_blocks WHERE conversation_id=?", direct_ids)
+        for conv_id in group_ids:
+            a.execute("SELECT id, body FROM dm_blocks WHERE conversation_id=?", (conv_id,))
+            for block_id, body in a.fetchall():
+                rows = _unpack_block(body)
+                kept = [row for row in rows if row[1] != email]
+                if len(kept) == len(rows):
+                    continue
+                if not kept:
+                    a.execute("DELETE FROM dm_blocks WHERE id=?", (block_id,))
+                    continue
+                raw_bytes, body = _pack_block(kept)
+                a.execute("""UPDATE dm_blocks SET first_ts=?, last_ts=?, last_id=?, row_count=?, raw_bytes=?, body=?
+                             WHERE id=?""",
+                          (kept[0][3], kept[-1][3], kept[-1][0], len(kept), raw_bytes, body, block_id))
+
+def get_archived_messages_before(before_id=None, limit=CHAT_PAGE_SIZE):
+    """Archived chat messages older than before_id (or the newest), newest first."""
+    if limit <= 0 or not os.path.exists(archive_file()):
+        return []
+    try:
+        a = archive_db.cursor()
+        if before_id is None:
+            a.execute("SELECT body FROM message_blocks ORDER BY last_id DESC")
+        else:
+            a.execute("SELECT body FROM message_blocks WHERE first_id < ? ORDER BY last_id DESC", (before_id,))
+        found = {}
+        for (body,) in a:
+            for row in _unpack_block(body):
+                if before_id is None or row[0] < before_id:
+                    found[row[0]] = tuple(row)
+            if len(found) >= limit:
+                break
+        return sorted(found.values(), reverse=True)[:limit]
+    except: return []
+
+def get_archived_dm_page(conversation_id, before=None, limit=DM_PAGE_SIZE):
+    """
+    Archived rows of a conversation older than the (timestamp, id) keyset
+    `before`, newest first, shaped like get_dm_page's rows.
+    """
+    if limit <= 0 or not os.path.exists(archive_file()):
+        return []
+    try:
+        a = archive_db.cursor()
+        if before is None:
+            a.execute("SELECT body FROM dm_blocks WHERE conversation_id=? ORDER BY last_ts DESC, last_id DESC",
+                      (conversation_id,))
+        else:
+            a.execute("""SELECT body FROM dm_blocks WHERE conversation_id=? AND first_ts <= ?
+                         ORDER BY last_ts DESC, last_id DESC""", (conversation_id, before[0]))
+        found = {}
+        for (body,) in a:
+            for msg_id, sender, message, ts in _unpack_block(body):
+                if before is None or (ts, msg_id) < tuple(before):
+                    found[msg_id] = (msg_id, sender, message, ts)
+            if len(found) >= limit:
+                break
+        rows = sorted(found.values(), key=lambda r: (r[3], r[0]), reverse=True)[:limit]
+        senders = list({r[1] for r in rows})
+        c = db.cursor()
+        c.execute(f"SELECT email, name FROM users WHERE email IN ({','.join('?' * len(senders))})", senders)
+        names = dict(c.fetchall())
+        return [(msg_id, sender, names.get(sender, sender), message, ts) for msg_id, sender, message, ts in rows]
+    except: return []
+
+# ── Full-Text Search ──────────────────────────────────────────────────────────
+# Snippets wrap each hit in these control characters; the UI swaps them for
+# markup after escaping the message text itself.
+SNIPPET_OPEN  = '\x02'
+SNIPPET_CLOSE = '\x03'
+SEARCH_PAGE_SIZE = 20
+# bm25 is computed for every row it ranks, so a word that is in half the
+# table would rank half the table. Only the newest matches are ranked; a
+# rarer word has fewer matches than this and is ranked in full. Past the
+# window the older matches follow, newest first.
+SEARCH_RANK_WINDOW = 1000
+
+def fts_match_query(text):
+    """Free text -> FTS5 query: every word quoted (so operators are literal), the last one a prefix."""
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return None
+    return ' '.join(f'"{w}"' for w in words) + ' *'
+
+def _like_pattern(text):
+    escaped = text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def _fts_search_sql(select, fts, joins=''):
+    """
+    (ranked, older) queries over `select`: the newest SEARCH_RANK_WINDOW
+    matches of `fts` (after `joins`) by rank, then the ones before them by rowid.
+    """
+    start = f"""(SELECT MIN(hit) FROM (
+                    SELECT {fts}.rowid AS hit FROM {fts} {joins}
+                    WHERE {fts} MATCH :match ORDER BY {fts}.rowid DESC LIMIT {SEARCH_RANK_WINDOW}))"""
+    return (f"""{select} WHERE {fts} MATCH :match AND {fts}.rowid >= {start}
+                ORDER BY rank LIMIT :limit OFFSET :offset""",
+            f"""{select} WHERE {fts} MATCH :match AND {fts}.rowid < {start}
+                ORDER BY {fts}.rowid DESC LIMIT :limit OFFSET :offset""")
+
+def search_fts_enabled():
+    try:
+        return db.cursor().execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+        ).fetchone() is not None
+    except: return False
+
+def _run_search(fts_sql, like_sql, text, limit, offset, **params):
+    match = fts_match_query(text)
+    if match is None:
+        return []
+    try:
+        c = db.cursor()
+        if not search_fts_enabled():
+            c.execute(like_sql, dict(params, pattern=_like_pattern(text), limit=limit, offset=offset))
+            return c.fetchall()
+        ranked_sql, older_sql = fts_sql
+        c.execute(ranked_sql, dict(params, match=match, limit=limit, offset=offset))
+        rows = c.fetchall()
+        seen = offset + len(rows)
+        if len(rows) < limit and seen >= SEARCH_RANK_WINDOW:
+            c.execute(older_sql, dict(params, match=match, limit=limit - len(rows),
+                                      offset=seen - SEARCH_RANK_WINDOW))
+            rows += c.fetchall()
+        return rows
+    except Exception as e:
+        print(f"search error: {e}")
+        return []
+
+SEARCH_MESSAGES_FTS_SQL = _fts_search_sql("""SELECT m.id, m.user_name,
+                                                   snippet(messages_fts, 0, char(2), char(3), '…', 12), m.timestamp
+                                            FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid""",
+                                         'messages_fts')
+SEARCH_MESSAGES_LIKE_SQL = """SELECT id, user_name, message, timestamp FROM messages
+                              WHERE message LIKE :pattern ESCAPE '\\' ORDER BY id DESC LIMIT :limit OFFSET :offset"""
+
+def search_messages(text, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Chat room hits, best match first, as (id, user_name, snippet, timestamp)."""
+    return _run_search(SEARCH_MESSAGES_FTS_SQL, SEARCH_MESSAGES_LIKE_SQL, text, limit, offset)
+
+_DM_HIT_TITLE = """COALESCE(cv.title, (
+                       SELECT COALESCE(u.name, om.email) FROM conversation_members om
+                       LEFT JOIN users u ON u.email = om.email
+                       WHERE om.conversation_id = cv.id AND om.email != m.email LIMIT 1
+                   ), m.email)"""
+# The window is taken over the caller's own conversations, not all DMs
+_MY_DM_HITS = """JOIN direct_messages wdm ON wdm.id = dm_fts.rowid
+                 JOIN conversation_members wm ON wm.conversation_id = wdm.conversation_id
+                                             AND wm.email = :email"""
+SEARCH_DMS_FTS_SQL = _fts_search_sql(f"""SELECT dm.id, dm.conversation_id, {_DM_HIT_TITLE},
+                                                COALESCE(su.name, dm.sender_email),
+                                                snippet(dm_fts, 0, char(2), char(3), '…', 12), dm.timestamp
+                                         FROM dm_fts
+                                         JOIN direct_messages dm ON dm.id = dm_fts.rowid
+                                         JOIN conversation_members m ON m.conversation_id = dm.conversation_id
+                                                                    AND m.email = :email
+                                         JOIN conversations cv ON cv.id = dm.conversation_id
+                                         LEFT JOIN users su ON su.email = dm.sender_email""",
+                                     'dm_fts', _MY_DM_HITS)
+SEARCH_DMS_LIKE_SQL = f"""SELECT dm.id, dm.conversation_id, {_DM_HIT_TITLE}, COALESCE(su.name, dm.sender_email),
+                                 dm.message, dm.timestamp
+                          FROM conversation_members m
+                          JOIN direct_messages dm ON dm.conversation_id = m.conversation_id
+                          JOIN conversations cv ON cv.id = dm.conversation_id
+                          LEFT JOIN users su ON su.email = dm.sender_email
+                          WHERE m.email = :email AND dm.message LIKE :pattern ESCAPE '\\'
+                          ORDER BY dm.id DESC LIMIT :limit OFFSET :offset"""
+
+def search_dms(email, text, limit=SEARCH_PAGE_SIZE, offset=0):
+    """
+    DM hits in conversations `email` belongs to, best match first, as
+    (id, conversation_id, conversation_title, sender_name, snippet, timestamp).
+    """
+    return _run_search(SEARCH_DMS_FTS_SQL, SEARCH_DMS_LIKE_SQL, text, limit, offset, email=email)
+
+SEARCH_TIMELINE_FTS_SQL = _fts_search_sql("""SELECT tp.id, COALESCE(u.name, tp.email),
+                                                   snippet(timeline_fts, 0, char(2), char(3), '…', 12), tp.timestamp
+                                            FROM timeline_fts
+                                            JOIN timeline_posts tp ON tp.id = timeline_fts.rowid
+                                            LEFT JOIN users u ON u.email = tp.email""",
+                                         'timeline_fts')
+SEARCH_TIMELINE_LIKE_SQL = """SELECT tp.id, COALESCE(u.name, tp.email), tp.post_text, tp.timestamp
+                              FROM timeline_posts tp LEFT JOIN users u ON u.email = tp.email
+                              WHERE tp.post_text LIKE :pattern ESCAPE '\\' ORDER BY tp.id DESC LIMIT :limit OFFSET :offset"""
+
+def search_timeline(text, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Timeline post hits, best match first, as (id, author_name, snippet, timestamp)."""
+    return _run_search(SEARCH_TIMELINE_FTS_SQL, SEARCH_TIMELINE_LIKE_SQL, text, limit, offset)
+
+
+def _approved_users_query(exclude_email, prefix, limit):
+    params = {'me': exclude_email, 'admin': ADMIN_EMAIL, 'limit': limit,
+              'lo': prefix, 'hi': prefix + '\U0010ffff',
+              'email_lo': prefix.lower(), 'email_hi': prefix.lower() + '\U0010ffff'}
+    name_match = "name >= :lo COLLATE NOCASE AND name < :hi COLLATE NOCASE"
+    by_name = f"""SELECT id, name, email FROM users
+                  WHERE is_approved = 1 AND {name_match} AND email NOT IN (:me, :admin)
+                  ORDER BY name COLLATE NOCASE, id LIMIT :limit"""
+    sql = by_name
+    if prefix:
+        # The unary + keeps the planner on the email range instead of the is_approved indexes
+        by_email = f"""SELECT id, name, email FROM users
+                       WHERE email >= :email_lo AND email < :email_hi AND +is_approved = 1
+                         AND email NOT IN (:me, :admin) AND NOT ({name_match})
+                       ORDER BY email LIMIT :limit"""
+        sql = f"""SELECT name, email FROM (
+                      SELECT 0 AS side, lower(name) AS sort_key, id, name, email FROM ({by_name})
+                      UNION ALL
+                      SELECT 1, email, id, name, email FROM ({by_email}))
+                  ORDER BY side, sort_key, id LIMIT :limit"""
+    return sql, params
+
+def find_approved_users(exclude_email, prefix='', limit=PICKER_LIMIT):
+    """
+    Up to `limit` approved users other than exclude_email as (name, email):
+    those whose name starts with prefix (case-insensitive) in name order,
+    then those matched only by their email. Each side is a range scan over
+    an index: idx_users_status_name for names, the email unique index for
+    emails (stored lower-case at registration).
+    """
+    try:
+        c = db.cursor()
+        c.execute(*_approved_users_query(exclude_email, prefix, limit))
+        return [row[-2:] for row in c.fetchall()]
     except: return []
 
 
+# ── Profile Pictures ──────────────────────────────────────────────────────────
+# Uploads are stored once per distinct content, named by the SHA-256 of the
+# file: PROFILE_PICS_DIR/ab/<digest>_<size>.jpg for every PROFILE_THUMB_SIZES
+# edge, and profiles.profile_pic holds the digest. Rows saved by older versions
+# still hold the path of a full-size per-user copy, which is shown as it is.
+PIC_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def _is_pic_digest(pic):
+    return bool(pic) and len(pic) == 64 and all(ch in '0123456789abcdef' for ch in pic)
+
+def _pic_dir(digest):
+    return os.path.join(PROFILE_PICS_DIR, digest[:2])
+
+def _pic_file(digest, size):
+    return os.path.join(_pic_dir(digest), f"{digest}_{size}.jpg")
+
+def _pic_original(digest):
+    """The as-uploaded copy kept when Pillow is not available, or None."""
+    for ext in PIC_EXTENSIONS:
+        path = os.path.join(_pic_dir(digest), digest + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _write_atomic(path, write):
+    """write(f) into a temp file, then rename it over path — never half a picture."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+def _flatten(img):
+    """RGB copy of img, with any transparency laid over white (JPEG has no alpha)."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        flat = PILImage.new('RGB', img.size, (255, 255, 255))
+        flat.paste(img, mask=img.getchannel('A'))
+        return flat
+    return img.convert('RGB')
+
+def ingest_profile_pic(src_path):
+    """
+    Stores an uploaded picture as square PROFILE_THUMB_SIZES thumbnails and
+    returns the digest to save in profiles.profile_pic. Content that is already
+    on disk is not decoded again. Runs on image_worker.
+    """
+    with open(src_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    os.makedirs(_pic_dir(digest), exist_ok=True)
+
+    if PILImage is None:
+        if not _pic_original(digest):
+            ext = os.path.splitext(src_path)[1].lower()
+            ext = ext if ext in PIC_EXTENSIONS else '.png'
+            _write_atomic(os.path.join(_pic_dir(digest), digest + ext), lambda f: f.write(data))
+        return digest
+
+    missing = [size for size in PROFILE_THUMB_SIZES if not os.path.exists(_pic_file(digest, size))]
+    if not missing:
+        return digest
+    with PILImage.open(io.BytesIO(data)) as img:
+        # A JPEG decodes straight at the 1/2..1/8 scale that still covers the
+        # largest thumbnail instead of at full camera resolution.
+        img.draft('RGB', (max(missing), max(missing)))
+        img = _flatten(ImageOps.exif_transpose(img))
+    for size in missing:
+        thumb = ImageOps.fit(img, (size, size), PILImage.LANCZOS)
+        _write_atomic(_pic_file(digest, size),
+                      lambda f: thumb.save(f, 'JPEG', quality=85, optimize=True))
+    return digest
+
+def profile_pic_path(pic, px):
+    """File to show a stored profile_pic at px pixels across, or '' if there is none."""
+    if not pic:
+        return ''
+    if not _is_pic_digest(pic):
+        return pic if os.path.exists(pic) else ''
+    # Smallest thumbnail that is not upscaled on screen, else the biggest there is
+    larger = [size for size in PROFILE_THUMB_SIZES if size >= px]
+    smaller = [size for size in reversed(PROFILE_THUMB_SIZES) if size < px]
+    for size in larger + smaller:
+        path = _pic_file(pic, size)
+        if os.path.exists(path):
+            return path
+    return _pic_original(pic) or ''
+
+def _release_profile_pic(pic):
+    """
+    Removes a picture's files once no profile refers to it any more. Queued on
+    image_worker, so it cannot interleave with an upload of the same content.
+    """
+    if not pic:
+        return
+    try:
+        if _is_pic_digest(pic):
+            c = db.cursor()
+            c.execute("SELECT 1 FROM profiles WHERE profile_pic=? LIMIT 1", (pic,))
+            if c.fetchone():
+                return
+            paths = [_pic_file(pic, size) for size in PROFILE_THUMB_SIZES] + [_pic_original(pic)]
+        else:
+            paths = [pic]   # full-size copy from before content addressing
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+    except Exception as e:
+        print(f"release profile pic error: {e}")
+
+def release_profile_pic(pic):
+    """Queues _release_profile_pic; runs it inline once image_worker has stopped."""
+    try:
+        image_worker.submit(_release_profile_pic, pic)
+    except RuntimeError:
+        _release_profile_pic(pic)
+
+
 # ── UI Helpers ────────────────────────────────────────────────────────────────
 def make_rounded_button(text, bg_color, text_color=WHITE, height=50, radius=12):
     btn = Button(
@@ -652,6 +2206,48 @@ def section_label(text, color=ACCENT):
     lbl.bind(size=lbl.setter('text_size'))
     return lbl
 
+def loading_label(text='⏳  Loading...', height=60):
+    lbl = Label(text=text, font_size='13sp', color=TEXT_MUTED,
+                size_hint_y=None, height=dp(height), halign='center')
+    lbl.bind(size=lbl.setter('text_size'))
+    return lbl
+
+def debounce(callback, delay):
+    # Waits for a pause in typing rather than running on every keystroke
+    Clock.unschedule(callback)
+    Clock.schedule_once(callback, delay)
+
+
+class ScrollPager:
+    """Calls fetch() for the next page when a RecycleView reaches its bottom edge (its top with at_top)."""
+    def __init__(self, rv, fetch, page_size, row_height=0, at_top=False):
+        self.rv, self.fetch, self.page_size = rv, fetch, page_size
+        self.row_height, self.at_top = row_height, at_top
+        self.has_more = False
+        self.loading = False
+        rv.bind(scroll_y=self._on_scroll)
+
+    def reset(self):
+        self.has_more = self.loading = False
+
+    def _on_scroll(self, rv, scroll_y):
+        at_edge = scroll_y >= 1 if self.at_top else scroll_y <= 0
+        if at_edge and self.has_more and not self.loading and rv.data:
+            self.loading = True
+            # Changing data from inside the scroll callback confuses the layout
+            Clock.schedule_once(lambda dt: self.fetch())
+
+    def loaded(self, rows):
+        """Called with each page as it arrives; a full page means there may be more."""
+        self.loading = False
+        self.has_more = len(rows) == self.page_size
+
+    def prepend(self, data):
+        """Adds older rows above the loaded ones, keeping the row the user was looking at in place."""
+        self.rv.data = data + list(self.rv.data)
+        scrollable = max(len(self.rv.data) * self.row_height - self.rv.height, 1)
+        self.rv.scroll_y = max(0, 1 - len(data) * self.row_height / scrollable)
+
 
 # ── Decorative Header Widget ──────────────────────────────────────────────────
 class HeroHeader(Widget):
@@ -706,6 +2302,410 @@ class HeroHeader(Widget):
         self._sub_lbl.halign = 'center'; self._sub_lbl.text_size = self._sub_lbl.size
 
 
+# ── Avatar Textures ───────────────────────────────────────────────────────────
+def _decode_image(path, px):
+    """
+    Decodes an image file on a worker thread, shrunk to fit px × px when Pillow
+    is available. Returns what _to_texture uploads.
+    """
+    if PILImage is None:
+        return ImageLoader.load(path, nocache=True)
+    with PILImage.open(path) as img:
+        img.draft('RGB', (px, px))
+        img = ImageOps.exif_transpose(img).convert('RGBA')
+    img.thumbnail((px, px), PILImage.LANCZOS)
+    return ImageData(img.width, img.height, 'rgba', img.tobytes())
+
+def _to_texture(decoded):
+    """Uploads a _decode_image result to the GPU — UI thread only."""
+    if decoded is None:
+        return None
+    if isinstance(decoded, ImageData):
+        return Texture.create_from_data(decoded)
+    return decoded.texture
+
+def load_texture(path, px, on_texture):
+    """Decodes path on image_worker, then calls on_texture(texture or None) on the UI thread."""
+    def failed(e):
+        print(f"Image decode error: {e}")
+        on_texture(None)
+    image_worker.submit(_decode_image, path, int(px),
+                        on_done=lambda decoded: on_texture(_to_texture(decoded)), on_error=failed)
+
+
+class AvatarCache:
+    """LRU of avatar textures keyed by (user, px), decoded on image_worker and dropped when a picture changes."""
+    def __init__(self, capacity=AVATAR_CACHE_SIZE):
+        self.capacity = capacity
+        self.stats = {'hits': 0, 'misses': 0, 'decodes': 0, 'evictions': 0}
+        self._textures = OrderedDict()   # (user, px) -> (profile_pic, texture or None), oldest first
+        self._waiting = {}               # (user, px) -> on_texture callbacks for a decode in flight
+        self._generation = 0             # bumped by invalidate(); older decodes are not cached
+        self._changes = None
+
+    def get(self, user, px, on_texture):
+        """
+        Calls on_texture(texture), with None when the user has no picture —
+        straight away on a hit, otherwise once the picture is decoded.
+        """
+        key = (user, int(px))
+        entry = self._textures.get(key)
+        if entry is not None:
+            self._textures.move_to_end(key)
+            self.stats['hits'] += 1
+            on_texture(entry[1])
+            return
+        self.stats['misses'] += 1
+        if key in self._waiting:
+            self._waiting[key].append(on_texture)
+            return
+        self._waiting[key] = [on_texture]
+        if self._changes is None:
+            self._changes = change_notifier.subscribe('profiles', self._on_profiles_changed)
+        generation = self._generation
+        image_worker.submit(self._load, user, key[1],
+                            on_done=lambda result: self._loaded(key, generation, result),
+                            on_error=lambda e: self._failed(key, e))
+
+    def invalidate(self, user=None):
+        """Drops the cached textures of one user, or of everyone."""
+        self._generation += 1
+        for key in [key for key in self._textures if user is None or key[0] == user]:
+            del self._textures[key]
+
+    @staticmethod
+    def _load(user, px):
+        pic = get_profile_pics([user]).get(user)
+        path = profile_pic_path(pic, px)
+        return pic, _decode_image(path, px) if path else None
+
+    def _loaded(self, key, generation, result):
+        pic, decoded = result
+        texture = _to_texture(decoded)
+        if decoded is not None:
+            self.stats['decodes'] += 1
+        if generation == self._generation:
+            self._textures[key] = (pic, texture)
+            while len(self._textures) > self.capacity:
+                self._textures.popitem(last=False)
+                self.stats['evictions'] += 1
+        for on_texture in self._waiting.pop(key, []):
+            on_texture(texture)
+
+    def _failed(self, key, e):
+        print(f"Avatar load error: {e}")
+        for on_texture in self._waiting.pop(key, []):
+            on_texture(None)
+
+    def _on_profiles_changed(self, tables):
+        users = sorted({user for user, px in self._textures})
+        if users:
+            db_worker.submit(get_profile_pics, users, on_done=self._revalidate)
+
+    def _revalidate(self, pics):
+        for user in {user for (user, px), (pic, texture) in self._textures.items() if pics.get(user) != pic}:
+            self.invalidate(user)
+
+
+avatar_cache = AvatarCache()
+
+
+class AvatarCircle(Label):
+    """A round avatar: the user's initial on their colour, covered by their picture once loaded."""
+    def __init__(self, **kwargs):
+        super().__init__(bold=True, color=WHITE, **kwargs)
+        self._user = None
+        with self.canvas.before:
+            self._disc_color = Color(*PRIMARY, 0.85)
+            self._disc = Ellipse(pos=self.pos, size=self.size)
+            self._pic_color = Color(1, 1, 1, 0)
+            self._pic = Ellipse(pos=self.pos, size=self.size)
+        self.bind(pos=self._redraw, size=self._redraw)
+
+    def _redraw(self, *_):
+        for shape in (self._disc, self._pic):
+            shape.pos, shape.size = self.pos, self.size
+
+    def show(self, user, color, picture=True):
+        """
+        Shows `user`, with their picture unless picture=False. A recycled row may
+        call this again for someone else before the first decode lands.
+        """
+        self._user = user
+        self._disc_color.rgba = (*color[:3], 0.85)
+        self.text = user[:1].upper() if user else '?'
+        self._pic_color.a = 0
+        if user and picture:
+            avatar_cache.get(user, self.width, lambda texture: self._show_texture(user, texture))
+
+    def _show_texture(self, user, texture):
+        if user != self._user or texture is None:
+            return
+        self._pic.texture = texture
+        self._pic_color.a = 1
+        self.text = ''
+
+
+# ── Recyclable Chat Bubble ────────────────────────────────────────────────────
+class ChatBubble(RecycleDataViewBehavior, BoxLayout):
+    """One recyclable ChatScreen row: built once, then re-bound to whichever message scrolls into view."""
+    msg_id    = NumericProperty(0)
+    user_name = StringProperty('')
+    message   = StringProperty('')
+    timestamp = StringProperty('')
+    selected  = BooleanProperty(False)
+    row_height = CHAT_ROW_HEIGHT
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint_y=None, height=dp(self.row_height), padding=[dp(6), dp(4)], **kwargs)
+        self.chat_screen = None
+        self.bubble = BoxLayout(orientation='vertical',
+                                size_hint_y=None, padding=[dp(12), dp(8)], spacing=dp(2))
+        self.bubble.height = dp(self.row_height - 10)
+        with self.bubble.canvas.before:
+            self._bg_color = Color(*PRIMARY)
+            self._bg = RoundedRectangle(pos=self.bubble.pos, size=self.bubble.size, radius=[dp(16)])
+        self.bubble.bind(
+            pos=lambda w, v: setattr(self._bg, 'pos', v),
+            size=lambda w, v: setattr(self._bg, 'size', v)
+        )
+        self.name_lbl = Label(font_size='11sp', bold=True,
+                              size_hint_y=None, height=dp(20), halign='left', valign='middle')
+        self.name_lbl.bind(size=self.name_lbl.setter('text_size'))
+
+        self.msg_row = BoxLayout(size_hint_y=None, height=dp(26))
+        self.msg_lbl = Label(font_size='13sp', halign='left', valign='middle')
+        self.msg_lbl.bind(size=self.msg_lbl.setter('text_size'))
+        self.msg_row.add_widget(self.msg_lbl)
+
+        self.del_btn = Button(text='✕', font_size='11sp',
+                              size_hint=(None, None), size=(dp(24), dp(24)),
+                              background_color=(0.8, 0.1, 0.1, 0.7),
+                              background_normal='', color=WHITE)
+        self.del_btn.bind(on_press=lambda *_: self.chat_screen and self.chat_screen.bubble_pressed(self.msg_id))
+
+        self.bubble.add_widget(self.name_lbl); self.bubble.add_widget(self.msg_row)
+        self.avatar = AvatarCircle(font_size='14sp', size_hint=(None, None), size=(dp(36), dp(36)),
+                                   pos_hint={'center_y': 0.5})
+        self.add_widget(self.avatar)
+        self.add_widget(self.bubble)
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.chat_screen = getattr(rv, 'chat_screen', None)
+        self.apply_style()
+
+    def apply_style(self):
+        is_me = (self.user_name == current_user)
+
+        if is_me:
+            self._bg_color.rgba = PRIMARY
+            self._bg.radius = [dp(16), dp(16), dp(4), dp(16)]
+            name_color = (0.8, 0.9, 1.0, 1); msg_color = WHITE
+        else:
+            user_color = get_user_color(self.user_name)
+            self._bg_color.rgba = (*user_color[:3], 0.20)
+            self._bg.radius = [dp(16), dp(16), dp(16), dp(4)]
+            name_color = user_color; msg_color = TEXT_DARK
+        self.avatar.show(self.user_name, PRIMARY if is_me else get_user_color(self.user_name))
+
+        admin_badge = ' 👑' if self.user_name == ADMIN_NAME else ''
+        dot = '🔵' if is_me else '●'
+        self.name_lbl.text = f"{dot} {self.user_name}{admin_badge}"
+        self.name_lbl.color = name_color
+        self.msg_lbl.text = f"{self.message}  [{self.timestamp[11:16]}]"
+        self.msg_lbl.color = msg_color
+
+        if is_admin and self.del_btn.parent is None:
+            self.msg_row.add_widget(self.del_btn)
+        elif not is_admin and self.del_btn.parent is not None:
+            self.msg_row.remove_widget(self.del_btn)
+
+        # In moderation mode the same button becomes the row's checkbox
+        if self.chat_screen is not None and self.chat_screen.select_mode:
+            self.del_btn.text = '☑' if self.selected else '☐'
+            self.del_btn.background_color = (0.8, 0.1, 0.1, 0.9) if self.selected else (0.45, 0.55, 0.65, 0.6)
+        else:
+            self.del_btn.text = '✕'
+            self.del_btn.background_color = (0.8, 0.1, 0.1, 0.7)
+
+
+class DMBubble(ChatBubble):
+    """DMScreen's recyclable row: ChatBubble's widgets with inbox colours and no moderation button."""
+    sender_email = StringProperty('')
+    row_height = DM_ROW_HEIGHT
+
+    def apply_style(self):
+        if self.sender_email == current_user_email:
+            self._bg_color.rgba = INBOX_COLOR
+            self._bg.radius = [dp(16), dp(16), dp(4), dp(16)]
+            name_color = (0.75, 0.92, 1.0, 1); msg_color = WHITE
+        else:
+            other_col = get_user_color(self.user_name)
+            self._bg_color.rgba = (*other_col[:3], 0.18)
+            self._bg.radius = [dp(16), dp(16), dp(16), dp(4)]
+            name_color = other_col; msg_color = TEXT_DARK
+        self.avatar.show(self.user_name, INBOX_COLOR if self.sender_email == current_user_email
+                         else get_user_color(self.user_name))
+
+        self.name_lbl.text = self.user_name
+        self.name_lbl.color = name_color
+        self.msg_lbl.text = f"{self.message}  [{self.timestamp[11:16]}]"
+        self.msg_lbl.color = msg_color
+
+
+# ── Recyclable Search Result ──────────────────────────────────────────────────
+def snippet_markup(snippet, color='1a61c7'):
+    """Escapes a search snippet for Kivy markup and turns its hit markers into bold colour."""
+    text = escape_markup(snippet.replace('\n', ' '))
+    return text.replace(SNIPPET_OPEN, f'[b][color={color}]').replace(SNIPPET_CLOSE, '[/color][/b]')
+
+
+class SearchResultRow(RecycleDataViewBehavior, Button):
+    """One SearchScreen hit. DM hits carry their conversation so a tap opens it."""
+    conversation_id    = NumericProperty(0)
+    conversation_title = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(markup=True, halign='left', valign='middle', font_size='12sp',
+                         color=TEXT_DARK, background_normal='', background_color=CARD_BG,
+                         padding=[dp(12), dp(6)], **kwargs)
+        self.search_screen = None
+        self.bind(size=self.setter('text_size'))
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.search_screen = getattr(rv, 'search_screen', None)
+
+    def on_press(self):
+        if self.search_screen and self.conversation_id:
+            self.search_screen.open_conversation(self.conversation_id, self.conversation_title)
+
+
+# ── Recyclable User Row ───────────────────────────────────────────────────────
+def user_status_title(name, approved):
+    status_icon = '✅' if approved == 1 else ('❌' if approved == -1 else '⏳')
+    return f'{status_icon} {name}'
+
+
+class UserRow(RecycleDataViewBehavior, BoxLayout):
+    """One AdminScreen user. Approve / Reject are only shown while the user is pending."""
+    email    = StringProperty('')
+    name     = StringProperty('')
+    approved = NumericProperty(0)
+    joined   = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint_y=None, height=dp(USER_ROW_HEIGHT), spacing=dp(8),
+                         padding=[dp(10), dp(6)], **kwargs)
+        self.admin_screen = None
+        with self.canvas.before:
+            self._bg_color = Color(*ACCENT, 0.06)
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(8)])
+        self.bind(pos=lambda w, v: setattr(self._bg, 'pos', v),
+                  size=lambda w, v: setattr(self._bg, 'size', v))
+
+        info = BoxLayout(orientation='vertical', spacing=dp(2))
+        self.name_lbl = Label(font_size='13sp', bold=True, color=TEXT_DARK,
+                              halign='left', valign='middle', size_hint_y=None, height=dp(24))
+        self.name_lbl.bind(size=self.name_lbl.setter('text_size'))
+        self.email_lbl = Label(font_size='10sp', color=TEXT_MUTED,
+                               halign='left', valign='middle', size_hint_y=None, height=dp(18))
+        self.email_lbl.bind(size=self.email_lbl.setter('text_size'))
+        info.add_widget(self.name_lbl); info.add_widget(self.email_lbl)
+        self.add_widget(info)
+
+        self.decide_col = BoxLayout(orientation='vertical', spacing=dp(4), size_hint=(None, 1), width=dp(100))
+        ap_btn = make_rounded_button('✅ Approve', SUCCESS_GREEN, height=24, radius=6)
+        ap_btn.font_size = '12sp'
+        rj_btn = make_rounded_button('❌ Reject', DANGER, height=24, radius=6)
+        rj_btn.font_size = '12sp'
+        ap_btn.bind(on_press=lambda *_: self.admin_screen and self.admin_screen.do_approve(self.email))
+        rj_btn.bind(on_press=lambda *_: self.admin_screen and self.admin_screen.do_reject(self.email))
+        self.decide_col.add_widget(ap_btn); self.decide_col.add_widget(rj_btn)
+
+        del_btn = make_rounded_button('🗑', DANGER, height=40, radius=8)
+        del_btn.size_hint_x = None; del_btn.width = dp(44)
+        del_btn.bind(on_press=lambda *_: self.admin_screen and self.admin_screen.confirm_delete_user(self.email))
+        self.add_widget(del_btn)
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.admin_screen = getattr(rv, 'admin_screen', None)
+        pending = self.approved == 0
+        self._bg_color.rgba = (0.95, 0.75, 0.10, 0.12) if pending else (*ACCENT, 0.06)
+        self.name_lbl.text = user_status_title(self.name, self.approved)
+        self.email_lbl.text = f'{self.email}  ·  Joined {self.joined[:10]}' if self.joined else self.email
+        if pending and self.decide_col.parent is None:
+            self.add_widget(self.decide_col, index=1)
+        elif not pending and self.decide_col.parent is not None:
+            self.remove_widget(self.decide_col)
+
+
+# ── Recyclable Member Row ─────────────────────────────────────────────────────
+MEMBER_AVATARS = ['🧑', '👩', '🧔', '👱', '🧕', '👲', '🧑‍💻', '👩‍💼', '🧑‍🎨', '👩‍🔬']
+
+
+class MemberRow(RecycleDataViewBehavior, BoxLayout):
+    """One ViewUsersScreen member card, re-bound to another member's data as the list scrolls."""
+    name   = StringProperty('')
+    email  = StringProperty('')
+    avatar = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint_y=None, height=dp(MEMBER_ROW_HEIGHT),
+                         padding=dp(12), spacing=dp(12), **kwargs)
+        # The same shadow and background as make_card
+        with self.canvas.before:
+            Color(0.10, 0.40, 0.80, 0.04)
+            self._shadow = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(14)])
+            Color(*CARD_BG)
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(14)])
+        self.bind(pos=lambda w, v: (setattr(self._shadow, 'pos', (v[0] + dp(2), v[1] - dp(2))),
+                                    setattr(self._bg, 'pos', v)),
+                  size=lambda w, v: (setattr(self._shadow, 'size', v), setattr(self._bg, 'size', v)))
+        self.av = Label(font_size='22sp', size_hint=(None, None), size=(dp(44), dp(44)))
+        with self.av.canvas.before:
+            Color(*PRIMARY, 0.15)
+            self._av_bg = Ellipse(pos=self.av.pos, size=self.av.size)
+        self.av.bind(pos=lambda w, v: setattr(self._av_bg, 'pos', v))
+        info = BoxLayout(orientation='vertical')
+        self.name_lbl = Label(font_size='14sp', bold=True, color=TEXT_DARK, halign='left', valign='middle')
+        self.name_lbl.bind(size=self.name_lbl.setter('text_size'))
+        self.email_lbl = Label(font_size='11sp', color=TEXT_MUTED, halign='left', valign='middle')
+        self.email_lbl.bind(size=self.email_lbl.setter('text_size'))
+        info.add_widget(self.name_lbl); info.add_widget(self.email_lbl)
+        self.add_widget(self.av); self.add_widget(info)
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.av.text = self.avatar
+        self.name_lbl.text = self.name
+        self.email_lbl.text = self.email
+
+
+# ── Recyclable Picker Row ─────────────────────────────────────────────────────
+class PickerRow(RecycleDataViewBehavior, Button):
+    """One UserPicker match; a tap hands the user to the picker."""
+    email = StringProperty('')
+    name  = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super().__init__(halign='left', valign='middle', font_size='14sp', color=WHITE,
+                         background_normal='', background_color=PRIMARY_DARK,
+                         padding=[dp(12), dp(6)], **kwargs)
+        self.picker = None
+        self.bind(size=self.setter('text_size'))
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.picker = getattr(rv, 'picker', None)
+
+    def on_press(self):
+        if self.picker:
+            self.picker.pressed(self.email, self.name)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  SCREENS
 # ══════════════════════════════════════════════════════════════════════════════
@@ -753,6 +2753,10 @@ class HomeScreen(Screen):
         b_chat.bind(on_press=self.go_chat)
         inner.add_widget(b_chat)
 
+        b_search = make_rounded_button('  🔍  Search', (1,1,1,1), text_color=PRIMARY_DARK, height=52)
+        b_search.bind(on_press=self.go_search)
+        inner.add_widget(b_search)
+
         inner.add_widget(section_label('You'))
         b_prof = make_rounded_button('  My Profile', (1,1,1,1), text_color=PRIMARY_DARK, height=52)
         b_prof.bind(on_press=self.go_profile)
@@ -783,6 +2787,7 @@ class HomeScreen(Screen):
         self.add_widget(root)
 
     def on_enter(self):
+        refresh_scheduler.cancel('home')
         if current_user:
             badge = '  [color=cc00cc][b]👑 ADMIN[/b][/color]' if is_admin else ''
             pending_badge = '  [color=ffaa00]⏳ Pending[/color]' if (not is_admin and not is_approved) else ''
@@ -791,6 +2796,10 @@ class HomeScreen(Screen):
 
             if is_approved or is_admin:
                 self.inbox_btn.opacity = 1; self.inbox_btn.disabled = False
+                refresh_scheduler.register(
+                    'home', 'unread_badge', get_total_unread, self._show_unread_badge,
+                    args=lambda: (current_user_email,) if current_user_email else None,
+                    tables=('conversation_members',), run_now=True)
             else:
                 self.inbox_btn.opacity = 0; self.inbox_btn.disabled = True
 
@@ -803,9 +2812,9 @@ class HomeScreen(Screen):
 
             if is_admin:
                 self.admin_btn.opacity = 1; self.admin_btn.disabled = False
-                pending = get_pending_count()
-                badge_txt = f'  🛡️  Admin Panel ({pending} pending)' if pending else '  🛡️  Admin Panel'
-                self.admin_btn.text = badge_txt
+                refresh_scheduler.register(
+                    'home', 'pending_badge', get_pending_count, self._show_pending_badge,
+                    tables=('users',), run_now=True)
             else:
                 self.admin_btn.opacity = 0; self.admin_btn.disabled = True
         else:
@@ -813,8 +2822,20 @@ class HomeScreen(Screen):
             self.logout_btn.opacity = 0; self.logout_btn.disabled = True
             self.admin_btn.opacity = 0; self.admin_btn.disabled = True
             self.inbox_btn.opacity = 0; self.inbox_btn.disabled = True
+            self.inbox_btn.text = '  📬  Inbox'
             self.pending_lbl.text = ''; self.pending_lbl.height = dp(0)
 
+    def on_leave(self):
+        refresh_scheduler.cancel('home')
+
+    def _show_pending_badge(self, pending):
+        if not is_admin: return
+        self.admin_btn.text = f'  🛡️  Admin Panel ({pending} pending)' if pending else '  🛡️  Admin Panel'
+
+    def _show_unread_badge(self, unread):
+        if not current_user: return
+        self.inbox_btn.text = f'  📬  Inbox ({unread})' if unread else '  📬  Inbox'
+
     def go_chat(self, *_):
         if not current_user:
             self.status_lbl.text = '⚠️  Please login first'; return
@@ -822,6 +2843,13 @@ class HomeScreen(Screen):
             self.status_lbl.text = '⏳  Waiting for admin approval'; return
         self.manager.current = 'chat'
 
+    def go_search(self, *_):
+        if not current_user:
+            self.status_lbl.text = '⚠️  Please login first'; return
+        if not is_admin and not is_approved:
+            self.status_lbl.text = '⏳  Waiting for admin approval'; return
+        self.manager.current = 'search'
+
     def go_profile(self, *_):
         if current_user: self.manager.current = 'profile'
         else: self.status_lbl.text = '⚠️  Please login first'
@@ -870,11 +2898,11 @@ class RegisterScreen(Screen):
         form.add_widget(self.msg)
 
         btn_row = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(52))
-        b_reg  = make_rounded_button('  Register', PRIMARY, height=52)
+        self.reg_btn = make_rounded_button('  Register', PRIMARY, height=52)
         b_back = make_rounded_button('  Back', (1,1,1,1), text_color=PRIMARY_DARK, height=52)
-        b_reg.bind(on_press=self.register)
+        self.reg_btn.bind(on_press=self.register)
         b_back.bind(on_press=lambda *_: setattr(self.manager, 'current', 'home'))
-        btn_row.add_widget(b_reg); btn_row.add_widget(b_back)
+        btn_row.add_widget(self.reg_btn); btn_row.add_widget(b_back)
         form.add_widget(btn_row)
 
         scroll.add_widget(form)
@@ -900,7 +2928,14 @@ class RegisterScreen(Screen):
             self.msg.color = DANGER
             self.msg.text = '⚠️  This email is reserved'; return
 
-        result = insert_user(name, email, password, phone)
+        self.msg.color = TEXT_MUTED
+        self.msg.text = '⏳  Creating your account...'
+        self.reg_btn.disabled = True
+        password_worker.submit(after_setup, insert_user, name, email, password, phone,
+                               on_done=self._on_registered)
+
+    def _on_registered(self, result):
+        self.reg_btn.disabled = False
         if result is True:
             self.msg.color = SUCCESS_GREEN
             self.msg.text = '🎉  Registered! Waiting for admin approval.'
@@ -937,11 +2972,11 @@ class LoginScreen(Screen):
         form.add_widget(self.msg)
 
         btn_row = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(52))
-        b_login = make_rounded_button('  Login', PRIMARY, height=52)
+        self.login_btn = make_rounded_button('  Login', PRIMARY, height=52)
         b_back  = make_rounded_button('  Back', PRIMARY_LIGHT, text_color=PRIMARY_DARK, height=52)
-        b_login.bind(on_press=self.login)
+        self.login_btn.bind(on_press=self.login)
         b_back.bind(on_press=lambda *_: setattr(self.manager, 'current', 'home'))
-        btn_row.add_widget(b_login); btn_row.add_widget(b_back)
+        btn_row.add_widget(self.login_btn); btn_row.add_widget(b_back)
         form.add_widget(btn_row)
 
         scroll.add_widget(form)
@@ -949,10 +2984,17 @@ class LoginScreen(Screen):
         self.add_widget(root)
 
     def login(self, *_):
-        global current_user, current_user_email, is_admin, is_approved
         email    = self.email_input.text.strip()
         password = self.pass_input.text.strip()
-        result   = check_user(email, password)
+        self.msg.color = TEXT_MUTED
+        self.msg.text  = '⏳  Signing in...'
+        self.login_btn.disabled = True
+        password_worker.submit(after_setup, check_user, email, password,
+                               on_done=lambda result: self._on_checked(email, result))
+
+    def _on_checked(self, email, result):
+        global current_user, current_user_email, is_admin, is_approved
+        self.login_btn.disabled = False
         if result:
             name, admin, approved = result
             current_user       = name
@@ -988,49 +3030,61 @@ class ViewUsersScreen(Screen):
         self.stats_lbl.bind(size=self.stats_lbl.setter('text_size'))
         inner.add_widget(self.stats_lbl)
 
-        self.scroll = ScrollView(size_hint_y=1)
-        self.user_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(8))
-        self.user_layout.bind(minimum_height=self.user_layout.setter('height'))
-        self.scroll.add_widget(self.user_layout)
-        inner.add_widget(self.scroll)
+        # Only the members on screen have widgets; more pages load as the list is scrolled
+        self.empty_lbl = Label(text='', color=TEXT_MUTED, size_hint_y=None, height=dp(0))
+        inner.add_widget(self.empty_lbl)
+        self.rv = RecycleView(size_hint_y=1)
+        self.rv.viewclass = MemberRow
+        self.member_layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                              default_size=(None, dp(MEMBER_ROW_HEIGHT)),
+                                              default_size_hint=(1, None), spacing=dp(8))
+        self.member_layout.bind(minimum_height=self.member_layout.setter('height'))
+        self.rv.add_widget(self.member_layout)
+        self.pager = ScrollPager(self.rv, self._load_more, MEMBER_PAGE_SIZE)
+        inner.add_widget(self.rv)
 
         b_back = make_rounded_button('  Back to Home', (1,1,1,1), text_color=PRIMARY_DARK, height=48)
         b_back.bind(on_press=lambda *_: setattr(self.manager, 'current', 'home'))
         inner.add_widget(b_back)
         root.add_widget(inner)
         self.add_widget(root)
+        self._load_id = 0
+        self._after = None
 
     def on_enter(self):
-        self.user_layout.clear_widgets()
-        users = get_users()
-        approved_users = [u for u in users if u[4] == 1]
-        self.stats_lbl.text = f'👥  {len(approved_users)} approved member{"s" if len(approved_users) != 1 else ""}'
-        avatars = ['🧑', '👩', '🧔', '👱', '🧕', '👲', '🧑‍💻', '👩‍💼', '🧑‍🎨', '👩‍🔬']
-
-        if approved_users:
-            for i, (name, email, admin_flag, created_at, approved) in enumerate(approved_users):
-                card = make_card(padding=12, spacing=6)
-                card.size_hint_y = None; card.height = dp(68)
-                row = BoxLayout(spacing=dp(12))
-                av = Label(text=avatars[i % len(avatars)], font_size='22sp',
-                           size_hint=(None, None), size=(dp(44), dp(44)))
-                with av.canvas.before:
-                    Color(*PRIMARY, 0.15); Ellipse(pos=av.pos, size=av.size)
-                av.bind(pos=lambda w, v: setattr(w.canvas.before.children[-1], 'pos', v))
-                info = BoxLayout(orientation='vertical')
-                n_lbl = Label(text=name, font_size='14sp', bold=True, color=TEXT_DARK,
-                              halign='left', valign='middle')
-                n_lbl.bind(size=n_lbl.setter('text_size'))
-                e_lbl = Label(text=email, font_size='11sp', color=TEXT_MUTED, halign='left', valign='middle')
-                e_lbl.bind(size=e_lbl.setter('text_size'))
-                info.add_widget(n_lbl); info.add_widget(e_lbl)
-                row.add_widget(av); row.add_widget(info)
-                card.add_widget(row)
-                self.user_layout.add_widget(card)
+        self._load_id += 1
+        self._after = None
+        self.pager.reset()
+        self.rv.data = []
+        self.rv.scroll_y = 1
+        self.stats_lbl.text = '⏳  Loading...'
+        load_id = self._load_id
+        db_worker.submit(lambda: (get_member_count(), get_members_page()),
+                         on_done=lambda result: self._show_first(load_id, *result))
+
+    def _show_first(self, load_id, count, members):
+        if load_id != self._load_id: return
+        self.stats_lbl.text = f'👥  {count} approved member{"s" if count != 1 else ""}'
+        self._show_members(load_id, members)
+
+    def _load_more(self):
+        load_id = self._load_id
+        db_worker.submit(get_members_page, self._after,
+                         on_done=lambda members: self._show_members(load_id, members))
+
+    def _show_members(self, load_id, members):
+        if load_id != self._load_id: return   # the screen was re-entered since
+        self.pager.loaded(members)
+        if members:
+            self._after = (members[-1][1], members[-1][0])
+            start = len(self.rv.data)
+            self.rv.data = list(self.rv.data) + [
+                {'name': name, 'email': email, 'avatar': MEMBER_AVATARS[(start + i) % len(MEMBER_AVATARS)]}
+                for i, (_, name, email) in enumerate(members)]
+        if self.rv.data:
+            self.empty_lbl.text = ''; self.empty_lbl.height = dp(0)
         else:
-            self.user_layout.add_widget(
-                Label(text='No approved members yet.', color=TEXT_MUTED,
-                      size_hint_y=None, height=dp(60)))
+            self.empty_lbl.text = 'No approved members yet.'; self.empty_lbl.height = dp(60)
 
 
 # ── Chat Room ─────────────────────────────────────────────────────────────────
@@ -1050,11 +3104,24 @@ class ChatScreen(Screen):
         root.add_widget(top_row)
 
         # ── Message list ──────────────────────────────────────────────────────
-        self.scroll = ScrollView(size_hint_y=1)
-        self.chat_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(8))
+        # A RecycleView only keeps widgets for the rows on screen, so history
+        # can be paged in without limit as the user scrolls up.
+        self.empty_lbl = Label(text='', font_size='13sp', color=TEXT_MUTED,
+                               size_hint_y=None, height=dp(0), halign='center')
+        self.empty_lbl.bind(size=self.empty_lbl.setter('text_size'))
+        root.add_widget(self.empty_lbl)
+
+        self.rv = RecycleView(size_hint_y=1)
+        self.rv.viewclass = ChatBubble
+        self.rv.chat_screen = self
+        self.chat_layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                            default_size=(None, dp(CHAT_ROW_HEIGHT)),
+                                            default_size_hint=(1, None), spacing=dp(8))
         self.chat_layout.bind(minimum_height=self.chat_layout.setter('height'))
-        self.scroll.add_widget(self.chat_layout)
-        root.add_widget(self.scroll)
+        self.rv.add_widget(self.chat_layout)
+        self.pager = ScrollPager(self.rv, self._load_older, CHAT_PAGE_SIZE,
+                                 row_height=dp(CHAT_ROW_HEIGHT) + dp(8), at_top=True)
+        root.add_widget(self.rv)
 
         # ── Input row ─────────────────────────────────────────────────────────
         input_row = BoxLayout(size_hint_y=None, height=dp(56),
@@ -1082,10 +3149,44 @@ class ChatScreen(Screen):
         self.clear_btn.size_hint_x = 0.16
         self.clear_btn.bind(on_press=self.clear_chat_admin)
 
+        # Admin-only multi-select moderation toggle (added/removed in on_enter)
+        self.select_btn = make_rounded_button('☑', ACCENT2, height=42, radius=20)
+        self.select_btn.size_hint_x = 0.16
+        self.select_btn.bind(on_press=self.toggle_select_mode)
+
         input_row.add_widget(self.msg_input)
         input_row.add_widget(send_btn)
         self._input_row = input_row
-        root.add_widget(input_row)
+
+        # ── Moderation bar (takes the input row's place while selecting) ──────
+        self.select_mode = False
+        self._selected = set()
+        mod_bar = BoxLayout(size_hint_y=None, height=dp(56),
+                            padding=[dp(8), dp(6)], spacing=dp(8))
+        with mod_bar.canvas.before:
+            Color(*CARD_BG)
+            mod_bar._bg = Rectangle(pos=mod_bar.pos, size=mod_bar.size)
+        mod_bar.bind(
+            pos=lambda w, v: setattr(w._bg, 'pos', v),
+            size=lambda w, v: setattr(w._bg, 'size', v)
+        )
+        self.selected_lbl = Label(text='Tap ☐ to select', font_size='13sp', color=TEXT_DARK,
+                                  halign='left', valign='middle')
+        self.selected_lbl.bind(size=self.selected_lbl.setter('text_size'))
+        self.del_selected_btn = make_rounded_button('🗑  Delete', DANGER, height=42, radius=20)
+        self.del_selected_btn.size_hint_x = 0.34
+        self.del_selected_btn.bind(on_press=self.delete_selected)
+        done_btn = make_rounded_button('Done', (1, 1, 1, 1), text_color=PRIMARY_DARK, height=42, radius=20)
+        done_btn.size_hint_x = 0.24
+        done_btn.bind(on_press=self.toggle_select_mode)
+        mod_bar.add_widget(self.selected_lbl)
+        mod_bar.add_widget(self.del_selected_btn)
+        mod_bar.add_widget(done_btn)
+        self._mod_bar = mod_bar
+
+        self._bottom = BoxLayout(size_hint_y=None, height=dp(56))
+        self._bottom.add_widget(input_row)
+        root.add_widget(self._bottom)
 
         # ── Back button ───────────────────────────────────────────────────────
         b_back = make_rounded_button('  Back', (1, 1, 1, 1), text_color=PRIMARY_DARK, height=44)
@@ -1095,19 +3196,22 @@ class ChatScreen(Screen):
         self.add_widget(root)
 
     def on_enter(self):
-        Clock.unschedule(self._auto_refresh_chat)
-        self._last_msg_hash = None
+        refresh_scheduler.cancel('chat')
+        self._last_msg_id = None    # None until the first page has arrived
+        self.pager.reset()
 
         _allowed = bool(current_user) and (bool(is_admin) or bool(is_approved))
         _is_adm  = bool(is_admin)
 
-        # 🗑 clear button — admin only
-        if _is_adm:
-            if self.clear_btn not in self._input_row.children:
-                self._input_row.add_widget(self.clear_btn)
-        else:
-            if self.clear_btn in self._input_row.children:
-                self._input_row.remove_widget(self.clear_btn)
+        # 🗑 clear and ☑ select buttons — admin only
+        for btn in (self.select_btn, self.clear_btn):
+            if _is_adm:
+                if btn not in self._input_row.children:
+                    self._input_row.add_widget(btn)
+            else:
+                if btn in self._input_row.children:
+                    self._input_row.remove_widget(btn)
+        self._set_select_mode(False)
 
         # Show appropriate hint in the text input
         if not current_user:
@@ -1121,101 +3225,178 @@ class ChatScreen(Screen):
             self.msg_input.disabled = False
 
         if not _allowed:
-            self.chat_layout.clear_widgets()
+            self.rv.data = []
+            self.empty_lbl.text = ''; self.empty_lbl.height = dp(0)
             return
 
         self.load_messages()
-        Clock.schedule_interval(self._auto_refresh_chat, 3)
+        # Only the rows past the newest rendered id are fetched, and only
+        # after a commit has actually touched the messages table; rows deleted
+        # elsewhere (another client, an admin) drop out at the same time
+        refresh_scheduler.register(
+            'chat', 'new_messages', self._fetch_updates, self._on_polled,
+            args=lambda: None if self._last_msg_id is None else (
+                self._last_msg_id, [row['msg_id'] for row in self.rv.data]),
+            tables=('messages',))
 
     def on_leave(self):
-        Clock.unschedule(self._auto_refresh_chat)
+        refresh_scheduler.cancel('chat')
 
-    def _auto_refresh_chat(self, dt):
-        if not self.msg_input.focus:
-            self.load_messages()
+    @staticmethod
+    def _fetch_updates(last_id, shown):
+        return get_messages_since(last_id), get_deleted_message_ids(shown)
+
+    def _on_polled(self, result):
+        new_msgs, gone = result
+        if gone:
+            self._drop_rows(gone)
+        if new_msgs:
+            self._append_messages(new_msgs)
 
     def load_messages(self, *_):
-        messages = get_messages()
-        msg_hash = hash(tuple((m[0], m[1], str(m[2])) for m in messages))
-        if msg_hash == getattr(self, '_last_msg_hash', None):
+        """Reset to the newest page — only on enter and after a clear-all."""
+        if not self.rv.data:
+            self.empty_lbl.text = '⏳  Loading messages...'; self.empty_lbl.height = dp(60)
+        db_worker.submit(get_recent_messages, CHAT_PAGE_SIZE, on_done=self._show_recent)
+
+    def _show_recent(self, messages):
+        self._last_msg_id = messages[-1][0] if messages else 0
+        self.pager.loaded(messages)
+        self.rv.data = [self._row_data(m) for m in messages]
+        self._update_empty()
+        self.rv.scroll_y = 0
+
+    @staticmethod
+    def _row_data(row):
+        msg_id, user_name, message, timestamp = row
+        return {'msg_id': msg_id, 'user_name': user_name,
+                'message': message, 'timestamp': str(timestamp), 'selected': False}
+
+    def _update_empty(self):
+        if self.rv.data:
+            self.empty_lbl.text = ''; self.empty_lbl.height = dp(0)
+        else:
+            self.empty_lbl.text = 'No messages yet — say hello! 👋'
+            self.empty_lbl.height = dp(60)
+
+    def _append_messages(self, messages, scroll_to_end=False):
+        """Adds rows newer than anything already loaded; existing rows are left alone."""
+        if self._last_msg_id is None:
             return
-        self._last_msg_hash = msg_hash
-        self.chat_layout.clear_widgets()
-
-        if not messages:
-            empty = Label(text='No messages yet — say hello! 👋',
-                          font_size='13sp', color=TEXT_MUTED,
-                          size_hint_y=None, height=dp(60), halign='center')
-            empty.bind(size=empty.setter('text_size'))
-            self.chat_layout.add_widget(empty)
+        rows = [self._row_data(m) for m in messages if m[0] > self._last_msg_id]
+        if not rows:
             return
-
-        for msg_idx, (user_name, message, timestamp) in enumerate(messages):
-            is_me = (user_name == current_user)
-            time_str = str(timestamp)[11:16]
-            user_color = get_user_color(user_name)
-
-            outer = BoxLayout(size_hint_y=None, height=dp(72), padding=[dp(6), dp(4)])
-            bubble = BoxLayout(orientation='vertical',
-                               size_hint_y=None, padding=[dp(12), dp(8)], spacing=dp(2))
-            bubble.height = dp(62)
-
-            if is_me:
-                with bubble.canvas.before:
-                    Color(*PRIMARY)
-                    bubble._bg = RoundedRectangle(pos=bubble.pos, size=bubble.size,
-                                                  radius=[dp(16), dp(16), dp(4), dp(16)])
-                name_color = (0.8, 0.9, 1.0, 1); msg_color = WHITE
-            else:
-                with bubble.canvas.before:
-                    Color(*user_color, 0.20)
-                    bubble._bg = RoundedRectangle(pos=bubble.pos, size=bubble.size,
-                                                  radius=[dp(16), dp(16), dp(16), dp(4)])
-                name_color = user_color; msg_color = TEXT_DARK
-
-            bubble.bind(
-                pos=lambda w, v: setattr(w._bg, 'pos', v),
-                size=lambda w, v: setattr(w._bg, 'size', v)
-            )
-            admin_badge = ' 👑' if user_name == ADMIN_NAME else ''
-            dot = '🔵' if is_me else '●'
-            name_lbl = Label(text=f"{dot} {user_name}{admin_badge}",
-                             font_size='11sp', bold=True, color=name_color,
-                             size_hint_y=None, height=dp(20), halign='left', valign='middle')
-            name_lbl.bind(size=name_lbl.setter('text_size'))
-
-            msg_row = BoxLayout(size_hint_y=None, height=dp(26))
-            msg_lbl = Label(text=f"{message}  [{time_str}]", font_size='13sp',
-                            color=msg_color, halign='left', valign='middle')
-            msg_lbl.bind(size=msg_lbl.setter('text_size'))
-            msg_row.add_widget(msg_lbl)
-
-            if is_admin:
-                idx_copy = msg_idx
-                del_btn = Button(text='✕', font_size='11sp',
-                                 size_hint=(None, None), size=(dp(24), dp(24)),
-                                 background_color=(0.8, 0.1, 0.1, 0.7),
-                                 background_normal='', color=WHITE)
-                del_btn.bind(on_press=lambda btn, i=idx_copy: self.delete_msg(i))
-                msg_row.add_widget(del_btn)
-
-            bubble.add_widget(name_lbl); bubble.add_widget(msg_row)
-            outer.add_widget(bubble)
-            self.chat_layout.add_widget(outer)
-
-        self.scroll.scroll_y = 0
-
-    def delete_msg(self, idx):
-        delete_message_by_index(idx)
-        self._last_msg_hash = None
-        self.load_messages()
+        # Follow the conversation only if the user was already at the bottom
+        at_bottom = scroll_to_end or self.rv.scroll_y <= 0.01
+        self.rv.data.extend(rows)
+        self._last_msg_id = rows[-1]['msg_id']
+        self._update_empty()
+        if at_bottom:
+            self.rv.scroll_y = 0
+
+    def _load_older(self):
+        if not self.rv.data:
+            self.pager.loading = False; return
+        db_worker.submit(get_messages_before, self.rv.data[0]['msg_id'], CHAT_PAGE_SIZE,
+                         on_done=self._prepend_older)
+
+    def _prepend_older(self, older):
+        self.pager.loaded(older)
+        if older:
+            self.pager.prepend([self._row_data(m) for m in older])
+
+    def bubble_pressed(self, msg_id):
+        if self.select_mode:
+            self._toggle_selected(msg_id)
+        else:
+            self.delete_msg(msg_id)
+
+    def delete_msg(self, msg_id):
+        db_worker.submit(delete_message, msg_id,
+                         on_done=lambda ok: ok and self._remove_row(msg_id))
+
+    def _remove_row(self, msg_id):
+        for i, row in enumerate(self.rv.data):
+            if row['msg_id'] == msg_id:
+                del self.rv.data[i]
+                break
+        self._update_empty()
+
+    def _drop_rows(self, ids):
+        self.rv.data = [row for row in self.rv.data if row['msg_id'] not in ids]
+        self._update_empty()
+        if self._selected & ids:
+            self._selected -= ids
+            self._update_selection_bar()
+
+    # ── Multi-select moderation ───────────────────────────────────────────────
+    def toggle_select_mode(self, *_):
+        self._set_select_mode(not self.select_mode)
+
+    def _set_select_mode(self, on):
+        self.select_mode = bool(on and is_admin)
+        self._selected = set()
+        self._bottom.clear_widgets()
+        self._bottom.add_widget(self._mod_bar if self.select_mode else self._input_row)
+        for row in self.rv.data:
+            row['selected'] = False
+        # Re-style the visible bubbles: ✕ buttons become checkboxes and back
+        self.rv.refresh_from_data()
+        self._update_selection_bar()
+
+    def _toggle_selected(self, msg_id):
+        for i, row in enumerate(self.rv.data):
+            if row['msg_id'] == msg_id:
+                selected = not row['selected']
+                # Replacing one item only re-binds that row's bubble
+                self.rv.data[i] = dict(row, selected=selected)
+                break
+        else:
+            return
+        if selected:
+            self._selected.add(msg_id)
+        else:
+            self._selected.discard(msg_id)
+        self._update_selection_bar()
+
+    def _update_selection_bar(self):
+        n = len(self._selected)
+        self.selected_lbl.text = f'{n} selected' if n else 'Tap ☐ to select'
+        self.del_selected_btn.text = f'🗑  Delete ({n})' if n else '🗑  Delete'
+        self.del_selected_btn.disabled = not n
+
+    def delete_selected(self, *_):
+        ids = set(self._selected)
+        if not ids or not is_admin: return
+        admin_email = current_user_email
+
+        def job():
+            deleted = delete_messages(ids)
+            if deleted:
+                log_admin_action(admin_email, "DELETE_MESSAGES", f"{deleted} deleted")
+            return deleted
+
+        self.del_selected_btn.disabled = True
+        db_worker.submit(job, on_done=lambda deleted: self._on_selected_deleted(ids, deleted))
+
+    def _on_selected_deleted(self, ids, deleted):
+        if deleted is None:
+            self._update_selection_bar(); return
+        # Drop just those rows; the rest of the history stays as loaded
+        self._drop_rows(ids)
+        self._set_select_mode(False)
 
     def send_message(self, *_):
         msg = self.msg_input.text.strip()
-        if msg and save_message(current_user, msg):
+        if msg:
+            save_message(current_user, msg, on_done=lambda ok: ok and self._on_sent(msg))
+
+    def _on_sent(self, msg):
+        if self.msg_input.text.strip() == msg:
             self.msg_input.text = ''
-            self._last_msg_hash = None
-            self.load_messages()
+        # Queued behind the insert, so the new row is always part of the result
+        db_worker.submit(get_messages_since, self._last_msg_id or 0,
+                         on_done=lambda rows: self._append_messages(rows, scroll_to_end=True))
 
     def clear_chat_admin(self, *_):
         if not is_admin: return
@@ -1229,21 +3410,84 @@ class ChatScreen(Screen):
         content.add_widget(btn_row)
         popup = Popup(title='Confirm', content=content, size_hint=(0.85, 0.35))
 
+        admin_email = current_user_email
+
+        def clear_and_log():
+            if clear_all_messages():
+                log_admin_action(admin_email, "CLEAR_ALL_MESSAGES")
+
         def do_clear(*_):
-            try:
-                conn = sqlite3.connect(DB_FILE, timeout=10)
-                c = conn.cursor(); c.execute("DELETE FROM messages")
-                conn.commit(); conn.close()
-                log_admin_action(current_user_email, "CLEAR_ALL_MESSAGES")
-            except: pass
-            self._last_msg_hash = None
             popup.dismiss()
-            self.load_messages()
+            db_worker.submit(clear_and_log, on_done=lambda _: self.load_messages())
 
         yes_btn.bind(on_press=do_clear); no_btn.bind(on_press=popup.dismiss); popup.open()
 
 
 # ── Admin Panel ───────────────────────────────────────────────────────────────
+class UserPager(ScrollPager):
+    """One AdminScreen user list, a page of get_users_page at a time; a filter change starts over."""
+    def __init__(self, rv, empty_lbl, empty_text, status=None):
+        super().__init__(rv, self._fetch, ADMIN_PAGE_SIZE)
+        self.empty_lbl, self.empty_text = empty_lbl, empty_text
+        self.status, self.prefix = status, ''
+        self._query_id = 0
+        self._after = None          # user_page_key of the last row loaded
+
+    def reload(self, status=None, prefix=''):
+        self.status, self.prefix = status, prefix
+        self._query_id += 1
+        self._after = None
+        self.has_more = False
+        self.loading = True
+        self.rv.data = []
+        self.empty_lbl.text = '⏳  Loading...'
+        self._fetch()
+
+    def refresh_args(self):
+        return (self.status, self.prefix, None)
+
+    def refresh(self, rows):
+        """Swaps in a freshly fetched first page (refresh_scheduler, when users changes)."""
+        self._query_id += 1         # drops any page still in flight
+        self._after = None
+        self.rv.data = []
+        self._show_page(self._query_id, rows)
+
+    def _fetch(self):
+        query_id, status, prefix = self._query_id, self.status, self.prefix
+        db_worker.submit(get_users_page, status, prefix, self._after,
+                         on_done=lambda rows: self._show_page(query_id, rows))
+
+    def _show_page(self, query_id, rows):
+        if query_id != self._query_id: return   # the filter has changed since
+        self.loaded(rows)
+        if rows:
+            self._after = user_page_key(rows[-1], self.prefix)
+            self.rv.data = list(self.rv.data) + [
+                {'email': email, 'name': name, 'approved': approved or 0, 'joined': str(created_at or '')}
+                for _, name, email, _, created_at, approved in rows]
+        self._update_empty()
+
+    def _update_empty(self):
+        self.empty_lbl.text = '' if self.rv.data else self.empty_text
+
+    def set_status(self, email, approved):
+        """Updates one user's row in place, or drops it if it no longer matches the status filter."""
+        if self.status is not None and USER_STATUSES[self.status] != approved:
+            self.drop(email); return
+        for row in self.rv.data:
+            if row['email'] == email:
+                row['approved'] = approved
+                self.rv.refresh_from_data()
+                return
+
+    def drop(self, email):
+        data = [row for row in self.rv.data if row['email'] != email]
+        if len(data) != len(self.rv.data):
+            self.rv.data = data
+            self._update_empty()
+
+
 class AdminScreen(Screen):
     def build(self):
         root = BoxLayout(orientation='vertical')
@@ -1283,7 +3527,7 @@ class AdminScreen(Screen):
                                 halign='center', valign='middle')
         self.users_stat.bind(size=self.users_stat.setter('text_size'))
         self.msgs_stat = Label(text='💬\n—', font_size='13sp', bold=True, color=ACCENT,
-                               halign='center', valign='middle')
+                               halign='center', valign='middle', markup=True)
         self.msgs_stat.bind(size=self.msgs_stat.setter('text_size'))
         self.pending_stat = Label(text='⏳\n—', font_size='13sp', bold=True, color=WARNING,
                                   halign='center', valign='middle')
@@ -1295,31 +3539,37 @@ class AdminScreen(Screen):
         inner.add_widget(stats_card)
 
         inner.add_widget(section_label('⏳  Pending Approvals', WARNING))
-        self.pending_scroll = ScrollView(size_hint_y=None, height=dp(220))
-        self.pending_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(6))
-        self.pending_layout.bind(minimum_height=self.pending_layout.setter('height'))
-        self.pending_scroll.add_widget(self.pending_layout)
-        inner.add_widget(self.pending_scroll)
+        self.pending_pager = self._user_list(inner, 220, '✅  No pending approvals.', status='pending')
 
         inner.add_widget(section_label('👥  User Management (Delete / Threat Removal)'))
-        self.users_scroll = ScrollView(size_hint_y=None, height=dp(240))
-        self.users_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(6))
-        self.users_layout.bind(minimum_height=self.users_layout.setter('height'))
-        self.users_scroll.add_widget(self.users_layout)
-        inner.add_widget(self.users_scroll)
-
-        inner.add_widget(section_label('🗑️  Clear Old Chats'))
+        filter_row = BoxLayout(size_hint_y=None, height=dp(36), spacing=dp(6))
+        self.user_status = None
+        self.status_btns = {}
+        for status, label in self.STATUS_FILTERS:
+            btn = make_rounded_button(label, PRIMARY_DARK, height=34, radius=10)
+            btn.font_size = '11sp'
+            btn.bind(on_press=lambda b, st=status: self.set_user_status_filter(st))
+            self.status_btns[status] = btn
+            filter_row.add_widget(btn)
+        inner.add_widget(filter_row)
+        self.user_prefix_input = styled_input('🔍  Name starts with...')
+        self.user_prefix_input.bind(text=lambda *_: self._schedule_user_filter())
+        inner.add_widget(self.user_prefix_input)
+        self.users_pager = self._user_list(inner, 240, 'No users match.')
+        self._style_status_filters()
+
+        inner.add_widget(section_label('🗄️  Archive Old Chats'))
         old_chat_card = make_card(padding=12, spacing=8)
         old_chat_card.size_hint_y = None; old_chat_card.height = dp(160)
         old_chat_card.add_widget(Label(
-            text='Delete messages older than:', font_size='13sp', color=TEXT_DARK,
+            text='Archive chat and DMs older than:', font_size='13sp', color=TEXT_DARK,
             halign='left', valign='middle', size_hint_y=None, height=dp(26)
         ))
         clr_row1 = BoxLayout(spacing=dp(8), size_hint_y=None, height=dp(44))
         for days, label in [(1, '1 Day'), (7, '7 Days'), (30, '30 Days')]:
             btn = make_rounded_button(label, (0.60, 0.20, 0.20, 1), height=40, radius=8)
             d = days
-            btn.bind(on_press=lambda b, d=d: self.clear_old(d))
+            btn.bind(on_press=lambda b, d=d: self.archive_old(d))
             clr_row1.add_widget(btn)
         old_chat_card.add_widget(clr_row1)
         b_clear_all = make_rounded_button('🗑️  Delete ALL Messages (No Filter)', DANGER, height=44)
@@ -1346,116 +3596,108 @@ class AdminScreen(Screen):
         root.add_widget(scroll)
         self.add_widget(root)
 
+    STATUS_FILTERS = ((None, 'All'), ('pending', '⏳ Pending'), ('approved', '✅ Approved'), ('rejected', '❌ Rejected'))
+
+    def _user_list(self, parent, height, empty_text, status=None):
+        """Adds a fixed-height RecycleView of UserRows to parent and returns its UserPager."""
+        empty_lbl = Label(text='', color=TEXT_MUTED, font_size='13sp', size_hint_y=None, height=dp(24))
+        parent.add_widget(empty_lbl)
+        rv = RecycleView(size_hint_y=None, height=dp(height))
+        rv.viewclass = UserRow
+        rv.admin_screen = self
+        layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                  default_size=(None, dp(USER_ROW_HEIGHT)),
+                                  default_size_hint=(1, None), spacing=dp(6))
+        layout.bind(minimum_height=layout.setter('height'))
+        rv.add_widget(layout)
+        parent.add_widget(rv)
+        return UserPager(rv, empty_lbl, empty_text, status)
+
     def on_enter(self):
-        self.users_stat.text   = f'👥\n{get_total_users_count()} Users'
-        self.msgs_stat.text    = f'💬\n{get_all_messages_count()} Msgs'
-        self.pending_stat.text = f'⏳\n{get_pending_count()} Pending'
-        self.load_pending_users()
-        self.load_all_users()
-        self.load_admin_logs()
-
-    def load_pending_users(self):
-        self.pending_layout.clear_widgets()
-        pending = get_pending_users()
-        if not pending:
-            self.pending_layout.add_widget(
-                Label(text='✅  No pending approvals.', color=SUCCESS_GREEN,
-                      font_size='13sp', size_hint_y=None, height=dp(44)))
-            return
+        self.users_stat.text   = '👥\n…'
+        self.msgs_stat.text    = '💬\n…'
+        self.pending_stat.text = '⏳\n…'
+        self.logs_layout.clear_widgets()
+        self.logs_layout.add_widget(loading_label(height=40))
+        # Counters, the log and the pending list follow their tables; approve /
+        # reject / delete only touch the affected rows, so nothing reloads the whole panel.
+        refresh_scheduler.register('admin', 'stats', get_admin_stats, self._show_stats,
+                                   tables=('users', 'messages'), run_now=True)
+        refresh_scheduler.register('admin', 'logs', get_admin_logs, self._show_logs,
+                                   tables=('user_actions_log',), run_now=True)
+        refresh_scheduler.register('admin', 'pending', get_users_page, self.pending_pager.refresh,
+                                   args=self.pending_pager.refresh_args, tables=('users',))
+        # Only the first page of each list is read, however many users there are
+        self.pending_pager.reload('pending')
+        self.reload_users()
 
-        for name, email, created_at in pending:
-            card = BoxLayout(size_hint_y=None, height=dp(62), spacing=dp(8), padding=[dp(10), dp(6)])
-            with card.canvas.before:
-                Color(0.95, 0.75, 0.10, 0.12)
-                card._bg = RoundedRectangle(pos=card.pos, size=card.size, radius=[dp(8)])
-            card.bind(pos=lambda w, v: setattr(w._bg, 'pos', v),
-                      size=lambda w, v: setattr(w._bg, 'size', v))
-
-            info = BoxLayout(orientation='vertical', spacing=dp(2))
-            n_lbl = Label(text=f'⏳  {name}', font_size='13sp', bold=True, color=TEXT_DARK,
-                         halign='left', valign='middle', size_hint_y=None, height=dp(24))
-            n_lbl.bind(size=n_lbl.setter('text_size'))
-            e_lbl = Label(text=email, font_size='10sp', color=TEXT_MUTED,
-                         halign='left', valign='middle', size_hint_y=None, height=dp(18))
-            e_lbl.bind(size=e_lbl.setter('text_size'))
-            info.add_widget(n_lbl); info.add_widget(e_lbl)
-            card.add_widget(info)
-
-            btn_col = BoxLayout(orientation='vertical', spacing=dp(4),
-                                size_hint=(None, 1), width=dp(130))
-            ap_btn = make_rounded_button('✅ Approve', SUCCESS_GREEN, height=24, radius=6)
-            ap_btn.font_size = '12sp'
-            rj_btn = make_rounded_button('❌ Reject', DANGER, height=24, radius=6)
-            rj_btn.font_size = '12sp'
-            em_copy = email
-            ap_btn.bind(on_press=lambda b, em=em_copy: self.do_approve(em))
-            rj_btn.bind(on_press=lambda b, em=em_copy: self.do_reject(em))
-            btn_col.add_widget(ap_btn); btn_col.add_widget(rj_btn)
-            card.add_widget(btn_col)
-            self.pending_layout.add_widget(card)
+    def on_leave(self):
+        refresh_scheduler.cancel('admin')
+
+    def _show_stats(self, counts):
+        users, msgs, pending, archived = counts
+        self.users_stat.text   = f'👥\n{users} Users'
+        self.msgs_stat.text    = f'💬\n{msgs} Msgs' + (f'\n[size=10sp]+{archived} archived[/size]' if archived else '')
+        self.pending_stat.text = f'⏳\n{pending} Pending'
+
+    def _decide(self, email, decide, action, approved):
+        admin_email = current_user_email
+        def job():
+            if decide(email):
+                log_admin_action(admin_email, action, email)
+                return True
+            return False
+
+        def done(ok):
+            if not ok: return
+            self.pending_pager.set_status(email, approved)
+            self.users_pager.set_status(email, approved)
+        db_worker.submit(job, on_done=done)
 
     def do_approve(self, email):
-        approve_user(email)
-        log_admin_action(current_user_email, "APPROVE_USER", email)
-        self.on_enter()
+        self._decide(email, approve_user, "APPROVE_USER", 1)
 
     def do_reject(self, email):
-        reject_user(email)
-        log_admin_action(current_user_email, "REJECT_USER", email)
-        self.on_enter()
-
-    def load_all_users(self):
-        self.users_layout.clear_widgets()
-        users = get_users()
-        if not users:
-            self.users_layout.add_widget(
-                Label(text='No users registered yet.', color=TEXT_MUTED,
-                      size_hint_y=None, height=dp(40)))
-            return
-
-        for name, email, admin_flag, created_at, approved in users:
-            card = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(4))
-            with card.canvas.before:
-                Color(*ACCENT, 0.06)
-                card._bg = RoundedRectangle(pos=card.pos, size=card.size, radius=[dp(8)])
-            card.bind(pos=lambda w, v: setattr(w._bg, 'pos', v),
-                      size=lambda w, v: setattr(w._bg, 'size', v))
-
-            info_row = BoxLayout(size_hint_y=None, height=dp(56), spacing=dp(10), padding=[dp(8), dp(4)])
-            info_col = BoxLayout(orientation='vertical', spacing=dp(2))
-
-            status_icon = '✅' if approved == 1 else ('❌' if approved == -1 else '⏳')
-            n_lbl = Label(text=f'{status_icon} {name}', font_size='13sp', bold=True, color=TEXT_DARK,
-                         halign='left', valign='middle', size_hint_y=None, height=dp(24))
-            n_lbl.bind(size=n_lbl.setter('text_size'))
-            e_lbl = Label(text=email, font_size='10sp', color=TEXT_MUTED,
-                         halign='left', valign='middle', size_hint_y=None, height=dp(18))
-            e_lbl.bind(size=e_lbl.setter('text_size'))
-            info_col.add_widget(n_lbl); info_col.add_widget(e_lbl)
-            info_row.add_widget(info_col)
-
-            del_btn = make_rounded_button('🗑 Remove', DANGER, height=40, radius=8)
-            del_btn.size_hint_x = 0.30
-            em_copy = email
-            del_btn.bind(on_press=lambda b, em=em_copy: self.confirm_delete_user(em))
-            info_row.add_widget(del_btn)
-            card.add_widget(info_row)
-
-            if created_at:
-                meta_lbl = Label(text=f'  Joined: {str(created_at)[:10]}', font_size='9sp',
-                                color=TEXT_MUTED, halign='left', valign='middle',
-                                size_hint_y=None, height=dp(16))
-                meta_lbl.bind(size=meta_lbl.setter('text_size'))
-                card.add_widget(meta_lbl)
-
-            self.users_layout.add_widget(card)
-
-    def clear_old(self, days):
-        deleted = clear_old_messages(days)
-        log_admin_action(current_user_email, f"CLEAR_MSGS_OLDER_{days}D", f"{deleted} deleted")
-        self.clear_status_lbl.text = f'✅  {deleted} message{"s" if deleted != 1 else ""} removed (>{days}d old)'
-        self.on_enter()
-        Clock.schedule_once(lambda dt: setattr(self.clear_status_lbl, 'text', ''), 3)
+        self._decide(email, reject_user, "REJECT_USER", -1)
+
+    def _style_status_filters(self):
+        for status, btn in self.status_btns.items():
+            btn.opacity = 1 if status == self.user_status else 0.55
+
+    def set_user_status_filter(self, status):
+        self.user_status = status
+        self._style_status_filters()
+        self.reload_users()
+
+    def _schedule_user_filter(self):
+        debounce(self._apply_user_filter, 0.3)
+
+    def _apply_user_filter(self, *_):
+        self.reload_users()
+
+    def reload_users(self):
+        self.users_pager.reload(self.user_status, self.user_prefix_input.text.strip())
+
+    def archive_old(self, days):
+        admin_email = current_user_email
+        def job():
+            result = archive_old_messages(days)
+            if result is not None:
+                messages, dms, reclaimed = result
+                log_admin_action(admin_email, f"ARCHIVE_OLDER_{days}D",
+                                 f"{messages + dms} rows, {reclaimed // 1024} KB reclaimed")
+            return result
+
+        def done(result):
+            if result is None:
+                self.clear_status_lbl.text = '❌  Archiving failed'
+            else:
+                messages, dms, reclaimed = result
+                self.clear_status_lbl.text = (f'✅  {messages} msgs + {dms} DMs archived (>{days}d old)'
+                                              f' · {reclaimed // 1024} KB reclaimed')
+            Clock.schedule_once(lambda dt: setattr(self.clear_status_lbl, 'text', ''), 5)
+        self.clear_status_lbl.text = '⏳  Archiving...'
+        db_worker.submit(job, on_done=done)
 
     def clear_all_messages(self, *_):
         content = BoxLayout(orientation='vertical', padding=dp(16), spacing=dp(12))
@@ -1468,14 +3710,13 @@ class AdminScreen(Screen):
         content.add_widget(btn_row)
         popup = Popup(title='Confirm', content=content, size_hint=(0.85, 0.35))
 
+        admin_email = current_user_email
+        def job():
+            if clear_all_messages():
+                log_admin_action(admin_email, "CLEAR_ALL_MESSAGES", "ALL")
+
         def do_clear(*_):
-            try:
-                conn = sqlite3.connect(DB_FILE, timeout=10)
-                c = conn.cursor(); c.execute("DELETE FROM messages")
-                conn.commit(); conn.close()
-                log_admin_action(current_user_email, "CLEAR_ALL_MESSAGES", "ALL")
-            except: pass
-            popup.dismiss(); self.on_enter()
+            popup.dismiss(); db_worker.submit(job)
 
         yes_btn.bind(on_press=do_clear); no_btn.bind(on_press=popup.dismiss); popup.open()
 
@@ -1492,16 +3733,28 @@ class AdminScreen(Screen):
         content.add_widget(btn_row)
         popup = Popup(title='Confirm Removal', content=content, size_hint=(0.88, 0.40))
 
-        def do_delete(*_):
+        admin_email = current_user_email
+        def job():
             if delete_user(email):
-                log_admin_action(current_user_email, "DELETE_USER", email)
-                popup.dismiss(); self.on_enter()
+                log_admin_action(admin_email, "DELETE_USER", email)
+                return True
+            return False
+
+        def do_delete(*_):
+            yes_btn.disabled = True
+            db_worker.submit(job, on_done=deleted)
+
+        def deleted(ok):
+            yes_btn.disabled = False
+            if ok:
+                popup.dismiss()
+                self.pending_pager.drop(email)
+                self.users_pager.drop(email)
 
         yes_btn.bind(on_press=do_delete); no_btn.bind(on_press=popup.dismiss); popup.open()
 
-    def load_admin_logs(self):
+    def _show_logs(self, logs):
         self.logs_layout.clear_widgets()
-        logs = get_admin_logs()
         if not logs:
             self.logs_layout.add_widget(
                 Label(text='No admin actions yet.', color=TEXT_MUTED,
@@ -1518,6 +3771,94 @@ class AdminScreen(Screen):
 
 
 # ── Inbox Screen ──────────────────────────────────────────────────────────────
+class UserPicker:
+    """Typeahead popup for choosing approved users; with multi=True a tap toggles them in `selected`."""
+    def __init__(self, title, on_pick=None, multi=False, header=None, footer=None, size_hint=(0.88, 0.75)):
+        self.on_pick, self.multi = on_pick, multi
+        self.selected = {}          # email -> name, multi only
+        self._query_id = 0
+
+        content = BoxLayout(orientation='vertical', padding=dp(12), spacing=dp(8))
+        if header is not None:
+            content.add_widget(header)
+        self.search_input = styled_input('🔍  Name or email...')
+        self.search_input.bind(text=lambda *_: self._schedule_query())
+        content.add_widget(self.search_input)
+        self.status = Label(text='', color=TEXT_DARK, font_size='13sp',
+                            size_hint_y=None, height=dp(30), halign='center')
+        self.status.bind(size=self.status.setter('text_size'))
+        content.add_widget(self.status)
+
+        self.rv = RecycleView(size_hint_y=1)
+        self.rv.viewclass = PickerRow
+        self.rv.picker = self
+        layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                  default_size=(None, dp(46)), default_size_hint=(1, None), spacing=dp(6))
+        layout.bind(minimum_height=layout.setter('height'))
+        self.rv.add_widget(layout)
+        content.add_widget(self.rv)
+
+        self.popup = Popup(title=title, content=content, size_hint=size_hint)
+        if footer is None:
+            footer = make_rounded_button('Cancel', (1,1,1,1), text_color=PRIMARY_DARK, height=44)
+            footer.bind(on_press=self.popup.dismiss)
+        content.add_widget(footer)
+        self.popup.bind(on_dismiss=lambda *_: self._stop())
+
+    def open(self):
+        self.popup.open()
+        self._query()
+        self.search_input.focus = True
+
+    def dismiss(self):
+        self.popup.dismiss()
+
+    def _stop(self):
+        Clock.unschedule(self._query)
+        self._query_id += 1         # drop any query still in flight
+
+    def _schedule_query(self):
+        debounce(self._query, PICKER_DEBOUNCE)
+
+    def _query(self, *_):
+        self._query_id += 1
+        query_id, prefix = self._query_id, self.search_input.text.strip()
+        db_worker.submit(find_approved_users, current_user_email, prefix,
+                         on_done=lambda users: self._show(query_id, prefix, users))
+
+    def _show(self, query_id, prefix, users):
+        if query_id != self._query_id: return   # superseded by a newer keystroke
+        self.rv.data = [self._row(name, email) for name, email in users]
+        if not users:
+            self.status.color = TEXT_MUTED
+            self.status.text = 'No matches' if prefix else 'No other approved users yet.'
+        elif not self.multi:
+            self.status.color = TEXT_DARK; self.status.text = 'Select a user to message:'
+        else:
+            self._show_selection()
+
+    def _row(self, name, email):
+        mark = ('✓' if email in self.selected else '○') if self.multi else name[:1].upper()
+        return {'text': f'  {mark}  {name}', 'name': name, 'email': email}
+
+    def _show_selection(self):
+        n = len(self.selected)
+        self.status.color = TEXT_DARK
+        self.status.text = f'{n} selected' if n else 'Pick at least two members:'
+
+    def pressed(self, email, name):
+        if not self.multi:
+            self.dismiss()
+            self.on_pick(email, name)
+            return
+        if email in self.selected:
+            del self.selected[email]
+        else:
+            self.selected[email] = name
+        self.rv.data = [self._row(row['name'], row['email']) for row in self.rv.data]
+        self._show_selection()
+
+
 class InboxScreen(Screen):
     def build(self):
         root = BoxLayout(orientation='vertical')
@@ -1527,9 +3868,13 @@ class InboxScreen(Screen):
 
         inner = BoxLayout(orientation='vertical', padding=dp(14), spacing=dp(10))
 
-        new_btn = make_rounded_button('✉️  Start New Conversation', PRIMARY, height=48)
+        new_row = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(48))
+        new_btn = make_rounded_button('✉️  New Message', PRIMARY, height=48)
         new_btn.bind(on_press=self.show_new_message_picker)
-        inner.add_widget(new_btn)
+        group_btn = make_rounded_button('👥  New Group', ACCENT2, height=48)
+        group_btn.bind(on_press=self.show_new_group_picker)
+        new_row.add_widget(new_btn); new_row.add_widget(group_btn)
+        inner.add_widget(new_row)
 
         inner.add_widget(section_label('Conversations', INBOX_COLOR))
 
@@ -1548,25 +3893,36 @@ class InboxScreen(Screen):
 
     def on_enter(self):
         self.load_conversations()
+        # Re-rendered in place; the loading placeholder is only for a cold open
+        refresh_scheduler.register(
+            'inbox', 'conversations', get_dm_conversations, self._show_conversations,
+            args=lambda: (current_user_email,) if current_user_email else None,
+            tables=('direct_messages', 'conversations', 'conversation_members'))
+
+    def on_leave(self):
+        refresh_scheduler.cancel('inbox')
 
     def load_conversations(self):
         self.conv_layout.clear_widgets()
         if not current_user_email: return
-        convs = get_dm_conversations(current_user_email)
+        self.conv_layout.add_widget(loading_label())
+        db_worker.submit(get_dm_conversations, current_user_email, on_done=self._show_conversations)
+
+    def _show_conversations(self, convs):
+        self.conv_layout.clear_widgets()
         if not convs:
             empty_lbl = Label(
-                text='No conversations yet.\nTap "Start New Conversation" to message someone!',
+                text='No conversations yet.\nTap "New Message" to message someone!',
                 font_size='13sp', color=TEXT_MUTED, halign='center',
                 size_hint_y=None, height=dp(80)
             )
             empty_lbl.bind(size=empty_lbl.setter('text_size'))
             self.conv_layout.add_widget(empty_lbl); return
 
-        for other_email, other_name, last_msg, last_time in convs:
-            unread = get_unread_count(current_user_email, other_email)
-            self._make_conv_row(other_email, other_name, last_msg, unread)
+        for conv_id, title, last_msg, last_time, unread, is_group in convs:
+            self._make_conv_row(conv_id, title, last_msg, unread, is_group)
 
-    def _make_conv_row(self, other_email, other_name, last_msg, unread):
+    def _make_conv_row(self, conv_id, other_name, last_msg, unread, is_group=False):
         float_layer = FloatLayout(size_hint_y=None, height=dp(74))
 
         card_bg = Widget(size_hint=(1, 1))
@@ -1581,18 +3937,11 @@ class InboxScreen(Screen):
 
         content_row = BoxLayout(spacing=dp(12), padding=[dp(12), dp(10)],
                                 size_hint=(1, 1))
-        u_col = get_user_color(other_name)
-        av = Label(text=other_name[0].upper() if other_name else '?',
-                   font_size='18sp', bold=True, color=WHITE,
-                   size_hint=(None, None), size=(dp(46), dp(46)))
-        with av.canvas.before:
-            Color(*u_col, 0.85)
-            av._circ = Ellipse(pos=av.pos, size=av.size)
-        av.bind(pos=lambda w, v: setattr(w._circ, 'pos', v),
-                size=lambda w, v: setattr(w._circ, 'size', v))
+        av = AvatarCircle(font_size='18sp', size_hint=(None, None), size=(dp(46), dp(46)))
+        av.show(other_name, get_user_color(other_name), picture=not is_group)
 
         text_col = BoxLayout(orientation='vertical', spacing=dp(2))
-        name_text = other_name + (f'  [{unread} new]' if unread else '')
+        name_text = ('👥 ' if is_group else '') + other_name + (f'  [{unread} new]' if unread else '')
         name_lbl = Label(
             text=name_text, font_size='14sp', bold=True,
             color=INBOX_COLOR if unread else TEXT_DARK,
@@ -1610,48 +3959,47 @@ class InboxScreen(Screen):
         float_layer.add_widget(content_row)
 
         tap_btn = Button(size_hint=(1, 1), background_normal='', background_color=(0, 0, 0, 0))
-        em_c = other_email; nm_c = other_name
-        tap_btn.bind(on_press=lambda b, em=em_c, nm=nm_c: self.open_dm(em, nm))
+        cid_c = conv_id; nm_c = other_name
+        tap_btn.bind(on_press=lambda b, cid=cid_c, nm=nm_c: self.open_dm(cid, nm))
         float_layer.add_widget(tap_btn)
         self.conv_layout.add_widget(float_layer)
 
-    def open_dm(self, other_email, other_name):
-        global dm_target_email, dm_target_name
-        dm_target_email = other_email; dm_target_name = other_name
+    def open_dm(self, conversation_id, title):
+        global dm_conversation_id, dm_target_name
+        dm_conversation_id = conversation_id; dm_target_name = title
         self.manager.current = 'dm'
 
     def show_new_message_picker(self, *_):
-        users = get_all_approved_users(current_user_email)
-        if not users:
-            self.conv_layout.clear_widgets()
-            self.conv_layout.add_widget(
-                Label(text='No other approved users to message yet.',
-                      color=TEXT_MUTED, font_size='13sp', size_hint_y=None, height=dp(60)))
-            return
+        def go(email, name):
+            db_worker.submit(get_or_create_direct_conversation, current_user_email, email,
+                             on_done=lambda conv_id: conv_id and self.open_dm(conv_id, name))
+        UserPicker('New Message', on_pick=go).open()
 
-        content = BoxLayout(orientation='vertical', padding=dp(12), spacing=dp(8))
-        content.add_widget(Label(text='Select a user to message:',
-                                 color=TEXT_DARK, font_size='14sp',
-                                 size_hint_y=None, height=dp(36), halign='center'))
-        scroll = ScrollView(size_hint_y=1)
-        ulist = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(8))
-        ulist.bind(minimum_height=ulist.setter('height'))
-        popup = Popup(title='New Message', content=content, size_hint=(0.88, 0.75))
-
-        for name, email in users:
-            btn = make_rounded_button(f'  {name[0].upper()}  {name}', PRIMARY_DARK, height=50)
-            em_c = email; nm_c = name
-            def go(b, em=em_c, nm=nm_c):
-                popup.dismiss()
-                self.open_dm(em, nm)
-            btn.bind(on_press=go)
-            ulist.add_widget(btn)
-
-        scroll.add_widget(ulist); content.add_widget(scroll)
+    def show_new_group_picker(self, *_):
+        title_input = styled_input('👥  Group name')
+        btn_row = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(48))
+        picker = UserPicker('New Group', multi=True, header=title_input, footer=btn_row, size_hint=(0.88, 0.85))
+
+        def create(*_):
+            if len(picker.selected) < 2:
+                picker.status.color = DANGER; picker.status.text = '⚠️  Pick at least two members'; return
+            title = title_input.text.strip() or ', '.join(sorted(picker.selected.values()))
+            ok_btn.disabled = True
+            db_worker.submit(create_group_conversation, current_user_email, list(picker.selected), title,
+                             on_done=lambda conv_id: created(conv_id, title))
+
+        def created(conv_id, title):
+            ok_btn.disabled = False
+            if conv_id:
+                picker.dismiss()
+                self.open_dm(conv_id, title)
+
+        ok_btn = make_rounded_button('Create Group', PRIMARY, height=44)
+        ok_btn.bind(on_press=create)
         can_btn = make_rounded_button('Cancel', (1,1,1,1), text_color=PRIMARY_DARK, height=44)
-        can_btn.bind(on_press=popup.dismiss)
-        content.add_widget(can_btn)
-        popup.open()
+        can_btn.bind(on_press=lambda *_: picker.dismiss())
+        btn_row.add_widget(ok_btn); btn_row.add_widget(can_btn)
+        picker.open()
 
 
 # ── Direct Message Screen ─────────────────────────────────────────────────────
@@ -1666,11 +4014,21 @@ class DMScreen(Screen):
         inner = BoxLayout(orientation='vertical',
                           padding=[dp(10), dp(6), dp(10), dp(6)], spacing=dp(6))
 
-        self.scroll = ScrollView(size_hint_y=1)
-        self.msg_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(8))
+        self.empty_lbl = Label(text='', font_size='13sp', color=TEXT_MUTED,
+                               size_hint_y=None, height=dp(0), halign='center')
+        self.empty_lbl.bind(size=self.empty_lbl.setter('text_size'))
+        inner.add_widget(self.empty_lbl)
+
+        self.rv = RecycleView(size_hint_y=1)
+        self.rv.viewclass = DMBubble
+        self.msg_layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                           default_size=(None, dp(DM_ROW_HEIGHT)),
+                                           default_size_hint=(1, None), spacing=dp(8))
         self.msg_layout.bind(minimum_height=self.msg_layout.setter('height'))
-        self.scroll.add_widget(self.msg_layout)
-        inner.add_widget(self.scroll)
+        self.rv.add_widget(self.msg_layout)
+        self.pager = ScrollPager(self.rv, self._load_older, DM_PAGE_SIZE,
+                                 row_height=dp(DM_ROW_HEIGHT) + dp(8), at_top=True)
+        inner.add_widget(self.rv)
 
         input_card = make_card(padding=8, spacing=6)
         input_card.size_hint_y = None; input_card.height = dp(56)
@@ -1700,87 +4058,270 @@ class DMScreen(Screen):
             self.hero.title_text = f'💌  {dm_target_name}'
             self.hero.subtitle_text = 'Private conversation'
             self.hero._draw()
-        if dm_target_email and current_user_email:
-            mark_dm_read(current_user_email, dm_target_email)
+            if dm_conversation_id:
+                db_worker.submit(get_conversation_member_count, dm_conversation_id,
+                                 on_done=self._show_member_count)
+        if dm_conversation_id and current_user_email:
+            db_worker.submit(mark_dm_read, current_user_email, dm_conversation_id)
+        self._newest = None
+        self._loaded = False        # False until the first page has arrived
+        self.pager.reset()
+        self.rv.data = []
         self.load_messages()
-        Clock.schedule_interval(self._auto_refresh, 3)
+        # Re-registering replaces the previous job, so re-entry never stacks refreshes
+        refresh_scheduler.register(
+            'dm', 'new_messages', self._fetch_new, self._on_polled,
+            args=lambda: (dm_conversation_id, self._newest,
+                          [(row['timestamp'], row['msg_id']) for row in self.rv.data])
+                         if self._loaded and dm_conversation_id else None,
+            tables=('direct_messages',))
+
+    def _show_member_count(self, members):
+        if members > 2:
+            self.hero.subtitle_text = f'Group · {members} members'
+            self.hero._draw()
 
     def on_leave(self):
-        try: Clock.unschedule(self._auto_refresh)
-        except: pass
-
-    def _auto_refresh(self, dt):
-        if dm_target_email and current_user_email:
-            mark_dm_read(current_user_email, dm_target_email)
-        self.load_messages()
+        refresh_scheduler.cancel('dm')
 
-    def load_messages(self):
-        if not current_user_email or not dm_target_email: return
-        self.msg_layout.clear_widgets()
-        messages = get_dm_messages(current_user_email, dm_target_email)
+    @staticmethod
+    def _fetch_new(conv_id, newest, shown):
+        # An empty conversation has no keyset yet; its first messages arrive as a page
+        rows = get_dm_page(conv_id) if newest is None else get_dm_messages_since(conv_id, newest)
+        return conv_id, rows, get_deleted_dm_ids(conv_id, shown)
 
-        if not messages:
-            empty = Label(
-                text=f'Start your conversation with {dm_target_name} 👋',
-                font_size='13sp', color=TEXT_MUTED, halign='center',
-                size_hint_y=None, height=dp(60)
-            )
-            empty.bind(size=empty.setter('text_size'))
-            self.msg_layout.add_widget(empty); return
-
-        for sender_email, message, timestamp in messages:
-            is_me = (sender_email == current_user_email)
-            time_str = str(timestamp)[11:16]
-
-            outer = BoxLayout(size_hint_y=None, height=dp(70), padding=[dp(6), dp(4)])
-            bubble = BoxLayout(orientation='vertical',
-                               size_hint_y=None, padding=[dp(12), dp(8)], spacing=dp(2))
-            bubble.height = dp(60)
-
-            if is_me:
-                with bubble.canvas.before:
-                    Color(*INBOX_COLOR)
-                    bubble._bg = RoundedRectangle(pos=bubble.pos, size=bubble.size,
-                                                  radius=[dp(16), dp(16), dp(4), dp(16)])
-                name_color = (0.75, 0.92, 1.0, 1); msg_color = WHITE
-                sender_name = current_user or 'Me'
-            else:
-                other_col = get_user_color(dm_target_name or '')
-                with bubble.canvas.before:
-                    Color(*other_col, 0.18)
-                    bubble._bg = RoundedRectangle(pos=bubble.pos, size=bubble.size,
-                                                  radius=[dp(16), dp(16), dp(16), dp(4)])
-                name_color = other_col; msg_color = TEXT_DARK
-                sender_name = dm_target_name or 'User'
-
-            bubble.bind(
-                pos=lambda w, v: setattr(w._bg, 'pos', v),
-                size=lambda w, v: setattr(w._bg, 'size', v)
-            )
-            name_lbl = Label(text=sender_name, font_size='11sp', bold=True, color=name_color,
-                             size_hint_y=None, height=dp(18), halign='left', valign='middle')
-            name_lbl.bind(size=name_lbl.setter('text_size'))
-            msg_lbl = Label(text=f'{message}  [{time_str}]', font_size='13sp',
-                            color=msg_color, halign='left', valign='middle',
-                            size_hint_y=None, height=dp(26))
-            msg_lbl.bind(size=msg_lbl.setter('text_size'))
+    def _on_polled(self, result):
+        conv_id, rows, gone = result
+        if conv_id != dm_conversation_id:
+            return
+        if gone:
+            self.rv.data = [row for row in self.rv.data if row['msg_id'] not in gone]
+            self._update_empty()
+        if not rows:
+            return
+        if any(row[1] != current_user_email for row in rows):
+            # Read as it arrives, so the conversation doesn't count as unread while open
+            db_worker.submit(mark_dm_read, current_user_email, conv_id)
+        if self._newest is None:
+            self._show_page(conv_id, rows)
+        else:
+            self._on_new(conv_id, rows, False)
 
-            bubble.add_widget(name_lbl); bubble.add_widget(msg_lbl)
-            outer.add_widget(bubble)
-            self.msg_layout.add_widget(outer)
+    def load_messages(self):
+        """Reset to the latest page of the conversation."""
+        if not current_user_email or not dm_conversation_id: return
+        if not self.rv.data:
+            self.empty_lbl.text = '⏳  Loading messages...'; self.empty_lbl.height = dp(60)
+        conv_id = dm_conversation_id
+        db_worker.submit(get_dm_page, conv_id, on_done=lambda rows: self._show_page(conv_id, rows))
+
+    def _show_page(self, conv_id, messages):
+        if conv_id != dm_conversation_id: return   # the user has moved to another conversation
+        self._loaded = True
+        self.pager.loaded(messages)
+        self._newest = self._keyset(messages[-1]) if messages else None
+        self.rv.data = [self._row_data(m) for m in messages]
+        self._update_empty()
+        self.rv.scroll_y = 0
+
+    @staticmethod
+    def _keyset(row):
+        return (str(row[4]), row[0])
+
+    @staticmethod
+    def _row_data(row):
+        msg_id, sender_email, sender_name, message, timestamp = row
+        if sender_email == current_user_email:
+            sender_name = current_user or 'Me'
+        return {'msg_id': msg_id, 'sender_email': sender_email, 'user_name': sender_name,
+                'message': message, 'timestamp': str(timestamp)}
+
+    def _update_empty(self):
+        if self.rv.data:
+            self.empty_lbl.text = ''; self.empty_lbl.height = dp(0)
+        else:
+            self.empty_lbl.text = f'Start your conversation with {dm_target_name} 👋'
+            self.empty_lbl.height = dp(60)
 
-        self.scroll.scroll_y = 0
+    def _append_new(self, scroll_to_end=False):
+        """Fetches and appends only the rows newer than the newest one on screen."""
+        if not current_user_email or not dm_conversation_id:
+            return
+        if self._newest is None:
+            self.load_messages(); return
+        conv_id = dm_conversation_id
+        db_worker.submit(get_dm_messages_since, conv_id, self._newest,
+                         on_done=lambda rows: self._on_new(conv_id, rows, scroll_to_end))
+
+    def _on_new(self, conv_id, new_msgs, scroll_to_end):
+        if conv_id != dm_conversation_id or self._newest is None: return
+        # A poll and a post-send fetch can both be in flight; drop rows already shown
+        new_msgs = [m for m in new_msgs if self._keyset(m) > self._newest]
+        if not new_msgs:
+            return
+        at_bottom = scroll_to_end or self.rv.scroll_y <= 0.01
+        self.rv.data.extend(self._row_data(m) for m in new_msgs)
+        self._newest = self._keyset(new_msgs[-1])
+        self._update_empty()
+        if at_bottom:
+            self.rv.scroll_y = 0
+
+    def _load_older(self):
+        if not self.rv.data:
+            self.pager.loading = False; return
+        oldest = self.rv.data[0]
+        conv_id = dm_conversation_id
+        db_worker.submit(get_dm_page, conv_id, before=(oldest['timestamp'], oldest['msg_id']),
+                         on_done=lambda rows: self._prepend_older(conv_id, rows))
+
+    def _prepend_older(self, conv_id, older):
+        if conv_id != dm_conversation_id:
+            self.pager.loading = False; return
+        self.pager.loaded(older)
+        if older:
+            self.pager.prepend([self._row_data(m) for m in older])
 
     def send_message(self, *_):
         msg = self.msg_input.text.strip()
-        if msg and send_dm(current_user_email, dm_target_email, msg):
+        if msg:
+            send_dm(current_user_email, dm_conversation_id, msg,
+                    on_done=lambda ok: ok and self._on_sent(msg))
+
+    def _on_sent(self, msg):
+        if self.msg_input.text.strip() == msg:
             self.msg_input.text = ''
-            self.load_messages()
+        self._append_new(scroll_to_end=True)
+
+
+# ── Search Screen ─────────────────────────────────────────────────────────────
+class SearchScreen(Screen):
+    SCOPES = (('chat', '💬 Chat'), ('dm', '✉️ Messages'), ('timeline', '📝 Timeline'))
+
+    def build(self):
+        root = BoxLayout(orientation='vertical')
+        hero = HeroHeader(icon='🔍', title='Search', subtitle='Chat · Messages · Timeline',
+                          bg1=ACCENT, bg2=PRIMARY_DARK, height=150)
+        root.add_widget(hero)
+
+        inner = BoxLayout(orientation='vertical', padding=dp(12), spacing=dp(8))
+
+        query_row = BoxLayout(size_hint_y=None, height=dp(48), spacing=dp(8))
+        self.query_input = styled_input('🔍  Search words...')
+        self.query_input.bind(on_text_validate=self.run_search)
+        go_btn = make_rounded_button('Go', PRIMARY, height=44, radius=10)
+        go_btn.size_hint_x = 0.22
+        go_btn.bind(on_press=self.run_search)
+        query_row.add_widget(self.query_input); query_row.add_widget(go_btn)
+        inner.add_widget(query_row)
+
+        scope_row = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(6))
+        self.scope = 'chat'
+        self.scope_btns = {}
+        for scope, label in self.SCOPES:
+            btn = make_rounded_button(label, PRIMARY_DARK, height=38, radius=10)
+            btn.font_size = '12sp'
+            btn.bind(on_press=lambda b, s=scope: self.set_scope(s))
+            self.scope_btns[scope] = btn
+            scope_row.add_widget(btn)
+        inner.add_widget(scope_row)
+
+        self.status_lbl = Label(text='', font_size='12sp', color=TEXT_MUTED,
+                                size_hint_y=None, height=dp(24), halign='left')
+        self.status_lbl.bind(size=self.status_lbl.setter('text_size'))
+        inner.add_widget(self.status_lbl)
+
+        self.rv = RecycleView(size_hint_y=1)
+        self.rv.viewclass = SearchResultRow
+        self.rv.search_screen = self
+        self.results_layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                               default_size=(None, dp(64)),
+                                               default_size_hint=(1, None), spacing=dp(6))
+        self.results_layout.bind(minimum_height=self.results_layout.setter('height'))
+        self.rv.add_widget(self.results_layout)
+        self.pager = ScrollPager(self.rv, self._load_more, SEARCH_PAGE_SIZE)
+        inner.add_widget(self.rv)
+
+        b_back = make_rounded_button('  Back to Home', (1,1,1,1), text_color=PRIMARY_DARK, height=46)
+        b_back.bind(on_press=lambda *_: setattr(self.manager, 'current', 'home'))
+        inner.add_widget(b_back)
+
+        root.add_widget(inner)
+        self.add_widget(root)
+        self._search_id = 0
+        self._query = ''
+        self._style_scopes()
+
+    def on_enter(self):
+        self.query_input.focus = True
+
+    def _style_scopes(self):
+        for scope, btn in self.scope_btns.items():
+            btn.opacity = 1 if scope == self.scope else 0.55
+
+    def set_scope(self, scope):
+        self.scope = scope
+        self._style_scopes()
+        if self._query:
+            self.run_search()
+
+    def _search_fn(self):
+        if self.scope == 'dm':
+            return lambda text, limit, offset: search_dms(current_user_email, text, limit, offset)
+        return search_timeline if self.scope == 'timeline' else search_messages
+
+    def run_search(self, *_):
+        self._query = self.query_input.text.strip()
+        self._search_id += 1
+        self.pager.reset()
+        self.rv.data = []
+        if not self._query:
+            self.status_lbl.text = ''; return
+        self.status_lbl.text = '⏳  Searching...'
+        search_id, scope = self._search_id, self.scope
+        db_worker.submit(self._search_fn(), self._query, SEARCH_PAGE_SIZE, 0,
+                         on_done=lambda rows: self._show_results(search_id, scope, rows))
+
+    def _load_more(self):
+        search_id, scope = self._search_id, self.scope
+        db_worker.submit(self._search_fn(), self._query, SEARCH_PAGE_SIZE, len(self.rv.data),
+                         on_done=lambda rows: self._show_results(search_id, scope, rows, append=True))
+
+    def _show_results(self, search_id, scope, rows, append=False):
+        if search_id != self._search_id: return   # superseded by a newer search
+        self.pager.loaded(rows)
+        data = [self._row_data(scope, row) for row in rows]
+        self.rv.data = list(self.rv.data) + data if append else data
+        n = len(self.rv.data)
+        self.status_lbl.text = (f'{n}{"+" if self.pager.has_more else ""} result{"s" if n != 1 else ""}'
+                                if n else 'No matches')
+        if n > SEARCH_RANK_WINDOW:
+            self.status_lbl.text += f' · best of newest {SEARCH_RANK_WINDOW}, then older by date'
+
+    @staticmethod
+    def _row_data(scope, row):
+        if scope == 'dm':
+            _, conv_id, conv_title, sender, snippet, ts = row
+            title = f'{escape_markup(conv_title)} · {escape_markup(sender)}'
+        else:
+            _, sender, snippet, ts = row
+            conv_id, conv_title, title = 0, '', escape_markup(sender)
+        return {'text': f'[b]{title}[/b]  [size=10sp][color=7387a6]{str(ts)[:16]}[/color][/size]\n'
+                        f'{snippet_markup(snippet)}',
+                'conversation_id': conv_id, 'conversation_title': conv_title}
+
+    def open_conversation(self, conversation_id, title):
+        global dm_conversation_id, dm_target_name
+        dm_conversation_id = conversation_id; dm_target_name = title
+        self.manager.current = 'dm'
 
 
 # ── Profile Screen ────────────────────────────────────────────────────────────
 class ProfileScreen(Screen):
+    PIC_SIZE = 70   # dp
+
     def build(self):
+        self._email = None
+        self._avatar_user = None
         root = BoxLayout(orientation='vertical')
         self.hero = HeroHeader(icon='🪪', title='My Profile', subtitle='Your personal space',
                                bg1=PRIMARY, bg2=PRIMARY_DARK, height=200)
@@ -1793,7 +4334,8 @@ class ProfileScreen(Screen):
         info_card = make_card(); info_card.size_hint_y = None; info_card.height = dp(140)
         top_row = BoxLayout(spacing=dp(14), size_hint_y=None, height=dp(80))
 
-        self.pic_container = FloatLayout(size_hint=(None, None), size=(dp(70), dp(70)))
+        self.pic_container = FloatLayout(size_hint=(None, None),
+                                         size=(dp(self.PIC_SIZE), dp(self.PIC_SIZE)))
         self.avatar_placeholder = Label(text='👤', font_size='36sp',
                                         size_hint=(1, 1), pos_hint={'x': 0, 'y': 0})
         with self.avatar_placeholder.canvas.before:
@@ -1877,12 +4419,25 @@ class ProfileScreen(Screen):
         form.add_widget(b_back)
         scroll.add_widget(form); root.add_widget(scroll); self.add_widget(root)
 
+    @staticmethod
+    def _fetch_profile(user_name):
+        email = get_user_email(user_name)
+        if not email:
+            return None, None, []
+        return email, get_profile(email), get_timeline_posts(email)
+
     def on_enter(self):
         if not current_user: return
-        email = get_user_email(current_user)
+        self._email = None
+        self.tl_layout.clear_widgets()
+        self.tl_layout.add_widget(loading_label(height=50))
+        db_worker.submit(self._fetch_profile, current_user, on_done=self._show_profile)
+
+    def _show_profile(self, result):
+        email, profile, posts = result
+        self._email = email
         if not email: return
 
-        profile = get_profile(email)
         if profile:
             name, phone, bio, join_date, profile_pic = profile
             self.hero.title_text = name or current_user
@@ -1893,25 +4448,28 @@ class ProfileScreen(Screen):
             self.join_label.text  = f'📅  Since {str(join_date)[:10] if join_date else "—"}'
             self.bio_input.text   = bio if bio else ''
 
-            if profile_pic and os.path.exists(profile_pic):
-                self.profile_image.source = profile_pic
-                self.profile_image.reload()
-                self.avatar_placeholder.opacity = 0
-            else:
-                self.profile_image.source = ''
-                self.avatar_placeholder.opacity = 1
-                self.avatar_placeholder.text = '👤'
+            self._show_avatar(name or current_user)
         else:
             self.name_label.text  = current_user
             self.email_label.text = email
             self.phone_label.text = 'Not set'
             self.join_label.text  = '📅  Since —'
             self.bio_input.text   = ''
-            self.profile_image.source = ''
-            self.avatar_placeholder.opacity = 1
-            self.avatar_placeholder.text = '👤'
+            self._show_avatar(None)
 
-        self.load_timeline()
+        self._show_timeline(posts)
+
+    def _show_avatar(self, user):
+        self._avatar_user = user
+        self._set_avatar_texture(user, None)
+        if user:
+            avatar_cache.get(user, dp(self.PIC_SIZE), lambda texture: self._set_avatar_texture(user, texture))
+
+    def _set_avatar_texture(self, user, texture):
+        if user != self._avatar_user: return   # another profile has been shown since
+        self.profile_image.texture = texture
+        self.profile_image.opacity = 1 if texture else 0
+        self.avatar_placeholder.opacity = 0 if texture else 1
 
     def choose_profile_pic(self, *_):
         # Outer layout: file chooser + preview + action buttons
@@ -1931,19 +4489,23 @@ class ProfileScreen(Screen):
         preview_row.add_widget(self._pic_status)
         content.add_widget(preview_row)
 
-        # Update preview when user taps a file in the chooser
+        # Update preview when user taps a file in the chooser; decoded off the UI thread
         def on_selection(fc_widget, selection):
+            self._pic_preview.texture = None
             if selection:
-                self._pic_preview.source = selection[0]
-                self._pic_preview.reload()
-                self._pic_status.text = os.path.basename(selection[0])
+                path = selection[0]
+                load_texture(path, dp(60), lambda texture: show_preview(path, texture))
+                self._pic_status.text = os.path.basename(path)
                 self._pic_status.color = SUCCESS_GREEN
             else:
-                self._pic_preview.source = ''
                 self._pic_status.text = 'No file selected'
                 self._pic_status.color = TEXT_MUTED
         fc.bind(selection=on_selection)
 
+        def show_preview(path, texture):
+            if fc.selection[:1] == [path]:   # still the selected file
+                self._pic_preview.texture = texture
+
         # Buttons
         btn_box = BoxLayout(size_hint_y=None, height=dp(52), spacing=dp(10))
         save_btn = make_rounded_button('💾  Save Picture', PRIMARY, height=48)
@@ -1959,45 +4521,63 @@ class ProfileScreen(Screen):
                 self._pic_status.color = DANGER
                 return
             src_path = fc.selection[0]
-            email = get_user_email(current_user)
-            dst = os.path.join(PROFILE_PICS_DIR, f"{email}_{os.path.basename(src_path)}")
-            try:
-                shutil.copy(src_path, dst)
-                update_profile(email, self.bio_input.text, dst)
-                # Update the profile screen image live
-                self.profile_image.source = dst
-                self.profile_image.reload()
-                self.avatar_placeholder.opacity = 0
-                popup.dismiss()
-            except Exception as e:
-                self._pic_status.text = f'Error: {e}'
-                self._pic_status.color = DANGER
-                print(f"Copy error: {e}")
+            email = self._email
+            if not email: return
+            bio = self.bio_input.text
+
+            def ingest_and_save():
+                update_profile(email, bio, ingest_profile_pic(src_path))
+
+            self._pic_status.text = '⏳  Saving...'
+            self._pic_status.color = TEXT_MUTED
+            save_btn.disabled = True
+            image_worker.submit(ingest_and_save, on_done=saved, on_error=failed)
+
+        def saved(_):
+            # Update the profile screen image live, from the display-sized thumbnail
+            avatar_cache.invalidate(self._avatar_user)
+            self._show_avatar(self._avatar_user)
+            popup.dismiss()
+
+        def failed(e):
+            save_btn.disabled = False
+            self._pic_status.text = f'Error: {e}'
+            self._pic_status.color = DANGER
+            print(f"Profile picture error: {e}")
 
         save_btn.bind(on_press=do_save)
         can_btn.bind(on_press=popup.dismiss)
         popup.open()
 
     def save_bio(self, *_):
-        email = get_user_email(current_user)
+        if not self._email: return
         # Pass profile_pic=None so update_profile keeps the stored pic path intact
-        if update_profile(email, self.bio_input.text.strip(), profile_pic=None):
+        db_worker.submit(update_profile, self._email, self.bio_input.text.strip(), profile_pic=None,
+                         on_done=self._on_bio_saved)
+
+    def _on_bio_saved(self, ok):
+        if ok:
             self.bio_input.hint_text = '✅  Bio saved!'
             Clock.schedule_once(
                 lambda dt: setattr(self.bio_input, 'hint_text', 'Tell the community about yourself...'), 2
             )
 
     def post_timeline(self, *_):
-        email = get_user_email(current_user)
-        text  = self.timeline_input.text.strip()
-        if text and save_timeline_post(email, text):
-            self.timeline_input.text = ''; self.load_timeline()
+        text = self.timeline_input.text.strip()
+        if text and self._email:
+            save_timeline_post(self._email, text, on_done=lambda ok: ok and self._on_posted(text))
+
+    def _on_posted(self, text):
+        if self.timeline_input.text.strip() == text:
+            self.timeline_input.text = ''
+        self.load_timeline()
 
     def load_timeline(self):
+        if not self._email: return
+        db_worker.submit(get_timeline_posts, self._email, on_done=self._show_timeline)
+
+    def _show_timeline(self, posts):
         self.tl_layout.clear_widgets()
-        email = get_user_email(current_user)
-        if not email: return
-        posts = get_timeline_posts(email)
         if posts:
             for text, timestamp in posts:
                 time_str = str(timestamp)[:16]
@@ -2027,7 +4607,10 @@ class ProfileScreen(Screen):
 # ── App ───────────────────────────────────────────────────────────────────────
 class MyApp(App):
     def build(self):
-        setup_db()
+        global db_setup
+        # Queued first, so every screen's queries run against the migrated schema;
+        # password_worker jobs wait on it through after_setup
+        db_setup = db_worker.submit(setup_db)
         self.title = 'User Hub — Connect & Share'
         sm = ScreenManager(transition=FadeTransition(duration=0.2))
         for cls, name in [
@@ -2040,11 +4623,31 @@ class MyApp(App):
             (AdminScreen,     'admin'),
             (InboxScreen,     'inbox'),
             (DMScreen,        'dm'),
+            (SearchScreen,    'search'),
         ]:
             s = cls(name=name)
             s.build()
             sm.add_widget(s)
+        # An unfocused window only needs the slowest change check
+        Window.bind(focus=lambda w, focused: change_notifier.set_focused(focused))
         return sm
 
+    def on_pause(self):
+        # Backgrounded (Android): no change checks until on_resume
+        change_notifier.pause()
+        return True
+
+    def on_resume(self):
+        change_notifier.resume()
+
+    def on_stop(self):
+        change_notifier.close()
+        password_worker.shutdown()
+        db_worker.shutdown()
+        image_worker.shutdown()
+        write_queue.close()
+        db.close_all()
+        archive_db.close_all()
+
 if __name__ == '__main__':
     MyApp().run()